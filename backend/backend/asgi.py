@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+Under ASGI the dashboard endpoint is served by AsyncDashboardView, which runs
+its independent aggregates concurrently. Set ASYNC_DASHBOARD=False to fall
+back to the sync DashboardView.
 """
 
 import os
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('ASYNC_DASHBOARD', 'True')
 
 application = get_asgi_application()
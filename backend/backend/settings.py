@@ -53,7 +53,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'handler.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'handler.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,8 +63,41 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'handler.db.ReadReplicaMiddleware',
 ]
 
+# Response compression (brotli when installed, otherwise gzip)
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))  # bytes
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Per-request metrics (Server-Timing header + handler.requests log line)
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True') == 'True'
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', '1.0' if DEBUG else '0.05'))
+
+# Prometheus metrics on /metrics. Under gunicorn set PROMETHEUS_MULTIPROC_DIR to a
+# shared directory so every worker's samples are aggregated (see gunicorn.conf.py).
+PROMETHEUS_METRICS_ENABLED = os.getenv('PROMETHEUS_METRICS_ENABLED', 'True') == 'True'
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+# /metrics requires "Authorization: Bearer <token>" when this is set and is open
+# to anyone otherwise. Set it in production, or block /metrics at the proxy.
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN')
+
+# Slow query recorder (report with: python manage.py slow_query_report)
+SLOW_QUERY_ENABLED = os.getenv('SLOW_QUERY_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True') == 'True'
+# Written through the 'handler.slow_queries.records' logger (see LOGGING) to a
+# file only the server's user can read, in a directory created as 0700. Every
+# worker process appends to the same file and reopens it once it is moved, so
+# rotate it externally (e.g. logrotate, renaming to SLOW_QUERY_LOG_FILE.1, .2...).
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', str(BASE_DIR / 'var' / 'slow_queries.jsonl'))
+# Query parameters hold emails, password hashes and tokens, so by default only
+# their types are recorded. PostgreSQL plans (SLOW_QUERY_EXPLAIN) can still
+# show values in their conditions.
+SLOW_QUERY_LOG_PARAMS = os.getenv('SLOW_QUERY_LOG_PARAMS', 'False') == 'True'
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -83,16 +118,135 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# Serve /api/dashboard/ with the async view that computes sections concurrently.
+# backend/asgi.py turns this on by default; WSGI workers keep the sync view.
+ASYNC_DASHBOARD = os.getenv('ASYNC_DASHBOARD', 'False') == 'True'
+# Sections the async dashboard computes at once, across all its requests in a
+# worker process. Each runs in its own thread with its own connection, so keep
+# this below DB_POOL_MAX_SIZE to leave connections for the other requests.
+ASYNC_DASHBOARD_MAX_THREADS = int(os.getenv('ASYNC_DASHBOARD_MAX_THREADS', '6'))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# DB_ENGINE=postgresql selects the production profile configured from the
+# POSTGRES_* / DB_* environment variables; anything else uses local SQLite.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+# Tuned SQLite for small deployments (SQLITE_TUNED, on by default). WAL lets
+# readers run alongside the writer, busy_timeout waits for the write lock
+# instead of failing with "database is locked", and BEGIN IMMEDIATE takes the
+# write lock up front so read-then-write transactions cannot deadlock.
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_TUNED_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};'
+        f"PRAGMA mmap_size={os.getenv('SQLITE_MMAP_SIZE', '268435456')};"
+        f"PRAGMA cache_size={os.getenv('SQLITE_CACHE_SIZE', '-20000')};"
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+}
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if DB_ENGINE == 'postgresql':
+    # psycopg3 connection pool (Django 5.1+). Pooled connections replace
+    # persistent ones, so CONN_MAX_AGE only applies when the pool is off.
+    DB_POOL = os.getenv('DB_POOL', 'True') == 'True'
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'wealthwise'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+            # Streaming paths use named server-side cursors; turn them off
+            # when running behind PgBouncer in transaction pooling mode.
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_SERVER_SIDE_CURSORS', 'True') != 'True',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            },
+        }
     }
-}
+
+    if DB_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': SQLITE_TUNED_OPTIONS if os.getenv('SQLITE_TUNED', 'True') == 'True' else {},
+        }
+    }
+
+# Read replicas (DB_REPLICAS): comma-separated PostgreSQL hosts, or SQLite file
+# paths for the local profile. Analytics, dashboard and list views read from a
+# replica; writes and anything else use the primary ('default').
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST' if DB_ENGINE == 'postgresql' else 'NAME': replica.strip(),
+        # Tests run against the primary only
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['handler.db.ReadReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write (read-your-writes)
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+
+# Rows fetched per round trip when streaming large querysets
+DB_STREAM_CHUNK_SIZE = int(os.getenv('DB_STREAM_CHUNK_SIZE', '2000'))
+
+# Cache (instrumented backends count hits/misses for request metrics).
+# Set REDIS_URL to share it between workers, e.g. for replica pinning.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'handler.cache.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'handler.cache.LocMemCache'}}
+
+# Per-process cache of active users' transactions for the analytics engine
+# (handler/transaction_cache.py). Other workers learn about writes through the
+# default cache above, so it is only on by default with REDIS_URL; with the
+# local-memory cache, only enable it for a single worker process.
+TRANSACTION_CACHE_ENABLED = os.getenv('TRANSACTION_CACHE_ENABLED', 'True' if REDIS_URL else 'False') == 'True'
+TRANSACTION_CACHE_MAX_BYTES = int(float(os.getenv('TRANSACTION_CACHE_MAX_MB', '64')) * 1024 * 1024)
+TRANSACTION_CACHE_TTL = int(os.getenv('TRANSACTION_CACHE_TTL', '300'))  # seconds
+
+# Serve AnalyticsView for closed months from reports stored by the nightly
+# `manage.py precompute_insights` job (handler/insights.py)
+MONTHLY_REPORTS_ENABLED = os.getenv('MONTHLY_REPORTS_ENABLED', 'True') == 'True'
+
+# Unusual spending alerts from running per-category statistics (handler/anomalies.py);
+# seed the statistics of existing history with `manage.py seed_spending_stats`
+ANOMALY_DETECTION_ENABLED = os.getenv('ANOMALY_DETECTION_ENABLED', 'True') == 'True'
+ANOMALY_MIN_SAMPLES = int(os.getenv('ANOMALY_MIN_SAMPLES', '10'))  # expenses seen before a category can alert
+ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', '3.0'))  # standard deviations above the recent mean
+ANOMALY_EWMA_SPAN = int(os.getenv('ANOMALY_EWMA_SPAN', '20'))  # expenses; smoothing factor 2 / (span + 1)
+
+# Month-end budget forecasts (handler/forecast.py) are cached in the default cache
+# until the user's next transaction write, or for at most this long
+FORECAST_CACHE_TTL = int(os.getenv('FORECAST_CACHE_TTL', '3600'))  # seconds
+
+# Refresh detected subscriptions (handler/recurring.py) as transactions are written;
+# `manage.py detect_subscriptions` rebuilds them for every user
+SUBSCRIPTION_DETECTION_ENABLED = os.getenv('SUBSCRIPTION_DETECTION_ENABLED', 'True') == 'True'
 
 
 # Password validation
@@ -143,6 +297,19 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson drop-ins for DRF's stdlib json renderer/parser (same output bytes),
+    # plus MessagePack for clients sending Accept: application/msgpack
+    'DEFAULT_RENDERER_CLASSES': (
+        'handler.renderers.ORJSONRenderer',
+        'handler.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'handler.renderers.ORJSONParser',
+        'handler.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # Simple JWT settings
@@ -196,3 +363,28 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'WealthWise <noreply@wealthwise.com>')
+
+# Logging
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        # One JSON record per line; opened on the first slow query
+        'slow_query_file': {
+            'class': 'handler.slow_queries.PrivateWatchedFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'handler': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+        'handler.slow_queries.records': {'handlers': ['slow_query_file'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn starts in this directory.
+
+    PROMETHEUS_MULTIPROC_DIR=/tmp/wealthwise-metrics gunicorn backend.wsgi
+
+With PROMETHEUS_MULTIPROC_DIR set, each worker writes its metrics to that
+directory and /metrics merges them, whichever worker serves the scrape.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be merged into the new one
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
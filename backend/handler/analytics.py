@@ -0,0 +1,1017 @@
+"""
+Vectorized analytics engine.
+
+AnalyticsView and AnalyticsDateRangeView load the user's transactions for the
+whole window they report on with one query (or from the per-process cache in
+transaction_cache.py) into TransactionColumns: parallel
+NumPy arrays of day number, amount in integer minor units, type, category id,
+category snapshot label and payment method, sorted by day. Every chart series,
+breakdown and comparison is then a vectorized group-by over those arrays:
+searchsorted finds where a date range or chart bucket starts, cumsum turns
+amounts into running totals so any bucket's total is one subtraction, and
+bincount sums amounts per category label. BatchAnalyticsView answers several
+ranges from one load covering all of them.
+
+MONTH_SECTIONS and RANGE_SECTIONS register the top-level sections of the two
+payloads with the queries each reads; sections a caller did not ask for are
+not computed, and a query no requested section reads is not run.
+
+Sums stay exact integers. The scalar insight arithmetic still uses Decimals
+built from them, so the payloads are identical to the per-bucket ORM
+implementation in benchmarks/analytics_orm.py that the engine replaced.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import BigIntegerField, ExpressionWrapper, F
+
+from . import transaction_cache
+from .fields import from_minor_units
+from .models import UserProfile, Transaction, Budget
+
+CURRENCY_SYMBOLS = {
+    'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥',
+    'AUD': 'A$', 'CAD': 'C$', 'CHF': 'CHF', 'CNY': '¥', 'SGD': 'S$',
+}
+
+AMOUNT_DECIMAL_PLACES = Transaction._meta.get_field('amount').decimal_places
+
+# Day numbers count days since 1970-01-01, the datetime64[D] epoch
+EPOCH = date(1970, 1, 1)
+
+TYPE_CODES = {value: code for code, (value, _) in enumerate(Transaction.TRANSACTION_TYPES)}
+PAYMENT_METHOD_CODES = {value: code for code, (value, _) in enumerate(Transaction.PAYMENT_METHODS)}
+INCOME = TYPE_CODES['income']
+EXPENSE = TYPE_CODES['expense']
+
+LABEL_FIELDS = ('name', 'color', 'icon')
+
+
+def currency_for(user):
+    """(currency code, symbol) from the user's profile, defaulting to INR."""
+    try:
+        currency = user.profile.currency
+    except UserProfile.DoesNotExist:
+        currency = 'INR'
+    return currency, CURRENCY_SYMBOLS.get(currency, currency)
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+def day_edges(start, end):
+    """Bucket edges for one bucket per day from start to end (inclusive)."""
+    return np.arange(day_number(start), day_number(end) + 2)
+
+
+def money(minor):
+    """Exact Decimal amount for an integer count of minor units."""
+    return from_minor_units(int(minor), AMOUNT_DECIMAL_PLACES)
+
+
+def to_major(minor):
+    """Minor-unit array as a list of floats, equal to float() of the exact Decimals."""
+    return (minor / 10 ** AMOUNT_DECIMAL_PLACES).tolist()
+
+
+class TransactionColumns:
+    """
+    One user's transactions between two dates as parallel arrays sorted by day.
+
+    ``labels`` index into ``label_values``, the distinct (category_name,
+    category_color, category_icon) snapshots the charts group by. Transactions
+    without a category have category id 0.
+    """
+
+    def __init__(self, days, amounts, types, categories, labels, label_values, payment_methods):
+        self.days = days
+        self.amounts = amounts
+        self.types = types
+        self.categories = categories
+        self.labels = labels
+        self.label_values = label_values
+        self.payment_methods = payment_methods
+        self._prefix_sums = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (date, amount_minor, type, category_id, name, color, icon, payment_method) rows."""
+        label_index = {}
+        columns = list(zip(*rows)) or [()] * 8
+        dates, amounts, types, categories, names, colors, icons, payment_methods = columns
+        days = np.array(dates, dtype='datetime64[D]').astype(np.int32)
+        order = np.argsort(days, kind='stable')
+        labels = [label_index.setdefault(label, len(label_index)) for label in zip(names, colors, icons)]
+        return cls(
+            days=days[order],
+            amounts=np.array(amounts, dtype=np.int64)[order],
+            types=np.array([TYPE_CODES[t] for t in types], dtype=np.int8)[order],
+            categories=np.array([c or 0 for c in categories], dtype=np.int64)[order],
+            labels=np.array(labels, dtype=np.int32)[order],
+            label_values=list(label_index),
+            payment_methods=np.array(
+                [PAYMENT_METHOD_CODES.get(m, -1) for m in payment_methods], dtype=np.int8
+            )[order],
+        )
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held, including room for the per-type prefix sums."""
+        arrays = (self.days, self.amounts, self.types, self.categories, self.labels, self.payment_methods)
+        prefix_sums = len(TYPE_CODES) * 8 * (len(self) + 1)
+        return sum(array.nbytes for array in arrays) + prefix_sums + 200 * len(self.label_values)
+
+    def span(self, start, end):
+        """Slice of the rows dated start..end (inclusive)."""
+        lo, hi = np.searchsorted(self.days, [day_number(start), day_number(end) + 1])
+        return slice(int(lo), int(hi))
+
+    def _prefix_sum(self, type_code):
+        """prefix[i] is the total of the rows of one type before row i."""
+        if type_code not in self._prefix_sums:
+            amounts = np.where(self.types == type_code, self.amounts, 0)
+            self._prefix_sums[type_code] = np.concatenate(([0], np.cumsum(amounts)))
+        return self._prefix_sums[type_code]
+
+    def total(self, rows, type_code):
+        prefix = self._prefix_sum(type_code)
+        return int(prefix[rows.stop] - prefix[rows.start])
+
+    def totals(self, type_code, edges):
+        """
+        Totals of one type per bucket, as an int64 array.
+
+        ``edges`` are the first day of each bucket followed by the day after the
+        last one (dates or day numbers); bucket i is edges[i] <= day < edges[i + 1].
+        """
+        if len(edges) and isinstance(edges[0], date):
+            edges = [day_number(edge) for edge in edges]
+        return np.diff(self._prefix_sum(type_code)[np.searchsorted(self.days, edges)])
+
+    def count(self, rows, type_code=None):
+        if type_code is None:
+            return rows.stop - rows.start
+        return int(np.count_nonzero(self.types[rows] == type_code))
+
+    def label_totals(self, rows, type_code, fields=LABEL_FIELDS):
+        """
+        [(label, total, count)] of one type grouped by category snapshot, largest total first.
+
+        ``fields`` picks which of name/color/icon form the label, so grouping by
+        fewer fields merges snapshots that only differ in the others.
+        """
+        positions = [LABEL_FIELDS.index(field) for field in fields]
+        keys = {}
+        key_codes = np.array(
+            [keys.setdefault(tuple(value[p] for p in positions), len(keys)) for value in self.label_values],
+            dtype=np.int64,
+        )
+        mask = self.types[rows] == type_code
+        codes = key_codes[self.labels[rows][mask]] if len(keys) else np.zeros(0, dtype=np.int64)
+        # float64 sums of integer minor units are exact up to 2**53
+        totals = np.bincount(codes, weights=self.amounts[rows][mask], minlength=len(keys)).astype(np.int64)
+        counts = np.bincount(codes, minlength=len(keys))
+        key_list = list(keys)
+        return [
+            (key_list[code], int(totals[code]), int(counts[code]))
+            for code in np.argsort(-totals, kind='stable') if counts[code]
+        ]
+
+    def category_totals(self, rows, type_code):
+        """{category id: total} of one type."""
+        mask = self.types[rows] == type_code
+        ids, codes = np.unique(self.categories[rows][mask], return_inverse=True)
+        totals = np.bincount(codes, weights=self.amounts[rows][mask], minlength=len(ids)).astype(np.int64)
+        return dict(zip(ids.tolist(), totals.tolist()))
+
+
+def query_columns(user, start=None, end=None):
+    """The user's transactions, optionally only those dated start..end (inclusive), in one query."""
+    transactions = Transaction.objects.filter(user=user)
+    if start is not None:
+        transactions = transactions.filter(date__gte=start, date__lte=end)
+    rows = transactions.order_by().annotate(
+        # The raw integer column, skipping MinorUnitField's per-row Decimal conversion
+        amount_minor=ExpressionWrapper(F('amount'), output_field=BigIntegerField()),
+    ).values_list(
+        'date', 'amount_minor', 'type', 'category_id',
+        'category_name', 'category_color', 'category_icon', 'payment_method',
+    )
+    return TransactionColumns.from_rows(rows)
+
+
+def load_columns(user, start, end):
+    """
+    TransactionColumns holding at least the user's transactions dated start..end.
+
+    With TRANSACTION_CACHE_ENABLED this is the user's whole history from the
+    per-process cache, so repeat requests skip the database; every reader cuts
+    its dates out with span() or totals(), so the extra rows are harmless.
+    """
+    if settings.TRANSACTION_CACHE_ENABLED:
+        columns = transaction_cache.get_or_load(user.pk, lambda: query_columns(user))
+        if columns is not None:
+            return columns
+    return query_columns(user, start, end)
+
+
+# Sections of the AnalyticsView payload: the queries each reads
+MONTH_SECTIONS = {
+    'summary': ('transactions',),
+    'charts': ('transactions',),
+    'insights': ('transactions', 'budgets'),
+    'budget_alerts': ('transactions', 'budgets'),
+    'comparison': ('transactions',),
+}
+
+
+def month_window(selected_month, selected_year):
+    """First and last day of the transactions the month payload reads: its 6 chart months."""
+    month_start = date(selected_year, selected_month, 1)
+    return month_start - relativedelta(months=5), month_start + relativedelta(months=1) - timedelta(days=1)
+
+
+def month_analytics(user, selected_month, selected_year, today, columns=None, budgets=None, sections=None):
+    """
+    AnalyticsView payload for one month, from one transaction and one budget query.
+
+    Batch callers pass ``columns`` covering month_window() and the month's
+    ``budgets`` (with their categories) to skip both queries. ``sections``
+    limits the payload to those MONTH_SECTIONS; the others are not computed
+    and queries none of them read are skipped.
+    """
+    if sections is None:
+        sections = list(MONTH_SECTIONS)
+    reads = set().union(*(MONTH_SECTIONS[name] for name in sections))
+    month_start = date(selected_year, selected_month, 1)
+    days_in_month = calendar.monthrange(selected_year, selected_month)[1]
+    month_end = month_start + timedelta(days=days_in_month - 1)
+    prev_month_start = month_start - relativedelta(months=1)
+    # The 6-month chart reaches furthest back, so its window covers everything else
+    chart_starts = [month_start - relativedelta(months=i) for i in range(5, -1, -1)]
+
+    currency, symbol = currency_for(user)
+    payload = {
+        'success': True,
+        'currency': currency,
+        'currency_symbol': symbol,
+        'month': selected_month,
+        'year': selected_year,
+        'month_name': calendar.month_name[selected_month],
+    }
+    if 'transactions' not in reads:
+        return payload
+    if columns is None:
+        columns = load_columns(user, chart_starts[0], month_end)
+    month_rows = columns.span(month_start, month_end)
+
+    # ========================================
+    # CHART 1: Expense by Category (Pie Chart)
+    # ========================================
+    expense_pie_data = []
+    if 'charts' in sections or 'insights' in sections:
+        expense_pie_data = [
+            {
+                'name': name or 'Uncategorized',
+                'value': float(money(total)),
+                'color': color or '#6366f1'
+            }
+            for (name, color), total, _ in columns.label_totals(month_rows, EXPENSE, ('name', 'color'))
+        ]
+
+    # ========================================
+    # CHART 2: Income vs Expense (Bar Chart)
+    # ========================================
+    # Last 6 months data
+    chart_edges = chart_starts + [month_end + timedelta(days=1)]
+    monthly_income = columns.totals(INCOME, chart_edges)
+    monthly_expense = columns.totals(EXPENSE, chart_edges)
+
+    if 'charts' in sections:
+        income_vs_expense_data = [
+            {
+                'month': calendar.month_abbr[start.month],
+                'year': start.year,
+                'income': income,
+                'expense': expense,
+            }
+            for start, income, expense in zip(chart_starts, to_major(monthly_income), to_major(monthly_expense))
+        ]
+
+        # ========================================
+        # CHART 3: Monthly Spending Trend (Line Chart)
+        # ========================================
+        # Daily spending for selected month
+        daily_expense = columns.totals(EXPENSE, day_edges(month_start, month_end))
+        daily_spending = [
+            {
+                'day': day,
+                'expense': expense,
+                'cumulative': cumulative
+            }
+            for day, expense, cumulative in zip(
+                range(1, days_in_month + 1), to_major(daily_expense), to_major(np.cumsum(daily_expense))
+            )
+        ]
+
+    # Current month totals
+    current_month_expenses = money(monthly_expense[-1])
+    current_month_income = money(monthly_income[-1])
+
+    # Previous month totals
+    prev_month_expenses = money(monthly_expense[-2])
+    prev_month_income = money(monthly_income[-2])
+
+    savings = current_month_income - current_month_expenses
+    savings_rate = (savings / current_month_income * 100) if current_month_income > 0 else 0
+
+    # ========================================
+    # SMART INSIGHTS
+    # ========================================
+    insights = []
+
+    if 'insights' in sections:
+        # INSIGHT 1: Highest Spending Category
+        if expense_pie_data:
+            top_category = expense_pie_data[0]
+            total_expenses = sum(item['value'] for item in expense_pie_data)
+            percentage_of_total = (top_category['value'] / total_expenses * 100) if total_expenses > 0 else 0
+
+            insights.append({
+                'type': 'highest_spending',
+                'icon': '🏆',
+                'title': 'Top Spending Category',
+                'message': f"Your highest spending is on {top_category['name']} at {symbol}{top_category['value']:,.0f} ({percentage_of_total:.1f}% of total expenses).",
+                'category': top_category['name'],
+                'amount': top_category['value'],
+                'percentage': percentage_of_total,
+                'color': top_category['color'],
+                'severity': 'info'
+            })
+
+        # INSIGHT 2: Month-to-Month Expense Comparison
+        if prev_month_expenses > 0:
+            expense_change = ((current_month_expenses - prev_month_expenses) / prev_month_expenses * 100)
+            expense_diff = current_month_expenses - prev_month_expenses
+
+            if expense_change > 0:
+                insights.append({
+                    'type': 'expense_comparison',
+                    'icon': '📈',
+                    'title': 'Spending Increase',
+                    'message': f"You spent {expense_change:.1f}% more this month compared to last month ({symbol}{abs(expense_diff):,.0f} more).",
+                    'change_percentage': float(expense_change),
+                    'change_amount': float(expense_diff),
+                    'severity': 'warning' if expense_change > 20 else 'info'
+                })
+            else:
+                insights.append({
+                    'type': 'expense_comparison',
+                    'icon': '📉',
+                    'title': 'Spending Decrease',
+                    'message': f"Great job! You spent {abs(expense_change):.1f}% less this month compared to last month ({symbol}{abs(expense_diff):,.0f} saved).",
+                    'change_percentage': float(expense_change),
+                    'change_amount': float(expense_diff),
+                    'severity': 'success'
+                })
+        elif current_month_expenses > 0:
+            insights.append({
+                'type': 'expense_comparison',
+                'icon': '📊',
+                'title': 'First Month Tracking',
+                'message': f"You've spent {symbol}{current_month_expenses:,.0f} this month. Keep tracking to see trends!",
+                'severity': 'info'
+            })
+
+        # INSIGHT 3: Income vs Expense Analysis
+        if current_month_income > 0:
+            if savings > 0:
+                insights.append({
+                    'type': 'savings',
+                    'icon': '💰',
+                    'title': 'Positive Savings',
+                    'message': f"You're saving {symbol}{savings:,.0f} this month ({savings_rate:.1f}% savings rate). Keep it up!",
+                    'savings': float(savings),
+                    'savings_rate': float(savings_rate),
+                    'severity': 'success'
+                })
+            else:
+                insights.append({
+                    'type': 'overspending',
+                    'icon': '⚠️',
+                    'title': 'Overspending Alert',
+                    'message': f"You're spending more than you earn! Deficit: {symbol}{abs(savings):,.0f}. Consider reducing expenses.",
+                    'deficit': float(abs(savings)),
+                    'severity': 'danger'
+                })
+
+        # INSIGHT 4: Category-wise Comparison with Previous Month
+        prev_month_rows = columns.span(prev_month_start, month_start - timedelta(days=1))
+        prev_by_name = {
+            name: total for (name,), total, _ in columns.label_totals(prev_month_rows, EXPENSE, ('name',))
+        }
+        category_comparisons = []
+        for cat_data in expense_pie_data[:5]:  # Top 5 categories
+            cat_name = cat_data['name']
+            current_cat_expense = cat_data['value']
+
+            # Get previous month expense for same category
+            prev_cat_expense = money(prev_by_name.get(cat_name, 0))
+
+            if prev_cat_expense > 0:
+                change_pct = ((Decimal(str(current_cat_expense)) - prev_cat_expense) / prev_cat_expense * 100)
+                if abs(change_pct) > 15:  # Only show significant changes
+                    category_comparisons.append({
+                        'category': cat_name,
+                        'color': cat_data['color'],
+                        'current': current_cat_expense,
+                        'previous': float(prev_cat_expense),
+                        'change_percentage': float(change_pct),
+                        'increased': change_pct > 0
+                    })
+
+        # Add category comparison insights
+        for comp in category_comparisons[:3]:  # Top 3 significant changes
+            if comp['increased']:
+                insights.append({
+                    'type': 'category_increase',
+                    'icon': '🔺',
+                    'title': f"{comp['category']} Spending Up",
+                    'message': f"You spent {comp['change_percentage']:.1f}% more on {comp['category']} compared to last month.",
+                    'category': comp['category'],
+                    'change_percentage': comp['change_percentage'],
+                    'color': comp['color'],
+                    'severity': 'warning' if comp['change_percentage'] > 25 else 'info'
+                })
+            else:
+                insights.append({
+                    'type': 'category_decrease',
+                    'icon': '🔻',
+                    'title': f"{comp['category']} Spending Down",
+                    'message': f"You spent {abs(comp['change_percentage']):.1f}% less on {comp['category']} compared to last month.",
+                    'category': comp['category'],
+                    'change_percentage': comp['change_percentage'],
+                    'color': comp['color'],
+                    'severity': 'success'
+                })
+
+    budget_alerts = []
+    if 'budgets' in reads:
+        # INSIGHT 5: Budget Alerts (if budgets exist)
+        user_budgets = budgets if budgets is not None else Budget.objects.filter(
+            user=user,
+            month=selected_month,
+            year=selected_year
+        ).select_related('category')
+        spent_by_category = columns.category_totals(month_rows, EXPENSE)
+
+        for budget in user_budgets:
+            if budget.is_overall:
+                spent = current_month_expenses
+                budget_name = "Overall Budget"
+            elif budget.category:
+                spent = money(spent_by_category.get(budget.category_id, 0))
+                budget_name = budget.category.name
+            else:
+                continue
+
+            if budget.amount > 0:
+                usage_pct = (spent / budget.amount * 100)
+                if usage_pct >= 100:
+                    budget_alerts.append({
+                        'type': 'exceeded',
+                        'name': budget_name,
+                        'spent': float(spent),
+                        'budget': float(budget.amount),
+                        'percentage': float(usage_pct)
+                    })
+                    insights.append({
+                        'type': 'budget_exceeded',
+                        'icon': '🚨',
+                        'title': f'{budget_name} Budget Exceeded',
+                        'message': f"You've exceeded your {budget_name} budget by {symbol}{float(spent - budget.amount):,.0f} ({usage_pct:.1f}% used).",
+                        'severity': 'danger'
+                    })
+                elif usage_pct >= budget.alert_threshold:
+                    budget_alerts.append({
+                        'type': 'warning',
+                        'name': budget_name,
+                        'spent': float(spent),
+                        'budget': float(budget.amount),
+                        'percentage': float(usage_pct)
+                    })
+
+    if 'insights' in sections:
+        # INSIGHT 6: Average Daily Spending
+        if current_month_expenses > 0:
+            days_passed = min(today.day, days_in_month) if (selected_month == today.month and selected_year == today.year) else days_in_month
+            avg_daily = current_month_expenses / days_passed if days_passed > 0 else 0
+            projected_monthly = avg_daily * days_in_month
+
+            insights.append({
+                'type': 'daily_average',
+                'icon': '📅',
+                'title': 'Daily Spending Average',
+                'message': f"Your average daily spending is {symbol}{avg_daily:,.0f}. Projected monthly: {symbol}{projected_monthly:,.0f}.",
+                'daily_average': float(avg_daily),
+                'projected_monthly': float(projected_monthly),
+                'severity': 'info'
+            })
+
+    # Summary stats
+    if 'summary' in sections:
+        payload['summary'] = {
+            'total_income': float(current_month_income),
+            'total_expenses': float(current_month_expenses),
+            'savings': float(savings),
+            'savings_rate': float(savings_rate),
+            'transaction_count': columns.count(month_rows)
+        }
+    if 'charts' in sections:
+        payload['charts'] = {
+            'expense_by_category': expense_pie_data,
+            'income_vs_expense': income_vs_expense_data,
+            'daily_spending': daily_spending,
+        }
+    if 'insights' in sections:
+        payload['insights'] = insights
+    if 'budget_alerts' in sections:
+        payload['budget_alerts'] = budget_alerts
+    if 'comparison' in sections:
+        payload['comparison'] = {
+            'prev_month_expenses': float(prev_month_expenses),
+            'prev_month_income': float(prev_month_income),
+            'expense_change': float(((current_month_expenses - prev_month_expenses) / prev_month_expenses * 100) if prev_month_expenses > 0 else 0),
+            'income_change': float(((current_month_income - prev_month_income) / prev_month_income * 100) if prev_month_income > 0 else 0),
+        }
+    return payload
+
+
+# Longest custom range; each day is a point in the charts
+MAX_RANGE_DAYS = 366 * 10
+
+# range: (label, how far back it starts from today, inclusive of today)
+RANGE_TYPES = {
+    'last_7_days': ('Last 7 Days', relativedelta(days=6)),
+    'last_30_days': ('Last 30 Days', relativedelta(days=29)),
+    'last_3_months': ('Last 3 Months', relativedelta(months=3, days=-1)),
+    'last_6_months': ('Last 6 Months', relativedelta(months=6, days=-1)),
+    'last_1_year': ('Last 1 Year', relativedelta(years=1, days=-1)),
+}
+
+
+def parse_range(params, today):
+    """
+    (start_date, end_date, range_type, range_label) from range, start_date and
+    end_date params; unknown ranges mean the last 30 days. Raises ValueError
+    with a user-facing message for invalid custom dates and for ranges longer
+    than MAX_RANGE_DAYS or too close to the first or last representable date.
+    """
+    range_type = params.get('range', 'last_30_days')
+    if range_type == 'custom':
+        try:
+            start_date = datetime.strptime(params.get('start_date'), '%Y-%m-%d').date()
+            end_date = datetime.strptime(params.get('end_date'), '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            raise ValueError('Invalid date format. Use YYYY-MM-DD.')
+        range_label = f"{start_date.strftime('%b %d, %Y')} - {end_date.strftime('%b %d, %Y')}"
+    else:
+        range_label, back = RANGE_TYPES.get(range_type, RANGE_TYPES['last_30_days'])
+        start_date, end_date = today - back, today
+    if start_date > end_date:
+        raise ValueError('Start date cannot be after end date.')
+    if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f'Date range is limited to {MAX_RANGE_DAYS} days.')
+    try:
+        # The previous period and the month buckets of the trend must be valid dates too
+        range_window(start_date, end_date, list(RANGE_SECTIONS))
+        date(end_date.year, end_date.month, 1) + relativedelta(months=1)
+    except (OverflowError, ValueError):
+        raise ValueError('Date range is outside the supported dates.')
+    return start_date, end_date, range_type, range_label
+
+
+# Sections of the AnalyticsDateRangeView payload: the queries each reads
+# (the insights compare spending with the previous period too)
+RANGE_SECTIONS = {
+    'summary': ('transactions',),
+    'charts': ('transactions',),
+    'insights': ('transactions', 'previous_period'),
+    'comparison': ('transactions', 'previous_period'),
+}
+
+
+def range_window(start_date, end_date, sections):
+    """
+    First and last day of the transactions the range payload limited to
+    ``sections`` reads: the range, and the period before it when a section
+    compares against it.
+    """
+    if any('previous_period' in RANGE_SECTIONS[name] for name in sections):
+        return start_date - (end_date - start_date) - timedelta(days=1), end_date
+    return start_date, end_date
+
+
+def range_analytics(user, start_date, end_date, range_type, range_label, columns=None, sections=None):
+    """
+    AnalyticsDateRangeView payload for start_date..end_date (inclusive), from one transaction query.
+
+    Batch callers pass ``columns`` covering range_window() for the same
+    sections to skip the query.
+    ``sections`` limits the payload to those RANGE_SECTIONS; the others are
+    not computed.
+    """
+    if sections is None:
+        sections = list(RANGE_SECTIONS)
+    reads = set().union(*(RANGE_SECTIONS[name] for name in sections))
+    # Calculate days in range
+    days_in_range = (end_date - start_date).days + 1
+
+    currency, symbol = currency_for(user)
+    payload = {
+        'success': True,
+        'currency': currency,
+        'currency_symbol': symbol,
+        'range': {
+            'type': range_type,
+            'label': range_label,
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'days': days_in_range,
+        },
+    }
+    if 'transactions' not in reads:
+        return payload
+
+    if columns is None:
+        columns = load_columns(user, *range_window(start_date, end_date, sections))
+    range_rows = columns.span(start_date, end_date)
+    daily_income = columns.totals(INCOME, day_edges(start_date, end_date))
+    daily_expense = columns.totals(EXPENSE, day_edges(start_date, end_date))
+
+    # ========================================
+    # SUMMARY STATISTICS
+    # ========================================
+    total_income = money(daily_income.sum())
+    total_expenses = money(daily_expense.sum())
+
+    net_savings = total_income - total_expenses
+    savings_rate = (net_savings / total_income * 100) if total_income > 0 else Decimal('0')
+
+    transaction_count = columns.count(range_rows)
+    income_count = columns.count(range_rows, INCOME)
+    expense_count = columns.count(range_rows, EXPENSE)
+
+    # Average per day
+    avg_daily_expense = total_expenses / days_in_range if days_in_range > 0 else Decimal('0')
+    avg_daily_income = total_income / days_in_range if days_in_range > 0 else Decimal('0')
+
+    # Calculate number of months in range (for monthly average)
+    months_in_range = max(1, days_in_range / 30)
+    avg_monthly_expense = total_expenses / Decimal(str(months_in_range))
+    avg_monthly_income = total_income / Decimal(str(months_in_range))
+
+    # ========================================
+    # EXPENSE BY CATEGORY (Pie Chart)
+    # ========================================
+    expense_pie_data = []
+    if 'charts' in sections or 'insights' in sections:
+        expense_pie_data = [
+            {
+                'name': name or 'Uncategorized',
+                'value': float(money(total)),
+                'color': color or '#6366f1',
+                'icon': icon or 'FiTag',
+                'count': count,
+                'percentage': float((money(total) / total_expenses * 100) if total_expenses > 0 else 0)
+            }
+            for (name, color, icon), total, count in columns.label_totals(range_rows, EXPENSE)
+        ]
+
+    if 'charts' in sections:
+        # ========================================
+        # INCOME BY CATEGORY (Pie Chart)
+        # ========================================
+        income_pie_data = [
+            {
+                'name': name or 'Uncategorized',
+                'value': float(money(total)),
+                'color': color or '#10b981',
+                'icon': icon or 'FiTag',
+                'count': count,
+                'percentage': float((money(total) / total_income * 100) if total_income > 0 else 0)
+            }
+            for (name, color, icon), total, count in columns.label_totals(range_rows, INCOME)
+        ]
+
+        # ========================================
+        # INCOME VS EXPENSE TREND (Bar/Line Chart)
+        # ========================================
+        periods = []
+        if days_in_range > 180:  # Group by month for large ranges
+            current = datetime(start_date.year, start_date.month, 1)
+            end_month = datetime(end_date.year, end_date.month, 1)
+            while current <= end_month:
+                periods.append((current.strftime('%b %Y'), current.strftime('%Y-%m'), max(current.date(), start_date)))
+                current += relativedelta(months=1)
+        elif days_in_range > 30:  # Group by week
+            for week_num, offset in enumerate(range(0, days_in_range, 7), start=1):
+                current = start_date + timedelta(days=offset)
+                w_end = min(current + timedelta(days=6), end_date)
+                periods.append((f"Week {week_num}", f"{current.strftime('%b %d')} - {w_end.strftime('%b %d')}", current))
+        else:  # Group by day
+            for offset in range(days_in_range):
+                current = start_date + timedelta(days=offset)
+                periods.append((current.strftime('%b %d'), current.strftime('%Y-%m-%d'), current))
+
+        # Each period runs from its first day to the next period's first day
+        period_offsets = [(first_day - start_date).days for _, _, first_day in periods]
+        period_income = np.add.reduceat(daily_income, period_offsets)
+        period_expense = np.add.reduceat(daily_expense, period_offsets)
+        trend_data = [
+            {
+                'label': label,
+                'period': period,
+                'income': income,
+                'expense': expense,
+                'savings': savings
+            }
+            for (label, period, _), income, expense, savings in zip(
+                periods, to_major(period_income), to_major(period_expense), to_major(period_income - period_expense)
+            )
+        ]
+
+        # ========================================
+        # CUMULATIVE SPENDING TREND
+        # ========================================
+        cumulative_expense = np.cumsum(daily_expense)
+        cumulative_income = np.cumsum(daily_income)
+        cumulative_data = [
+            {
+                'date': day.strftime('%Y-%m-%d'),
+                'label': day.strftime('%b %d'),
+                'cumulative_expense': expense,
+                'cumulative_income': income,
+                'cumulative_savings': savings
+            }
+            for day, expense, income, savings in zip(
+                (start_date + timedelta(days=offset) for offset in range(days_in_range)),
+                to_major(cumulative_expense), to_major(cumulative_income),
+                to_major(cumulative_income - cumulative_expense),
+            )
+        ]
+
+    # ========================================
+    # SMART INSIGHTS FOR DATE RANGE
+    # ========================================
+    insights = []
+
+    if 'insights' in sections:
+        # Insight 1: Top Spending Category
+        if expense_pie_data:
+            top_cat = expense_pie_data[0]
+            insights.append({
+                'type': 'top_spending',
+                'icon': '🏆',
+                'title': 'Highest Spending Category',
+                'message': f"You spent the most on {top_cat['name']} - {symbol}{top_cat['value']:,.0f} ({top_cat['percentage']:.1f}% of total).",
+                'category': top_cat['name'],
+                'amount': top_cat['value'],
+                'percentage': top_cat['percentage'],
+                'color': top_cat['color'],
+                'severity': 'info'
+            })
+
+        # Insight 2: Savings Analysis
+        if total_income > 0:
+            if net_savings > 0:
+                insights.append({
+                    'type': 'savings_positive',
+                    'icon': '💰',
+                    'title': 'Great Savings!',
+                    'message': f"You saved {symbol}{net_savings:,.0f} in this period ({savings_rate:.1f}% savings rate).",
+                    'amount': float(net_savings),
+                    'rate': float(savings_rate),
+                    'severity': 'success'
+                })
+            else:
+                insights.append({
+                    'type': 'savings_negative',
+                    'icon': '⚠️',
+                    'title': 'Overspending Alert',
+                    'message': f"You spent {symbol}{abs(net_savings):,.0f} more than you earned in this period.",
+                    'amount': float(abs(net_savings)),
+                    'severity': 'danger'
+                })
+
+        # Insight 3: Average Daily Spending
+        insights.append({
+            'type': 'daily_average',
+            'icon': '📊',
+            'title': 'Daily Spending Average',
+            'message': f"You spent an average of {symbol}{avg_daily_expense:,.0f} per day over {days_in_range} days.",
+            'amount': float(avg_daily_expense),
+            'days': days_in_range,
+            'severity': 'info'
+        })
+
+        # Insight 4: Monthly Average
+        if months_in_range >= 1:
+            insights.append({
+                'type': 'monthly_average',
+                'icon': '📅',
+                'title': 'Monthly Average',
+                'message': f"Average monthly spending: {symbol}{avg_monthly_expense:,.0f} | Average monthly income: {symbol}{avg_monthly_income:,.0f}.",
+                'avg_expense': float(avg_monthly_expense),
+                'avg_income': float(avg_monthly_income),
+                'severity': 'info'
+            })
+
+        # Insight 5: Transaction Frequency
+        avg_transactions_per_day = transaction_count / days_in_range if days_in_range > 0 else 0
+        insights.append({
+            'type': 'transaction_frequency',
+            'icon': '🔄',
+            'title': 'Transaction Activity',
+            'message': f"You made {transaction_count} transactions ({income_count} income, {expense_count} expenses) - avg {avg_transactions_per_day:.1f}/day.",
+            'total': transaction_count,
+            'income_count': income_count,
+            'expense_count': expense_count,
+            'avg_per_day': avg_transactions_per_day,
+            'severity': 'info'
+        })
+
+        # Insight 6: Highest Spending Day
+        highest_day = None
+        if expense_count:
+            offset = int(np.argmax(daily_expense))
+            highest_day = {'date': start_date + timedelta(days=offset), 'total': money(daily_expense[offset])}
+
+        if highest_day:
+            insights.append({
+                'type': 'highest_day',
+                'icon': '📆',
+                'title': 'Highest Spending Day',
+                'message': f"Your highest spending day was {highest_day['date'].strftime('%B %d, %Y')} with {symbol}{highest_day['total']:,.0f} spent.",
+                'date': highest_day['date'].strftime('%Y-%m-%d'),
+                'amount': float(highest_day['total']),
+                'severity': 'info'
+            })
+
+        # Insight 7: Category Distribution (if more than 3 categories)
+        if len(expense_pie_data) >= 3:
+            top_3_pct = sum(c['percentage'] for c in expense_pie_data[:3])
+            insights.append({
+                'type': 'category_concentration',
+                'icon': '🎯',
+                'title': 'Spending Concentration',
+                'message': f"Your top 3 categories account for {top_3_pct:.1f}% of all expenses.",
+                'top_3_percentage': top_3_pct,
+                'categories': [c['name'] for c in expense_pie_data[:3]],
+                'severity': 'info'
+            })
+
+    # ========================================
+    # COMPARISON WITH PREVIOUS PERIOD
+    # ========================================
+    if 'previous_period' in reads:
+        # The previous period of the same length
+        prev_end_date = start_date - timedelta(days=1)
+        prev_start_date = prev_end_date - timedelta(days=days_in_range - 1)
+        prev_rows = columns.span(prev_start_date, prev_end_date)
+        prev_income = money(columns.total(prev_rows, INCOME))
+        prev_expenses = money(columns.total(prev_rows, EXPENSE))
+
+        expense_change_pct = float(((total_expenses - prev_expenses) / prev_expenses * 100) if prev_expenses > 0 else 0)
+        income_change_pct = float(((total_income - prev_income) / prev_income * 100) if prev_income > 0 else 0)
+
+        comparison = {
+            'prev_period': {
+                'start_date': prev_start_date.strftime('%Y-%m-%d'),
+                'end_date': prev_end_date.strftime('%Y-%m-%d'),
+                'income': float(prev_income),
+                'expenses': float(prev_expenses),
+            },
+            'expense_change_pct': expense_change_pct,
+            'income_change_pct': income_change_pct,
+            'expense_change_amount': float(total_expenses - prev_expenses),
+            'income_change_amount': float(total_income - prev_income),
+        }
+
+        # Add comparison insight
+        if 'insights' in sections and prev_expenses > 0:
+            if expense_change_pct > 0:
+                insights.append({
+                    'type': 'period_comparison',
+                    'icon': '📈',
+                    'title': 'Spending vs Previous Period',
+                    'message': f"You spent {expense_change_pct:.1f}% more compared to the previous {days_in_range} days.",
+                    'change_pct': expense_change_pct,
+                    'severity': 'warning' if expense_change_pct > 20 else 'info'
+                })
+            else:
+                insights.append({
+                    'type': 'period_comparison',
+                    'icon': '📉',
+                    'title': 'Spending vs Previous Period',
+                    'message': f"Great! You spent {abs(expense_change_pct):.1f}% less compared to the previous {days_in_range} days.",
+                    'change_pct': expense_change_pct,
+                    'severity': 'success'
+                })
+
+    if 'summary' in sections:
+        payload['summary'] = {
+            'total_income': float(total_income),
+            'total_expenses': float(total_expenses),
+            'net_savings': float(net_savings),
+            'savings_rate': float(savings_rate),
+            'transaction_count': transaction_count,
+            'income_count': income_count,
+            'expense_count': expense_count,
+            'avg_daily_expense': float(avg_daily_expense),
+            'avg_daily_income': float(avg_daily_income),
+            'avg_monthly_expense': float(avg_monthly_expense),
+            'avg_monthly_income': float(avg_monthly_income),
+        }
+    if 'charts' in sections:
+        payload['charts'] = {
+            'expense_by_category': expense_pie_data,
+            'income_by_category': income_pie_data,
+            'trend': trend_data,
+            'cumulative': cumulative_data,
+        }
+    if 'insights' in sections:
+        payload['insights'] = insights
+    if 'comparison' in sections:
+        payload['comparison'] = comparison
+    return payload
+
+
+# ============================================
+# BATCHES
+# ============================================
+
+BATCH_MAX_QUERIES = 20
+
+
+def parse_batch(queries, today):
+    """
+    [(key, (start_date, end_date, range_type, range_label), sections)] from a
+    {key: {range, start_date, end_date, sections}} mapping. Raises ValueError
+    with a user-facing message.
+    """
+    if not isinstance(queries, dict) or not queries:
+        raise ValueError('queries must be an object mapping keys to analytics queries.')
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise ValueError(f'At most {BATCH_MAX_QUERIES} queries per batch.')
+    parsed = []
+    for key, query in queries.items():
+        if not isinstance(query, dict):
+            raise ValueError(f'{key}: each query must be an object.')
+        sections = query.get('sections', list(RANGE_SECTIONS))
+        if not isinstance(sections, list) or not isinstance(query.get('range', ''), str):
+            raise ValueError(f'{key}: range must be a string and sections a list.')
+        if not all(isinstance(section, str) for section in sections):
+            raise ValueError(f'{key}: sections must be a list of section names.')
+        unknown = [section for section in sections if section not in RANGE_SECTIONS]
+        if unknown:
+            raise ValueError(f"{key}: unknown sections {', '.join(map(str, unknown))}. "
+                             f"Allowed: {', '.join(RANGE_SECTIONS)}.")
+        try:
+            window = parse_range(query, today)
+        except ValueError as e:
+            raise ValueError(f'{key}: {e}')
+        parsed.append((key, window, sections))
+    return parsed
+
+
+def batch_range_analytics(user, queries):
+    """
+    {key: range payload limited to its sections} for parse_batch() queries,
+    from one transaction query covering every range. Identical ranges are
+    computed once, with the sections any of their queries asked for.
+    """
+    wanted = {}
+    for _, window, sections in queries:
+        wanted.setdefault(window, set()).update(sections)
+    spans = [range_window(start_date, end_date, names) for (start_date, end_date, _, _), names in wanted.items()]
+    columns = load_columns(user, min(start for start, _ in spans), max(end for _, end in spans))
+    payloads = {
+        window: range_analytics(
+            user, *window, columns=columns, sections=[name for name in RANGE_SECTIONS if name in names],
+        )
+        for window, names in wanted.items()
+    }
+    results = {}
+    for key, window, sections in queries:
+        payload = payloads[window]
+        results[key] = {'range': payload['range'], **{section: payload[section] for section in sections}}
+    return results
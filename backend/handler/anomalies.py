@@ -0,0 +1,109 @@
+"""
+Unusual spending alerts from running per-category statistics.
+
+Every (user, category) pair with expenses has a SpendingStats row holding a
+Welford mean and variance over the whole history and an exponentially
+weighted mean and variance that follow recent habits. A new expense is scored
+against the recent statistics before it is folded in, so each create reads
+and writes one row no matter how long the history is; no aggregate over past
+transactions is ever run.
+
+An expense at least ANOMALY_Z_THRESHOLD standard deviations above the recent
+mean, in a category with at least ANOMALY_MIN_SAMPLES earlier expenses, is
+reported as an 'unusual_spending' Notification. Edits and deletes are not
+replayed; ``manage.py seed_spending_stats`` rebuilds all statistics from the
+history in one pass.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+
+from .analytics import currency_for
+from .metrics import UNUSUAL_SPENDING_ALERTS
+from .models import Notification, SpendingStats
+
+# The spread never counts as less than this fraction of the mean, so categories
+# with near-constant amounts (rent, subscriptions) don't alert on small changes
+MIN_SPREAD = 0.25
+
+STAT_FIELDS = ['count', 'mean', 'm2', 'ewma_mean', 'ewma_var']
+
+
+def ewma_alpha():
+    return 2 / (settings.ANOMALY_EWMA_SPAN + 1)
+
+
+def add_amount(stats, amount, alpha):
+    """Fold one amount into the statistics in O(1)."""
+    stats.count += 1
+    delta = amount - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (amount - stats.mean)
+    if stats.count == 1:
+        stats.ewma_mean, stats.ewma_var = amount, 0.0
+    else:
+        diff = amount - stats.ewma_mean
+        increment = alpha * diff
+        stats.ewma_mean += increment
+        stats.ewma_var = (1 - alpha) * (stats.ewma_var + diff * increment)
+
+
+def score(stats, amount):
+    """
+    How many standard deviations the amount lies above the recent mean, or
+    None while the category has too few expenses to judge.
+    """
+    if stats.count < settings.ANOMALY_MIN_SAMPLES:
+        return None
+    spread = max(math.sqrt(stats.ewma_var), stats.ewma_mean * MIN_SPREAD)
+    if spread <= 0:
+        return None
+    return (amount - stats.ewma_mean) / spread
+
+
+def record_expense(expense):
+    """
+    Score a newly created expense against its category's statistics, fold it
+    in and return the Notification created when it is unusual, else None.
+    """
+    if not settings.ANOMALY_DETECTION_ENABLED or expense.type != 'expense' or expense.category_id is None:
+        return None
+    amount = float(expense.amount)
+    first = SpendingStats(user_id=expense.user_id, category_id=expense.category_id)
+    add_amount(first, amount, ewma_alpha())
+    with transaction.atomic():
+        # Concurrent creates in the same category queue on the row lock
+        stats, created = SpendingStats.objects.select_for_update().get_or_create(
+            user_id=expense.user_id, category_id=expense.category_id,
+            defaults={field: getattr(first, field) for field in STAT_FIELDS},
+        )
+        if created:
+            return None
+        z_score = score(stats, amount)
+        usual = stats.ewma_mean
+        add_amount(stats, amount, ewma_alpha())
+        stats.save(update_fields=STAT_FIELDS + ['updated_at'])
+
+    if z_score is None or z_score < settings.ANOMALY_Z_THRESHOLD:
+        return None
+    _, symbol = currency_for(expense.user)
+    category_name = expense.category_name or 'Uncategorized'
+    notification = Notification.objects.create(
+        user_id=expense.user_id,
+        type='unusual_spending',
+        title=f'Unusual spending in {category_name}',
+        message=(
+            f'You spent {symbol}{amount:,.2f} on {category_name}, well above your usual '
+            f'{symbol}{usual:,.2f}.'
+        ),
+        data={
+            'transaction_id': expense.id,
+            'category_id': expense.category_id,
+            'amount': amount,
+            'usual_amount': round(usual, 2),
+            'z_score': round(z_score, 2),
+        },
+    )
+    UNUSUAL_SPENDING_ALERTS.inc()
+    return notification
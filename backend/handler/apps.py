@@ -4,3 +4,30 @@ from django.apps import AppConfig
 class HandlerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'handler'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save, pre_delete
+        from . import insights, recurring, transaction_cache
+        from .instrumentation import install_query_wrapper
+        from .models import Category, Transaction, Budget, category_snapshots_changed, unlink_deleted_category
+        from .slow_queries import install_slow_query_wrapper
+
+        connection_created.connect(install_query_wrapper, dispatch_uid='handler.install_query_wrapper')
+        connection_created.connect(install_slow_query_wrapper, dispatch_uid='handler.install_slow_query_wrapper')
+
+        pre_delete.connect(unlink_deleted_category, sender=Category, dispatch_uid='handler.unlink_deleted_category')
+
+        # Expire cached transaction columns and stored monthly reports on writes
+        for name, signal in (('post_save', post_save), ('post_delete', post_delete)):
+            for module in (transaction_cache, insights):
+                signal.connect(module.transaction_changed, sender=Transaction,
+                               dispatch_uid=f'{module.__name__}.transaction_changed.{name}')
+                signal.connect(module.category_changed, sender=Category,
+                               dispatch_uid=f'{module.__name__}.category_changed.{name}')
+            signal.connect(insights.budget_changed, sender=Budget, dispatch_uid=f'handler.insights.budget_changed.{name}')
+            # Re-detect the subscriptions a written transaction belongs to
+            signal.connect(recurring.transaction_changed, sender=Transaction,
+                           dispatch_uid=f'handler.recurring.transaction_changed.{name}')
+        for module in (transaction_cache, insights):
+            category_snapshots_changed.connect(module.snapshots_changed, dispatch_uid=f'{module.__name__}.snapshots_changed')
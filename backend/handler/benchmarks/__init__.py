@@ -0,0 +1,16 @@
+"""
+Benchmark suites run through ``python manage.py benchmark <suite>``.
+
+Each suite module exposes ``help``, ``add_arguments(parser)`` and
+``run(stdout, **options)``. Register new suites in SUITES.
+"""
+
+SUITES = [
+    'analytics',
+    'compression',
+    'dashboard',
+    'load',
+    'renderers',
+    'serializers',
+    'sqlite_concurrency',
+]
@@ -0,0 +1,70 @@
+"""Per-bucket ORM analytics vs the vectorized engine, with and without the transaction cache."""
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from handler import analytics
+from handler.transaction_cache import columns_cache
+from . import analytics_orm
+from .utils import resolve_user, measure, format_row, summarize, simulated_latency
+
+help = 'Latency and query count of the ORM and NumPy analytics paths'
+
+
+def add_arguments(parser):
+    parser.add_argument('--email', help='User to benchmark (defaults to the busiest user)')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--month', type=int)
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--days', type=int, default=365, help='Length of the date-range payload')
+    parser.add_argument(
+        '--latency-ms', type=float, default=0.0,
+        help='Simulated per-query round trip, standing in for a networked PostgreSQL server'
+    )
+
+
+def _queries(fn):
+    with CaptureQueriesContext(connection) as captured:
+        fn()
+    return len(captured)
+
+
+def run(stdout, email=None, iterations=10, month=None, year=None, days=365, latency_ms=0.0, **options):
+    user = resolve_user(email)
+    today = datetime.now().date()
+    month, year = month or today.month, year or today.year
+    start_date = today - timedelta(days=days - 1)
+
+    cases = [
+        (f'month {month}/{year}',
+         lambda: analytics_orm.month_analytics(user, month, year, today),
+         lambda: analytics.month_analytics(user, month, year, today)),
+        (f'range {days} days',
+         lambda: analytics_orm.range_analytics(user, start_date, today, 'custom', 'Benchmark'),
+         lambda: analytics.range_analytics(user, start_date, today, 'custom', 'Benchmark')),
+    ]
+
+    stdout.write(f'User: {user.email}  simulated latency: {latency_ms} ms/query  iterations: {iterations}')
+    renderer = JSONRenderer()
+    with simulated_latency(latency_ms):
+        for name, orm_path, engine_path in cases:
+            with override_settings(TRANSACTION_CACHE_ENABLED=False):
+                identical = renderer.render(orm_path()) == renderer.render(engine_path())
+                orm_queries, engine_queries = _queries(orm_path), _queries(engine_path)
+                orm_samples = measure(orm_path, iterations)
+                engine_samples = measure(engine_path, iterations)
+            with override_settings(TRANSACTION_CACHE_ENABLED=True):
+                columns_cache.clear()
+                engine_path()
+                cached_queries = _queries(engine_path)
+                cached_samples = measure(engine_path, iterations)
+
+            stdout.write(f'\n{name}')
+            stdout.write(format_row(f'ORM ({orm_queries} queries)', orm_samples))
+            stdout.write(format_row(f'NumPy ({engine_queries} queries)', engine_samples))
+            stdout.write(format_row(f'NumPy, cached ({cached_queries} queries)', cached_samples))
+            speedup = summarize(orm_samples)['p50'] / summarize(engine_samples)['p50']
+            stdout.write(f'p50 speedup: {speedup:.2f}x')
+            stdout.write(f"Payloads identical: {'yes' if identical else 'NO'}")
@@ -0,0 +1,751 @@
+"""
+Per-bucket ORM implementation of the analytics payloads.
+
+This is what AnalyticsView and AnalyticsDateRangeView ran before the
+vectorized engine in handler/analytics.py: one aggregate query per chart
+bucket (per day, week or month), per compared category and per budget. It is
+no longer served and lives with the benchmarks: it is the baseline of
+``benchmark analytics`` and the reference AnalyticsEngineTests checks the
+engine's payloads against.
+"""
+import calendar
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Sum, Count
+
+from handler.analytics import currency_for
+from handler.models import Transaction, Budget
+
+
+def month_analytics(user, selected_month, selected_year, today):
+    """AnalyticsView payload for one month."""
+    # Calculate previous month
+    if selected_month == 1:
+        prev_month = 12
+        prev_month_year = selected_year - 1
+    else:
+        prev_month = selected_month - 1
+        prev_month_year = selected_year
+
+    currency, symbol = currency_for(user)
+
+    # Get all user transactions
+    user_transactions = Transaction.objects.filter(user=user)
+
+    # ========================================
+    # CHART 1: Expense by Category (Pie Chart)
+    # ========================================
+    expense_by_category = user_transactions.filter(
+        type='expense',
+        date__month=selected_month,
+        date__year=selected_year
+    ).values('category_name', 'category_color').annotate(
+        total=Sum('amount')
+    ).order_by('-total')
+
+    expense_pie_data = [
+        {
+            'name': item['category_name'] or 'Uncategorized',
+            'value': float(item['total']),
+            'color': item['category_color'] or '#6366f1'
+        }
+        for item in expense_by_category
+    ]
+
+    # ========================================
+    # CHART 2: Income vs Expense (Bar Chart)
+    # ========================================
+    # Last 6 months data
+    income_vs_expense_data = []
+    for i in range(5, -1, -1):
+        # Calculate month
+        calc_date = datetime(selected_year, selected_month, 1) - relativedelta(months=i)
+        m = calc_date.month
+        y = calc_date.year
+
+        month_income = user_transactions.filter(
+            type='income', date__month=m, date__year=y
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        month_expense = user_transactions.filter(
+            type='expense', date__month=m, date__year=y
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        income_vs_expense_data.append({
+            'month': calendar.month_abbr[m],
+            'year': y,
+            'income': float(month_income),
+            'expense': float(month_expense),
+        })
+
+    # ========================================
+    # CHART 3: Monthly Spending Trend (Line Chart)
+    # ========================================
+    # Daily spending for selected month
+    days_in_month = calendar.monthrange(selected_year, selected_month)[1]
+    daily_spending = []
+    cumulative = Decimal('0')
+
+    for day in range(1, days_in_month + 1):
+        day_expense = user_transactions.filter(
+            type='expense',
+            date__year=selected_year,
+            date__month=selected_month,
+            date__day=day
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        cumulative += day_expense
+        daily_spending.append({
+            'day': day,
+            'expense': float(day_expense),
+            'cumulative': float(cumulative)
+        })
+
+    # ========================================
+    # SMART INSIGHTS
+    # ========================================
+    insights = []
+
+    # Current month totals
+    current_month_expenses = user_transactions.filter(
+        type='expense',
+        date__month=selected_month,
+        date__year=selected_year
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+    current_month_income = user_transactions.filter(
+        type='income',
+        date__month=selected_month,
+        date__year=selected_year
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+    # Previous month totals
+    prev_month_expenses = user_transactions.filter(
+        type='expense',
+        date__month=prev_month,
+        date__year=prev_month_year
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+    prev_month_income = user_transactions.filter(
+        type='income',
+        date__month=prev_month,
+        date__year=prev_month_year
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+    # INSIGHT 1: Highest Spending Category
+    if expense_pie_data:
+        top_category = expense_pie_data[0]
+        total_expenses = sum(item['value'] for item in expense_pie_data)
+        percentage_of_total = (top_category['value'] / total_expenses * 100) if total_expenses > 0 else 0
+
+        insights.append({
+            'type': 'highest_spending',
+            'icon': '🏆',
+            'title': 'Top Spending Category',
+            'message': f"Your highest spending is on {top_category['name']} at {symbol}{top_category['value']:,.0f} ({percentage_of_total:.1f}% of total expenses).",
+            'category': top_category['name'],
+            'amount': top_category['value'],
+            'percentage': percentage_of_total,
+            'color': top_category['color'],
+            'severity': 'info'
+        })
+
+    # INSIGHT 2: Month-to-Month Expense Comparison
+    if prev_month_expenses > 0:
+        expense_change = ((current_month_expenses - prev_month_expenses) / prev_month_expenses * 100)
+        expense_diff = current_month_expenses - prev_month_expenses
+
+        if expense_change > 0:
+            insights.append({
+                'type': 'expense_comparison',
+                'icon': '📈',
+                'title': 'Spending Increase',
+                'message': f"You spent {expense_change:.1f}% more this month compared to last month ({symbol}{abs(expense_diff):,.0f} more).",
+                'change_percentage': float(expense_change),
+                'change_amount': float(expense_diff),
+                'severity': 'warning' if expense_change > 20 else 'info'
+            })
+        else:
+            insights.append({
+                'type': 'expense_comparison',
+                'icon': '📉',
+                'title': 'Spending Decrease',
+                'message': f"Great job! You spent {abs(expense_change):.1f}% less this month compared to last month ({symbol}{abs(expense_diff):,.0f} saved).",
+                'change_percentage': float(expense_change),
+                'change_amount': float(expense_diff),
+                'severity': 'success'
+            })
+    elif current_month_expenses > 0:
+        insights.append({
+            'type': 'expense_comparison',
+            'icon': '📊',
+            'title': 'First Month Tracking',
+            'message': f"You've spent {symbol}{current_month_expenses:,.0f} this month. Keep tracking to see trends!",
+            'severity': 'info'
+        })
+
+    # INSIGHT 3: Income vs Expense Analysis
+    savings = current_month_income - current_month_expenses
+    savings_rate = (savings / current_month_income * 100) if current_month_income > 0 else 0
+
+    if current_month_income > 0:
+        if savings > 0:
+            insights.append({
+                'type': 'savings',
+                'icon': '💰',
+                'title': 'Positive Savings',
+                'message': f"You're saving {symbol}{savings:,.0f} this month ({savings_rate:.1f}% savings rate). Keep it up!",
+                'savings': float(savings),
+                'savings_rate': float(savings_rate),
+                'severity': 'success'
+            })
+        else:
+            insights.append({
+                'type': 'overspending',
+                'icon': '⚠️',
+                'title': 'Overspending Alert',
+                'message': f"You're spending more than you earn! Deficit: {symbol}{abs(savings):,.0f}. Consider reducing expenses.",
+                'deficit': float(abs(savings)),
+                'severity': 'danger'
+            })
+
+    # INSIGHT 4: Category-wise Comparison with Previous Month
+    category_comparisons = []
+    for cat_data in expense_pie_data[:5]:  # Top 5 categories
+        cat_name = cat_data['name']
+        current_cat_expense = cat_data['value']
+
+        # Get previous month expense for same category
+        prev_cat_expense = user_transactions.filter(
+            type='expense',
+            category_name=cat_name,
+            date__month=prev_month,
+            date__year=prev_month_year
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        if prev_cat_expense > 0:
+            change_pct = ((Decimal(str(current_cat_expense)) - prev_cat_expense) / prev_cat_expense * 100)
+            if abs(change_pct) > 15:  # Only show significant changes
+                category_comparisons.append({
+                    'category': cat_name,
+                    'color': cat_data['color'],
+                    'current': current_cat_expense,
+                    'previous': float(prev_cat_expense),
+                    'change_percentage': float(change_pct),
+                    'increased': change_pct > 0
+                })
+
+    # Add category comparison insights
+    for comp in category_comparisons[:3]:  # Top 3 significant changes
+        if comp['increased']:
+            insights.append({
+                'type': 'category_increase',
+                'icon': '🔺',
+                'title': f"{comp['category']} Spending Up",
+                'message': f"You spent {comp['change_percentage']:.1f}% more on {comp['category']} compared to last month.",
+                'category': comp['category'],
+                'change_percentage': comp['change_percentage'],
+                'color': comp['color'],
+                'severity': 'warning' if comp['change_percentage'] > 25 else 'info'
+            })
+        else:
+            insights.append({
+                'type': 'category_decrease',
+                'icon': '🔻',
+                'title': f"{comp['category']} Spending Down",
+                'message': f"You spent {abs(comp['change_percentage']):.1f}% less on {comp['category']} compared to last month.",
+                'category': comp['category'],
+                'change_percentage': comp['change_percentage'],
+                'color': comp['color'],
+                'severity': 'success'
+            })
+
+    # INSIGHT 5: Budget Alerts (if budgets exist)
+    user_budgets = Budget.objects.filter(
+        user=user,
+        month=selected_month,
+        year=selected_year
+    )
+
+    budget_alerts = []
+    for budget in user_budgets:
+        if budget.is_overall:
+            spent = current_month_expenses
+            budget_name = "Overall Budget"
+        elif budget.category:
+            spent = user_transactions.filter(
+                type='expense',
+                category=budget.category,
+                date__month=selected_month,
+                date__year=selected_year
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+            budget_name = budget.category.name
+        else:
+            continue
+
+        if budget.amount > 0:
+            usage_pct = (spent / budget.amount * 100)
+            if usage_pct >= 100:
+                budget_alerts.append({
+                    'type': 'exceeded',
+                    'name': budget_name,
+                    'spent': float(spent),
+                    'budget': float(budget.amount),
+                    'percentage': float(usage_pct)
+                })
+                insights.append({
+                    'type': 'budget_exceeded',
+                    'icon': '🚨',
+                    'title': f'{budget_name} Budget Exceeded',
+                    'message': f"You've exceeded your {budget_name} budget by {symbol}{float(spent - budget.amount):,.0f} ({usage_pct:.1f}% used).",
+                    'severity': 'danger'
+                })
+            elif usage_pct >= budget.alert_threshold:
+                budget_alerts.append({
+                    'type': 'warning',
+                    'name': budget_name,
+                    'spent': float(spent),
+                    'budget': float(budget.amount),
+                    'percentage': float(usage_pct)
+                })
+
+    # INSIGHT 6: Average Daily Spending
+    if current_month_expenses > 0:
+        days_passed = min(today.day, days_in_month) if (selected_month == today.month and selected_year == today.year) else days_in_month
+        avg_daily = current_month_expenses / days_passed if days_passed > 0 else 0
+        projected_monthly = avg_daily * days_in_month
+
+        insights.append({
+            'type': 'daily_average',
+            'icon': '📅',
+            'title': 'Daily Spending Average',
+            'message': f"Your average daily spending is {symbol}{avg_daily:,.0f}. Projected monthly: {symbol}{projected_monthly:,.0f}.",
+            'daily_average': float(avg_daily),
+            'projected_monthly': float(projected_monthly),
+            'severity': 'info'
+        })
+
+    # Summary stats
+    month_name = calendar.month_name[selected_month]
+
+    return {
+        'success': True,
+        'currency': currency,
+        'currency_symbol': symbol,
+        'month': selected_month,
+        'year': selected_year,
+        'month_name': month_name,
+        'summary': {
+            'total_income': float(current_month_income),
+            'total_expenses': float(current_month_expenses),
+            'savings': float(savings),
+            'savings_rate': float(savings_rate),
+            'transaction_count': user_transactions.filter(
+                date__month=selected_month,
+                date__year=selected_year
+            ).count()
+        },
+        'charts': {
+            'expense_by_category': expense_pie_data,
+            'income_vs_expense': income_vs_expense_data,
+            'daily_spending': daily_spending,
+        },
+        'insights': insights,
+        'budget_alerts': budget_alerts,
+        'comparison': {
+            'prev_month_expenses': float(prev_month_expenses),
+            'prev_month_income': float(prev_month_income),
+            'expense_change': float(((current_month_expenses - prev_month_expenses) / prev_month_expenses * 100) if prev_month_expenses > 0 else 0),
+            'income_change': float(((current_month_income - prev_month_income) / prev_month_income * 100) if prev_month_income > 0 else 0),
+        }
+    }
+
+
+def range_analytics(user, start_date, end_date, range_type, range_label):
+    """AnalyticsDateRangeView payload for start_date..end_date (inclusive)."""
+    # Calculate days in range
+    days_in_range = (end_date - start_date).days + 1
+
+    currency, symbol = currency_for(user)
+
+    # Get transactions within date range
+    range_transactions = Transaction.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    )
+
+    # ========================================
+    # SUMMARY STATISTICS
+    # ========================================
+    total_income = range_transactions.filter(type='income').aggregate(
+        total=Sum('amount'))['total'] or Decimal('0')
+
+    total_expenses = range_transactions.filter(type='expense').aggregate(
+        total=Sum('amount'))['total'] or Decimal('0')
+
+    net_savings = total_income - total_expenses
+    savings_rate = (net_savings / total_income * 100) if total_income > 0 else Decimal('0')
+
+    transaction_count = range_transactions.count()
+    income_count = range_transactions.filter(type='income').count()
+    expense_count = range_transactions.filter(type='expense').count()
+
+    # Average per day
+    avg_daily_expense = total_expenses / days_in_range if days_in_range > 0 else Decimal('0')
+    avg_daily_income = total_income / days_in_range if days_in_range > 0 else Decimal('0')
+
+    # Calculate number of months in range (for monthly average)
+    months_in_range = max(1, days_in_range / 30)
+    avg_monthly_expense = total_expenses / Decimal(str(months_in_range))
+    avg_monthly_income = total_income / Decimal(str(months_in_range))
+
+    # ========================================
+    # EXPENSE BY CATEGORY (Pie Chart)
+    # ========================================
+    expense_by_category = range_transactions.filter(type='expense').values(
+        'category_name', 'category_color', 'category_icon'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('-total')
+
+    expense_pie_data = [
+        {
+            'name': item['category_name'] or 'Uncategorized',
+            'value': float(item['total']),
+            'color': item['category_color'] or '#6366f1',
+            'icon': item['category_icon'] or 'FiTag',
+            'count': item['count'],
+            'percentage': float((item['total'] / total_expenses * 100) if total_expenses > 0 else 0)
+        }
+        for item in expense_by_category
+    ]
+
+    # ========================================
+    # INCOME BY CATEGORY (Pie Chart)
+    # ========================================
+    income_by_category = range_transactions.filter(type='income').values(
+        'category_name', 'category_color', 'category_icon'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('-total')
+
+    income_pie_data = [
+        {
+            'name': item['category_name'] or 'Uncategorized',
+            'value': float(item['total']),
+            'color': item['category_color'] or '#10b981',
+            'icon': item['category_icon'] or 'FiTag',
+            'count': item['count'],
+            'percentage': float((item['total'] / total_income * 100) if total_income > 0 else 0)
+        }
+        for item in income_by_category
+    ]
+
+    # ========================================
+    # INCOME VS EXPENSE TREND (Bar/Line Chart)
+    # ========================================
+    trend_data = []
+
+    if days_in_range > 180:  # Group by month for large ranges
+        current = datetime(start_date.year, start_date.month, 1)
+        end_month = datetime(end_date.year, end_date.month, 1)
+
+        while current <= end_month:
+            m_start = current.date()
+            m_end = (current + relativedelta(months=1) - timedelta(days=1)).date()
+            m_end = min(m_end, end_date)
+            m_start = max(m_start, start_date)
+
+            m_income = range_transactions.filter(
+                type='income', date__gte=m_start, date__lte=m_end
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+            m_expense = range_transactions.filter(
+                type='expense', date__gte=m_start, date__lte=m_end
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+            trend_data.append({
+                'label': current.strftime('%b %Y'),
+                'period': current.strftime('%Y-%m'),
+                'income': float(m_income),
+                'expense': float(m_expense),
+                'savings': float(m_income - m_expense)
+            })
+
+            current += relativedelta(months=1)
+    elif days_in_range > 30:  # Group by week
+        current = start_date
+        week_num = 1
+
+        while current <= end_date:
+            w_end = min(current + timedelta(days=6), end_date)
+
+            w_income = range_transactions.filter(
+                type='income', date__gte=current, date__lte=w_end
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+            w_expense = range_transactions.filter(
+                type='expense', date__gte=current, date__lte=w_end
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+            trend_data.append({
+                'label': f"Week {week_num}",
+                'period': f"{current.strftime('%b %d')} - {w_end.strftime('%b %d')}",
+                'income': float(w_income),
+                'expense': float(w_expense),
+                'savings': float(w_income - w_expense)
+            })
+
+            current = w_end + timedelta(days=1)
+            week_num += 1
+    else:  # Group by day
+        current = start_date
+        while current <= end_date:
+            d_income = range_transactions.filter(
+                type='income', date=current
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+            d_expense = range_transactions.filter(
+                type='expense', date=current
+            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+            trend_data.append({
+                'label': current.strftime('%b %d'),
+                'period': current.strftime('%Y-%m-%d'),
+                'income': float(d_income),
+                'expense': float(d_expense),
+                'savings': float(d_income - d_expense)
+            })
+
+            current += timedelta(days=1)
+
+    # ========================================
+    # CUMULATIVE SPENDING TREND
+    # ========================================
+    cumulative_data = []
+    cumulative_expense = Decimal('0')
+    cumulative_income = Decimal('0')
+
+    current = start_date
+    while current <= end_date:
+        d_expense = range_transactions.filter(
+            type='expense', date=current
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        d_income = range_transactions.filter(
+            type='income', date=current
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+        cumulative_expense += d_expense
+        cumulative_income += d_income
+
+        cumulative_data.append({
+            'date': current.strftime('%Y-%m-%d'),
+            'label': current.strftime('%b %d'),
+            'cumulative_expense': float(cumulative_expense),
+            'cumulative_income': float(cumulative_income),
+            'cumulative_savings': float(cumulative_income - cumulative_expense)
+        })
+
+        current += timedelta(days=1)
+
+    # ========================================
+    # SMART INSIGHTS FOR DATE RANGE
+    # ========================================
+    insights = []
+
+    # Insight 1: Top Spending Category
+    if expense_pie_data:
+        top_cat = expense_pie_data[0]
+        insights.append({
+            'type': 'top_spending',
+            'icon': '🏆',
+            'title': 'Highest Spending Category',
+            'message': f"You spent the most on {top_cat['name']} - {symbol}{top_cat['value']:,.0f} ({top_cat['percentage']:.1f}% of total).",
+            'category': top_cat['name'],
+            'amount': top_cat['value'],
+            'percentage': top_cat['percentage'],
+            'color': top_cat['color'],
+            'severity': 'info'
+        })
+
+    # Insight 2: Savings Analysis
+    if total_income > 0:
+        if net_savings > 0:
+            insights.append({
+                'type': 'savings_positive',
+                'icon': '💰',
+                'title': 'Great Savings!',
+                'message': f"You saved {symbol}{net_savings:,.0f} in this period ({savings_rate:.1f}% savings rate).",
+                'amount': float(net_savings),
+                'rate': float(savings_rate),
+                'severity': 'success'
+            })
+        else:
+            insights.append({
+                'type': 'savings_negative',
+                'icon': '⚠️',
+                'title': 'Overspending Alert',
+                'message': f"You spent {symbol}{abs(net_savings):,.0f} more than you earned in this period.",
+                'amount': float(abs(net_savings)),
+                'severity': 'danger'
+            })
+
+    # Insight 3: Average Daily Spending
+    insights.append({
+        'type': 'daily_average',
+        'icon': '📊',
+        'title': 'Daily Spending Average',
+        'message': f"You spent an average of {symbol}{avg_daily_expense:,.0f} per day over {days_in_range} days.",
+        'amount': float(avg_daily_expense),
+        'days': days_in_range,
+        'severity': 'info'
+    })
+
+    # Insight 4: Monthly Average
+    if months_in_range >= 1:
+        insights.append({
+            'type': 'monthly_average',
+            'icon': '📅',
+            'title': 'Monthly Average',
+            'message': f"Average monthly spending: {symbol}{avg_monthly_expense:,.0f} | Average monthly income: {symbol}{avg_monthly_income:,.0f}.",
+            'avg_expense': float(avg_monthly_expense),
+            'avg_income': float(avg_monthly_income),
+            'severity': 'info'
+        })
+
+    # Insight 5: Transaction Frequency
+    avg_transactions_per_day = transaction_count / days_in_range if days_in_range > 0 else 0
+    insights.append({
+        'type': 'transaction_frequency',
+        'icon': '🔄',
+        'title': 'Transaction Activity',
+        'message': f"You made {transaction_count} transactions ({income_count} income, {expense_count} expenses) - avg {avg_transactions_per_day:.1f}/day.",
+        'total': transaction_count,
+        'income_count': income_count,
+        'expense_count': expense_count,
+        'avg_per_day': avg_transactions_per_day,
+        'severity': 'info'
+    })
+
+    # Insight 6: Highest Spending Day
+    highest_day = range_transactions.filter(type='expense').values('date').annotate(
+        total=Sum('amount')
+    ).order_by('-total').first()
+
+    if highest_day:
+        insights.append({
+            'type': 'highest_day',
+            'icon': '📆',
+            'title': 'Highest Spending Day',
+            'message': f"Your highest spending day was {highest_day['date'].strftime('%B %d, %Y')} with {symbol}{highest_day['total']:,.0f} spent.",
+            'date': highest_day['date'].strftime('%Y-%m-%d'),
+            'amount': float(highest_day['total']),
+            'severity': 'info'
+        })
+
+    # Insight 7: Category Distribution (if more than 3 categories)
+    if len(expense_pie_data) >= 3:
+        top_3_pct = sum(c['percentage'] for c in expense_pie_data[:3])
+        insights.append({
+            'type': 'category_concentration',
+            'icon': '🎯',
+            'title': 'Spending Concentration',
+            'message': f"Your top 3 categories account for {top_3_pct:.1f}% of all expenses.",
+            'top_3_percentage': top_3_pct,
+            'categories': [c['name'] for c in expense_pie_data[:3]],
+            'severity': 'info'
+        })
+
+    # ========================================
+    # COMPARISON WITH PREVIOUS PERIOD
+    # ========================================
+    prev_end_date = start_date - timedelta(days=1)
+    prev_start_date = prev_end_date - timedelta(days=days_in_range - 1)
+
+    prev_transactions = Transaction.objects.filter(
+        user=user,
+        date__gte=prev_start_date,
+        date__lte=prev_end_date
+    )
+
+    prev_income = prev_transactions.filter(type='income').aggregate(
+        total=Sum('amount'))['total'] or Decimal('0')
+    prev_expenses = prev_transactions.filter(type='expense').aggregate(
+        total=Sum('amount'))['total'] or Decimal('0')
+
+    expense_change_pct = float(((total_expenses - prev_expenses) / prev_expenses * 100) if prev_expenses > 0 else 0)
+    income_change_pct = float(((total_income - prev_income) / prev_income * 100) if prev_income > 0 else 0)
+
+    comparison = {
+        'prev_period': {
+            'start_date': prev_start_date.strftime('%Y-%m-%d'),
+            'end_date': prev_end_date.strftime('%Y-%m-%d'),
+            'income': float(prev_income),
+            'expenses': float(prev_expenses),
+        },
+        'expense_change_pct': expense_change_pct,
+        'income_change_pct': income_change_pct,
+        'expense_change_amount': float(total_expenses - prev_expenses),
+        'income_change_amount': float(total_income - prev_income),
+    }
+
+    # Add comparison insight
+    if prev_expenses > 0:
+        if expense_change_pct > 0:
+            insights.append({
+                'type': 'period_comparison',
+                'icon': '📈',
+                'title': 'Spending vs Previous Period',
+                'message': f"You spent {expense_change_pct:.1f}% more compared to the previous {days_in_range} days.",
+                'change_pct': expense_change_pct,
+                'severity': 'warning' if expense_change_pct > 20 else 'info'
+            })
+        else:
+            insights.append({
+                'type': 'period_comparison',
+                'icon': '📉',
+                'title': 'Spending vs Previous Period',
+                'message': f"Great! You spent {abs(expense_change_pct):.1f}% less compared to the previous {days_in_range} days.",
+                'change_pct': expense_change_pct,
+                'severity': 'success'
+            })
+
+    return {
+        'success': True,
+        'currency': currency,
+        'currency_symbol': symbol,
+        'range': {
+            'type': range_type,
+            'label': range_label,
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'days': days_in_range,
+        },
+        'summary': {
+            'total_income': float(total_income),
+            'total_expenses': float(total_expenses),
+            'net_savings': float(net_savings),
+            'savings_rate': float(savings_rate),
+            'transaction_count': transaction_count,
+            'income_count': income_count,
+            'expense_count': expense_count,
+            'avg_daily_expense': float(avg_daily_expense),
+            'avg_daily_income': float(avg_daily_income),
+            'avg_monthly_expense': float(avg_monthly_expense),
+            'avg_monthly_income': float(avg_monthly_income),
+        },
+        'charts': {
+            'expense_by_category': expense_pie_data,
+            'income_by_category': income_pie_data,
+            'trend': trend_data,
+            'cumulative': cumulative_data,
+        },
+        'insights': insights,
+        'comparison': comparison,
+    }
@@ -0,0 +1,62 @@
+"""Bytes on the wire and CPU cost of response compression, per endpoint."""
+import time
+
+from django.conf import settings
+from rest_framework.test import APIClient
+
+from handler.middleware import COMPRESSORS, compress
+from .utils import resolve_user
+
+help = 'Compress real API responses with every supported Content-Encoding'
+
+ENDPOINTS = [
+    '/api/dashboard/',
+    '/api/analytics/',
+    '/api/analytics/range/?range=last_1_year',
+    '/api/budgets/overview/',
+    '/api/transactions/',
+    '/api/notifications/',
+    '/api/categories/',
+]
+
+
+def add_arguments(parser):
+    parser.add_argument('--email', help='User to benchmark (defaults to the busiest user)')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--endpoint', action='append', dest='endpoints',
+                        help='Endpoint to include (repeatable, defaults to the main read endpoints)')
+
+
+def _cpu_ms(fn, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) * 1000 / iterations
+
+
+def run(stdout, email=None, iterations=10, endpoints=None, **options):
+    user = resolve_user(email)
+    client = APIClient()
+    client.force_authenticate(user)
+    if 'testserver' not in settings.ALLOWED_HOSTS:
+        settings.ALLOWED_HOSTS.append('testserver')
+
+    stdout.write(f'User: {user.email}  iterations: {iterations}  '
+                 f'min size: {settings.COMPRESSION_MIN_SIZE} B  gzip level: {settings.COMPRESSION_GZIP_LEVEL}  '
+                 f'brotli quality: {settings.COMPRESSION_BROTLI_QUALITY}')
+    header = f"{'endpoint':<42} {'identity':>10}"
+    for coding in COMPRESSORS:
+        header += f" {coding + ' bytes':>11} {'ratio':>6} {'cpu ms':>7}"
+    stdout.write(header)
+
+    for endpoint in endpoints or ENDPOINTS:
+        body = client.get(endpoint, HTTP_ACCEPT_ENCODING='identity').content
+        row = f'{endpoint:<42} {len(body):>10}'
+        for coding in COMPRESSORS:
+            if len(body) < settings.COMPRESSION_MIN_SIZE:
+                row += f" {'skipped':>11} {'':>6} {'':>7}"
+                continue
+            size = len(compress(coding, body))
+            cpu = _cpu_ms(lambda: compress(coding, body), iterations)
+            row += f' {size:>11} {size / len(body):>6.1%} {cpu:>7.2f}'
+        stdout.write(row)
@@ -0,0 +1,42 @@
+"""Sequential DashboardView build vs the concurrent ASGI build."""
+import asyncio
+from datetime import datetime
+
+from rest_framework.renderers import JSONRenderer
+
+from handler.dashboard import DashboardContext, build_dashboard, abuild_dashboard
+from .utils import resolve_user, measure, format_row, summarize, simulated_latency
+
+help = 'Latency of the sequential vs concurrent dashboard build'
+
+
+def add_arguments(parser):
+    parser.add_argument('--email', help='User to benchmark (defaults to the busiest user)')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--month', type=int)
+    parser.add_argument('--year', type=int)
+    parser.add_argument(
+        '--latency-ms', type=float, default=1.0,
+        help='Simulated per-query round trip, standing in for a networked PostgreSQL server'
+    )
+
+
+def run(stdout, email=None, iterations=20, month=None, year=None, latency_ms=1.0, **options):
+    user = resolve_user(email)
+    today = datetime.now().date()
+    ctx = DashboardContext(user, month or today.month, year or today.year, today)
+
+    with simulated_latency(latency_ms):
+        sync_payload = JSONRenderer().render(build_dashboard(ctx))
+        async_payload = JSONRenderer().render(asyncio.run(abuild_dashboard(ctx)))
+
+        sync_samples = measure(lambda: build_dashboard(ctx), iterations)
+        async_samples = measure(lambda: asyncio.run(abuild_dashboard(ctx)), iterations)
+
+    stdout.write(f'User: {user.email}  month: {ctx.selected_month}/{ctx.selected_year}  '
+                 f'simulated latency: {latency_ms} ms/query  iterations: {iterations}')
+    stdout.write(format_row('sequential (DashboardView)', sync_samples))
+    stdout.write(format_row('concurrent (ASGI)', async_samples))
+    speedup = summarize(sync_samples)['p50'] / summarize(async_samples)['p50']
+    stdout.write(f'p50 speedup: {speedup:.2f}x')
+    stdout.write(f"Payloads identical: {'yes' if sync_payload == async_payload else 'NO'}")
@@ -0,0 +1,356 @@
+"""
+End-to-end HTTP load test: a real server, real sockets and realistic user journeys.
+
+Starts gunicorn (WSGI) or uvicorn (ASGI) on a local port against the
+configured database and makes sure a generated dataset exists (users
+loadtest<n>@example.com, created with generate_fake_data). Then --concurrency
+virtual users run for --duration seconds. Each one logs in as a dataset user
+and repeats a journey: dashboard, an analytics range, a transaction create and
+notification count polling, logging in again every --journeys-per-login.
+
+Reports p50/p95/p99 latency and requests/s per step. Results are kept in a
+JSON baseline file, one entry per server/workers/concurrency combination; a
+later run with the same combination fails when total throughput drops, or a
+step's p95 grows, by more than --tolerance, or when any request errors.
+
+    python manage.py benchmark load --workers 4 --save-baseline
+    python manage.py benchmark load --workers 4
+"""
+import http.client
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from handler import recurring, transaction_cache
+from handler.models import Category, Transaction, Notification
+from .utils import percentile, User
+
+help = 'Load test the API over HTTP under gunicorn or uvicorn and compare with a recorded baseline'
+
+DATASET_PREFIX = 'loadtest'
+DATASET_DOMAIN = 'example.com'
+DATASET_PASSWORD = 'password123'
+# Marks the rows the journeys create, so they can be removed after the run
+CREATED_DESCRIPTION = 'Load test purchase'
+ANALYTICS_RANGES = ['last_7_days', 'last_30_days', 'last_3_months', 'last_6_months']
+NOTIFICATION_POLLS = 3
+
+SERVERS = {
+    'gunicorn': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'backend.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+    ],
+    'uvicorn': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'backend.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+        '--no-access-log', '--log-level', 'warning',
+    ],
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--server', choices=sorted(SERVERS), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=8, help='Virtual users running journeys at once')
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='Seconds run before measuring')
+    parser.add_argument('--journeys-per-login', type=int, default=5)
+    parser.add_argument('--dataset-users', type=int, default=20,
+                        help='Generated users to log in as (created when missing)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'load_baselines.json'),
+                        help='JSON file holding the baselines')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Record this run as the baseline for its configuration')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed regression as a fraction (0.15 = 15%%)')
+    parser.add_argument('--output', help='Also write this run\'s results to a JSON file')
+
+
+# ============================================
+# DATASET
+# ============================================
+
+def ensure_dataset(stdout, dataset_users, seed):
+    emails = [f'{DATASET_PREFIX}{i}@{DATASET_DOMAIN}' for i in range(dataset_users)]
+    if User.objects.filter(email__in=emails).count() < dataset_users:
+        stdout.write(f'Generating the load test dataset ({dataset_users} users)...')
+        call_command(
+            'generate_fake_data', users=dataset_users, seed=seed, clear=True,
+            email_prefix=DATASET_PREFIX, email_domain=DATASET_DOMAIN, password=DATASET_PASSWORD,
+            stdout=stdout,
+        )
+    return emails
+
+
+def clean_up(emails, started_at):
+    """
+    Remove the transactions the journeys created and the alerts they raised,
+    then rebuild what those transactions fed: spending statistics, recurring
+    payments and the cached transaction columns and forecasts.
+    """
+    user_ids = list(User.objects.filter(email__in=emails).values_list('pk', flat=True))
+    created = Transaction.objects.filter(user__in=user_ids, description=CREATED_DESCRIPTION)
+    # Raw delete: per-row signals would refresh the same recurring groups over and over
+    created._raw_delete(created.db)
+    Notification.objects.filter(user__in=user_ids, created_at__gte=started_at).delete()
+    today = date.today()
+    for user_id in user_ids:
+        recurring.store_user(user_id, today)
+        transaction_cache.invalidate_user(user_id)
+    call_command('seed_spending_stats', email=emails, stdout=StringIO())
+
+
+# ============================================
+# SERVER
+# ============================================
+
+def start_server(server, port, workers, log):
+    module = 'gunicorn' if server == 'gunicorn' else 'uvicorn'
+    if importlib.util.find_spec(module) is None:
+        raise CommandError(f'{module} is not installed')
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(settings.BASE_DIR), env.get('PYTHONPATH')]))
+    # Run from BASE_DIR so gunicorn picks up gunicorn.conf.py
+    return subprocess.Popen(SERVERS[server](port, workers), cwd=settings.BASE_DIR, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(process, port, log, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise CommandError(f'The server exited during startup:\n{log.read()[-2000:]}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/api/notifications/count/')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'The server did not answer on port {port} within {timeout}s')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# ============================================
+# VIRTUAL USERS
+# ============================================
+
+class VirtualUser(threading.Thread):
+    """Repeats the journey as one dataset user over a keep-alive connection."""
+
+    def __init__(self, port, email, categories, rng, options, clock):
+        super().__init__(daemon=True)
+        self.port = port
+        self.email = email
+        self.categories = categories
+        self.rng = rng
+        self.options = options
+        self.clock = clock
+        self.samples = []  # (step, seconds since start, latency ms, ok)
+        self.token = None
+        self.connection = None
+
+    def request(self, step, method, path, body=None, compressed=True):
+        headers = {'Accept': 'application/json'}
+        if compressed:
+            headers['Accept-Encoding'] = 'br, gzip'
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        start = time.perf_counter()
+        status, payload = 0, b''
+        for attempt in range(2):
+            try:
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                status, payload = response.status, response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+        latency = (time.perf_counter() - start) * 1000
+
+        elapsed = time.perf_counter() - self.clock['start']
+        if self.clock['measure_from'] <= elapsed < self.clock['measure_until']:
+            self.samples.append((step, elapsed, latency, 200 <= status < 300))
+        return status, payload
+
+    def login(self):
+        self.token = None
+        status, payload = self.request('login', 'POST', '/api/auth/login/',
+                                       {'email': self.email, 'password': DATASET_PASSWORD},
+                                       compressed=False)  # the only body that is parsed
+        if status == 200:
+            self.token = json.loads(payload)['tokens']['access']
+
+    def journey(self):
+        self.request('dashboard', 'GET', '/api/dashboard/')
+        self.request('analytics_range', 'GET', f'/api/analytics/range/?range={self.rng.choice(ANALYTICS_RANGES)}')
+        self.request('transaction_create', 'POST', '/api/transactions/', {
+            'category': self.rng.choice(self.categories),
+            'type': 'expense',
+            'amount': f'{self.rng.randint(5000, 300000) / 100:.2f}',
+            'description': CREATED_DESCRIPTION,
+            'payment_method': self.rng.choice(['upi', 'credit_card', 'cash']),
+            'date': date.today().isoformat(),
+        })
+        for _ in range(NOTIFICATION_POLLS):
+            self.request('notification_count', 'GET', '/api/notifications/count/')
+
+    def run(self):
+        journeys = 0
+        while time.perf_counter() - self.clock['start'] < self.clock['measure_until']:
+            if self.token is None or journeys % self.options['journeys_per_login'] == 0:
+                self.login()
+            self.journey()
+            journeys += 1
+        if self.connection is not None:
+            self.connection.close()
+
+
+# ============================================
+# RESULTS & BASELINES
+# ============================================
+
+def summarize_samples(samples, duration):
+    def stats(latencies, errors):
+        return {
+            'count': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / duration, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+        }
+
+    steps = {}
+    for step in sorted({sample[0] for sample in samples}):
+        step_samples = [sample for sample in samples if sample[0] == step]
+        steps[step] = stats([s[2] for s in step_samples], sum(1 for s in step_samples if not s[3]))
+    return {
+        'steps': steps,
+        'total': stats([s[2] for s in samples], sum(1 for s in samples if not s[3])),
+    }
+
+
+def print_results(stdout, results):
+    stdout.write(f"{'step':<20} {'count':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(results['steps'].items()) + [('total', results['total'])]
+    for step, s in rows:
+        stdout.write(f"{step:<20} {s['count']:>7} {s['errors']:>7} {s['rps']:>8.1f} "
+                     f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    if results['total']['errors']:
+        regressions.append(f"{results['total']['errors']} requests failed")
+    base_rps, rps = baseline['total']['rps'], results['total']['rps']
+    if rps < base_rps * (1 - tolerance):
+        regressions.append(f'throughput {rps:.1f} req/s vs baseline {base_rps:.1f} req/s')
+    for step, base in baseline['steps'].items():
+        current = results['steps'].get(step)
+        if current is None:
+            regressions.append(f'{step}: no requests completed')
+        elif current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{step}: p95 {current['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+    return regressions
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run(stdout, server='gunicorn', workers=2, port=8765, concurrency=8, duration=30, warmup=5,
+        journeys_per_login=5, dataset_users=20, seed=42, baseline=None, save_baseline=False,
+        tolerance=0.15, output=None, **options):
+    emails = ensure_dataset(stdout, dataset_users, seed)
+    categories = list(Category.objects.filter(is_default=True, type='expense').values_list('id', flat=True))
+    key = f'{server}-w{workers}-c{concurrency}'
+    started_at = datetime.now(timezone.utc)
+
+    with tempfile.TemporaryFile(mode='w+') as log:
+        process = start_server(server, port, workers, log)
+        try:
+            wait_until_ready(process, port, log)
+            stdout.write(f'{key}: {concurrency} virtual users, {warmup:g}s warmup + {duration:g}s measured')
+            clock = {'start': time.perf_counter(), 'measure_from': warmup, 'measure_until': warmup + duration}
+            users = [
+                VirtualUser(port, emails[i % len(emails)], categories, random.Random(f'{seed}:{i}'),
+                            {'journeys_per_login': journeys_per_login}, clock)
+                for i in range(concurrency)
+            ]
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+        finally:
+            stop_server(process)
+            clean_up(emails, started_at)
+
+    samples = [sample for user in users for sample in user.samples]
+    if not samples:
+        raise CommandError('No requests completed in the measured window')
+    results = summarize_samples(samples, duration)
+    results['config'] = {
+        'server': server, 'workers': workers, 'concurrency': concurrency, 'duration': duration,
+        'dataset_users': dataset_users, 'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+        'recorded_at': started_at.isoformat(),
+    }
+    print_results(stdout, results)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    baselines = load_baselines(baseline)
+    if save_baseline:
+        if results['total']['errors']:
+            raise CommandError(f'{results["total"]["errors"]} requests failed; not saving this run '
+                               f'as the {key} baseline')
+        baselines[key] = results
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        stdout.write(f'Saved as the {key} baseline in {baseline}')
+        return
+    if key not in baselines:
+        stdout.write(f'No {key} baseline in {baseline}; run with --save-baseline to record one')
+        return
+
+    regressions = find_regressions(results, baselines[key], tolerance)
+    if regressions:
+        raise CommandError(f'Regressed past {tolerance:.0%} against the {key} baseline:\n  ' + '\n  '.join(regressions))
+    stdout.write(f'Within {tolerance:.0%} of the {key} baseline')
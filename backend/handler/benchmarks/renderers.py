@@ -0,0 +1,62 @@
+"""Encode/decode cost and size of the API renderers on real payloads."""
+import io
+from datetime import datetime
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from handler.dashboard import DashboardContext, build_dashboard
+from handler.models import Transaction
+from handler.renderers import ORJSONRenderer, ORJSONParser, MessagePackRenderer, MessagePackParser
+from handler.serializers import serialize_transactions
+from handler.views import AnalyticsDateRangeView
+from .utils import resolve_user, measure, format_row, summarize
+
+help = 'JSON (stdlib, orjson) vs MessagePack on dashboard, analytics and list payloads'
+
+
+def add_arguments(parser):
+    parser.add_argument('--email', help='User to benchmark (defaults to the busiest user)')
+    parser.add_argument('--iterations', type=int, default=50)
+
+
+def _analytics_payload(user, range_name):
+    request = APIRequestFactory().get('/api/analytics/range/', {'range': range_name})
+    force_authenticate(request, user=user)
+    return AnalyticsDateRangeView.as_view()(request).data
+
+
+def _compare(stdout, label, payload, iterations):
+    stdlib, orjson_renderer, msgpack_renderer = JSONRenderer(), ORJSONRenderer(), MessagePackRenderer()
+    json_body = orjson_renderer.render(payload)
+    msgpack_body = msgpack_renderer.render(payload)
+
+    stdout.write(f'{label}: json {len(json_body)} bytes, msgpack {len(msgpack_body)} bytes '
+                 f'({len(msgpack_body) / len(json_body):.0%})   '
+                 f"orjson identical to json: {'yes' if stdlib.render(payload) == json_body else 'NO'}")
+    rows = [
+        ('  encode json (stdlib)', measure(lambda: stdlib.render(payload), iterations)),
+        ('  encode json (orjson)', measure(lambda: orjson_renderer.render(payload), iterations)),
+        ('  encode msgpack', measure(lambda: msgpack_renderer.render(payload), iterations)),
+        ('  decode json (orjson)', measure(lambda: ORJSONParser().parse(io.BytesIO(json_body)), iterations)),
+        ('  decode msgpack', measure(lambda: MessagePackParser().parse(io.BytesIO(msgpack_body)), iterations)),
+    ]
+    for row_label, samples in rows:
+        stdout.write(format_row(row_label, samples))
+    speedup = summarize(rows[0][1])['p50'] / summarize(rows[1][1])['p50']
+    stdout.write(f'  orjson p50 speedup over stdlib json: {speedup:.2f}x')
+
+
+def run(stdout, email=None, iterations=50, **options):
+    user = resolve_user(email)
+    today = datetime.now().date()
+    payloads = [
+        ('dashboard', build_dashboard(DashboardContext(user, today.month, today.year, today))),
+        ('analytics (last_1_year)', _analytics_payload(user, 'last_1_year')),
+    ]
+    transactions = serialize_transactions(Transaction.objects.filter(user=user))
+    payloads.append((f'transactions ({len(transactions)} rows)', transactions))
+
+    stdout.write(f'User: {user.email}  iterations: {iterations}')
+    for label, payload in payloads:
+        _compare(stdout, label, payload, iterations)
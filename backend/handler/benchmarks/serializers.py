@@ -0,0 +1,85 @@
+"""ModelSerializer list rendering vs the values_list() fast read path."""
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from handler.models import Category, Transaction, Notification
+from handler.serializers import (
+    TransactionSerializer, NotificationSerializer, serialize_transactions, serialize_notifications,
+)
+from .utils import measure, format_row, summarize, User
+
+help = 'Serialize and render N transactions and notifications with both code paths'
+
+
+def add_arguments(parser):
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def _seed(rows, rng):
+    user = User.objects.create_user(email='serializer-bench@example.com', username='serializer-bench')
+    categories = [
+        Category.objects.create(user=user, name=f'Bench {i}', type='expense', color=f'#00000{i}')
+        for i in range(8)
+    ]
+    payment_methods = [value for value, _ in Transaction.PAYMENT_METHODS]
+    transactions = []
+    for i in range(rows):
+        t = Transaction(
+            user=user,
+            category=rng.choice(categories + [None]),
+            type=rng.choice(['income', 'expense']),
+            amount=f'{rng.randint(1, 5000000) / 100:.2f}',
+            description=f'Bench transaction {i}',
+            payment_method=rng.choice(payment_methods),
+            notes=rng.choice([None, '', 'note']),
+            date=date(2025, 1, 1) + timedelta(days=rng.randint(0, 364)),
+        )
+        t.snapshot_category()
+        transactions.append(t)
+    Transaction.objects.bulk_create(transactions, batch_size=1000)
+
+    notification_types = [value for value, _ in Notification.NOTIFICATION_TYPES]
+    notifications = Notification.objects.bulk_create([
+        Notification(user=user, type=rng.choice(notification_types), title=f'Bench {i}',
+                     message='Benchmark notification', data={'i': i})
+        for i in range(rows)
+    ], batch_size=1000)
+    # Spread ages so every time_ago branch is exercised
+    now = timezone.now()
+    for n in notifications:
+        n.created_at = now - timedelta(seconds=rng.randint(0, 30 * 86400))
+    Notification.objects.bulk_update(notifications, ['created_at'], batch_size=1000)
+    return user
+
+
+def _compare(stdout, label, queryset, serializer_class, fast, iterations):
+    renderer = JSONRenderer()
+    slow_fn = lambda: renderer.render(serializer_class(queryset.iterator(), many=True).data)
+    fast_fn = lambda: renderer.render(fast(queryset))
+
+    identical = slow_fn() == fast_fn()
+    slow_samples = measure(slow_fn, iterations)
+    fast_samples = measure(fast_fn, iterations)
+
+    stdout.write(format_row(f'{label} serializer', slow_samples))
+    stdout.write(format_row(f'{label} fast path', fast_samples))
+    speedup = summarize(slow_samples)['p50'] / summarize(fast_samples)['p50']
+    stdout.write(f"  p50 speedup: {speedup:.2f}x   JSON identical: {'yes' if identical else 'NO'}")
+
+
+def run(stdout, rows=10000, iterations=5, seed=42, **options):
+    # Seed inside a transaction that is rolled back, leaving the database untouched
+    with transaction.atomic():
+        user = _seed(rows, random.Random(seed))
+        stdout.write(f'Rows: {rows}  iterations: {iterations}')
+        _compare(stdout, 'transactions', Transaction.objects.filter(user=user),
+                 TransactionSerializer, serialize_transactions, iterations)
+        _compare(stdout, 'notifications', Notification.objects.filter(user=user),
+                 NotificationSerializer, serialize_notifications, iterations)
+        transaction.set_rollback(True)
@@ -0,0 +1,117 @@
+"""Default SQLite vs the tuned SQLite profile under concurrent reads and writes."""
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction, OperationalError
+
+from .utils import format_row
+
+help = 'Throughput and "database is locked" errors with default vs tuned SQLite'
+
+PROFILES = {
+    'default': {},
+    'tuned': settings.SQLITE_TUNED_OPTIONS,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--writers', type=int, default=4, help='Threads creating transactions')
+    parser.add_argument('--readers', type=int, default=4, help='Threads running dashboard-style aggregates')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rows', type=int, default=20000, help='Rows seeded before the run')
+
+
+def _register(alias, path, options):
+    connections.settings[alias] = connections.configure_settings({
+        DEFAULT_DB_ALIAS: {},
+        alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'OPTIONS': options}
+    })[alias]
+
+
+def _seed(alias, rows):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE bench_tx (id INTEGER PRIMARY KEY, user_id INTEGER, '
+            'type VARCHAR(10), amount DECIMAL, date DATE)'
+        )
+        cursor.execute('CREATE INDEX bench_tx_user ON bench_tx (user_id, date)')
+        cursor.executemany(
+            'INSERT INTO bench_tx (user_id, type, amount, date) VALUES (%s, %s, %s, %s)',
+            [(i % 50, 'expense' if i % 3 else 'income', f'{i % 997}.25', f'2025-{i % 12 + 1:02d}-15')
+             for i in range(rows)]
+        )
+
+
+def _writer(alias, deadline, stats, worker_id):
+    # Mirrors a transaction POST: read the month's spend, then insert
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with transaction.atomic(using=alias):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        'SELECT SUM(amount) FROM bench_tx WHERE user_id = %s AND type = %s',
+                        [worker_id, 'expense']
+                    )
+                    cursor.execute(
+                        'INSERT INTO bench_tx (user_id, type, amount, date) VALUES (%s, %s, %s, %s)',
+                        [worker_id, 'expense', '12.50', '2025-06-15']
+                    )
+            stats['write_ms'].append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            stats['errors'] += 1
+    connections[alias].close()
+
+
+def _reader(alias, deadline, stats, worker_id):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'SELECT type, SUM(amount) FROM bench_tx WHERE user_id = %s GROUP BY type',
+                    [worker_id]
+                )
+                cursor.fetchall()
+            stats['read_ms'].append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            stats['errors'] += 1
+    connections[alias].close()
+
+
+def _run_profile(alias, writers, readers, seconds):
+    stats = {'write_ms': [], 'read_ms': [], 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=_writer, args=(alias, deadline, stats, i)) for i in range(writers)]
+    threads += [threading.Thread(target=_reader, args=(alias, deadline, stats, i)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def run(stdout, writers=4, readers=4, seconds=5.0, rows=20000, **options):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, profile_options in PROFILES.items():
+            alias = f'bench_sqlite_{name}'
+            _register(alias, os.path.join(tmpdir, f'{name}.sqlite3'), profile_options)
+            try:
+                _seed(alias, rows)
+                connections[alias].close()
+                stats = _run_profile(alias, writers, readers, seconds)
+            finally:
+                connections[alias].close()
+                del connections.settings[alias]
+
+            stdout.write(f'[{name}] {writers} writers, {readers} readers, {seconds:.0f}s')
+            stdout.write(f"  writes/s {len(stats['write_ms']) / seconds:9.1f}   "
+                         f"reads/s {len(stats['read_ms']) / seconds:9.1f}   "
+                         f"lock errors {stats['errors']}")
+            if stats['write_ms']:
+                stdout.write('  ' + format_row('write latency', stats['write_ms']))
+            if stats['read_ms']:
+                stdout.write('  ' + format_row('read latency', stats['read_ms']))
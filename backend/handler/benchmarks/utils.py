@@ -0,0 +1,91 @@
+"""Shared helpers for benchmark suites."""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+User = get_user_model()
+
+
+def resolve_user(email=None):
+    """Return the user to benchmark against (defaults to the one with most transactions)."""
+    from django.db.models import Count
+
+    if email:
+        try:
+            return User.objects.get(email=email)
+        except User.DoesNotExist:
+            raise CommandError(f'No user with email {email}')
+    user = User.objects.annotate(n=Count('transactions')).order_by('-n').first()
+    if user is None:
+        raise CommandError('No users found. Run `manage.py generate_fake_data` before benchmarking.')
+    return user
+
+
+def measure(fn, iterations, warmup=1):
+    """Call fn repeatedly and return per-call wall times in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'min': min(samples),
+    }
+
+
+def format_row(label, samples):
+    s = summarize(samples)
+    return f"{label:<28} mean {s['mean']:9.2f} ms   p50 {s['p50']:9.2f} ms   p95 {s['p95']:9.2f} ms   min {s['min']:9.2f} ms"
+
+
+@contextmanager
+def simulated_latency(latency_ms):
+    """
+    Add a fixed network round-trip delay to every query.
+    
+    Stands in for a PostgreSQL server across the network when benchmarking
+    against local SQLite. Applies to connections opened in any thread.
+    """
+    if not latency_ms:
+        yield
+        return
+
+    delay = latency_ms / 1000
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+    for conn in connections.all(initialized_only=True):
+        install(None, conn)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for conn in connections.all(initialized_only=True):
+            if wrapper in conn.execute_wrappers:
+                conn.execute_wrappers.remove(wrapper)
@@ -0,0 +1,33 @@
+"""Cache backends that report hits and misses to the request instrumentation."""
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django.core.cache.backends.redis import RedisCache as BaseRedisCache
+
+from .instrumentation import record_cache
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Counts get() hits and misses for the sampled request (get_many() goes through get())."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            record_cache(misses=1)
+            return default
+        record_cache(hits=1)
+        return value
+
+
+class LocMemCache(InstrumentedCacheMixin, BaseLocMemCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, BaseRedisCache):
+
+    def get_many(self, keys, version=None):
+        # Redis fetches many keys in one round trip instead of calling get()
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
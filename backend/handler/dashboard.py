@@ -0,0 +1,405 @@
+"""
+Dashboard section builders.
+
+The dashboard payload is split into independent sections that only read from
+the database. DashboardView runs them one after another, while the async
+dashboard served from backend/asgi.py runs them concurrently in a thread pool.
+Both paths share assemble_dashboard() so their responses stay identical.
+Amounts are left as Decimals; the JSON renderer encodes them as numbers.
+
+Clients can ask for part of the response with ``include`` / ``exclude``.
+DASHBOARD_RESPONSE_SECTIONS lists which DASHBOARD_SECTIONS (and so which
+queries) each part of the response reads; sections no requested part reads
+are never run.
+"""
+import asyncio
+import calendar
+import weakref
+from datetime import datetime
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import UserProfile, Transaction, Budget
+from .serializers import UserSerializer, serialize_transactions
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def parse_sections(query_params, sections):
+    """
+    The requested names among ``sections``, in their order, from the
+    comma-separated include or exclude query param (all when neither is
+    given). Raises ValueError with a user-facing message.
+    """
+    include, exclude = _names(query_params.get('include')), _names(query_params.get('exclude'))
+    if include and exclude:
+        raise ValueError('Use either include or exclude, not both.')
+    unknown = [name for name in include + exclude if name not in sections]
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(unknown)}. Allowed: {', '.join(sections)}.")
+    if include:
+        return [name for name in sections if name in include]
+    return [name for name in sections if name not in exclude]
+
+
+def parse_selected_month(query_params, today):
+    """Read month/year query params, falling back to the current month."""
+    try:
+        selected_month = int(query_params.get('month', today.month))
+        selected_year = int(query_params.get('year', today.year))
+        # Validate month is 1-12
+        if selected_month < 1 or selected_month > 12:
+            selected_month = today.month
+        # Validate year is reasonable (2020-2030)
+        if selected_year < 2020 or selected_year > 2030:
+            selected_year = today.year
+    except (ValueError, TypeError):
+        selected_month = today.month
+        selected_year = today.year
+    return selected_month, selected_year
+
+
+class DashboardContext:
+    """Request-independent inputs shared by every dashboard section."""
+
+    def __init__(self, user, selected_month, selected_year, today, sections=None):
+        self.user = user
+        self.today = today
+        self.selected_month = selected_month
+        self.selected_year = selected_year
+        # Parts of the response to build, DASHBOARD_RESPONSE_SECTIONS keys
+        self.sections = list(DASHBOARD_RESPONSE_SECTIONS) if sections is None else sections
+        self.is_current_month = (selected_month == today.month and selected_year == today.year)
+
+        # Previous month for comparison
+        if selected_month == 1:
+            self.prev_month = 12
+            self.prev_month_year = selected_year - 1
+        else:
+            self.prev_month = selected_month - 1
+            self.prev_month_year = selected_year
+
+    @property
+    def computed_sections(self):
+        """The DASHBOARD_SECTIONS the requested parts read, in registry order."""
+        needed = {'profile'}.union(*(DASHBOARD_RESPONSE_SECTIONS[name] for name in self.sections))
+        return [name for name in DASHBOARD_SECTIONS if name in needed]
+
+    @property
+    def transactions(self):
+        return Transaction.objects.filter(user=self.user)
+
+    @property
+    def month_transactions(self):
+        return self.transactions.filter(
+            date__month=self.selected_month,
+            date__year=self.selected_year
+        )
+
+
+def _sum(queryset):
+    return queryset.aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+
+def section_profile(ctx):
+    """Serialized user and preferred currency."""
+    user_data = UserSerializer(ctx.user).data
+    try:
+        currency = ctx.user.profile.currency
+    except UserProfile.DoesNotExist:
+        currency = 'INR'
+    return {'user': user_data, 'currency': currency}
+
+
+def section_stats(ctx):
+    """All-time balance, selected/previous month totals and transaction count."""
+    transactions = ctx.transactions
+    total_income_all = _sum(transactions.filter(type='income'))
+    total_expenses_all = _sum(transactions.filter(type='expense'))
+    return {
+        'total_balance': total_income_all - total_expenses_all,
+        'monthly_income': _sum(ctx.month_transactions.filter(type='income')),
+        'monthly_expenses': _sum(ctx.month_transactions.filter(type='expense')),
+        'prev_month_income': _sum(transactions.filter(
+            type='income', date__month=ctx.prev_month, date__year=ctx.prev_month_year
+        )),
+        'prev_month_expenses': _sum(transactions.filter(
+            type='expense', date__month=ctx.prev_month, date__year=ctx.prev_month_year
+        )),
+        'transactions_count': ctx.month_transactions.count(),
+    }
+
+
+def section_today(ctx):
+    """Today's figures, only relevant when viewing the current month."""
+    if not ctx.is_current_month:
+        return {'income': Decimal('0'), 'expenses': Decimal('0'), 'transactions_count': 0}
+    today_transactions = ctx.transactions.filter(date=ctx.today)
+    return {
+        'income': _sum(today_transactions.filter(type='income')),
+        'expenses': _sum(today_transactions.filter(type='expense')),
+        'transactions_count': today_transactions.count(),
+    }
+
+
+def section_recent_transactions(ctx):
+    """Last 10 transactions of the selected month."""
+    return serialize_transactions(ctx.month_transactions[:10])
+
+
+def _category_breakdown(ctx, transaction_type, default_color):
+    breakdown = ctx.month_transactions.filter(type=transaction_type).values(
+        'category_name', 'category_color'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by('-total')
+    return [
+        {
+            'name': item['category_name'] or 'Uncategorized',
+            'value': item['total'],
+            'color': item['category_color'] or default_color
+        }
+        for item in breakdown
+    ]
+
+
+def section_expense_by_category(ctx):
+    return _category_breakdown(ctx, 'expense', '#6366f1')
+
+
+def section_income_by_category(ctx):
+    return _category_breakdown(ctx, 'income', '#10b981')
+
+
+def section_monthly_trend(ctx):
+    """Income and expense per month for the 6 months ending at the selected one."""
+    selected_date = datetime(ctx.selected_year, ctx.selected_month, 1)
+    six_months_ago = selected_date - relativedelta(months=5)
+    last_day = calendar.monthrange(ctx.selected_year, ctx.selected_month)[1]
+
+    monthly_trend = ctx.transactions.filter(
+        date__gte=six_months_ago.date(),
+        date__lte=datetime(ctx.selected_year, ctx.selected_month, last_day).date()
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('month').annotate(
+        income=Sum('amount', filter=Q(type='income')),
+        expense=Sum('amount', filter=Q(type='expense'))
+    ).order_by('month')
+
+    return [
+        {
+            'month': item['month'].strftime('%b %Y') if item['month'] else '',
+            'income': item['income'] or Decimal('0'),
+            'expense': item['expense'] or Decimal('0'),
+        }
+        for item in monthly_trend
+    ]
+
+
+def section_budgets(ctx):
+    """Category budgets with spent amounts, plus the overall budget for the month."""
+    user_budgets = Budget.objects.filter(
+        user=ctx.user,
+        month=ctx.selected_month,
+        year=ctx.selected_year,
+        is_overall=False
+    )
+
+    # Check if budget exists for this month
+    has_budget = user_budgets.exists() or Budget.objects.filter(
+        user=ctx.user,
+        month=ctx.selected_month,
+        year=ctx.selected_year,
+        is_overall=True
+    ).exists()
+
+    budget_overview = []
+    for budget in user_budgets:
+        if budget.category:
+            spent = _sum(ctx.month_transactions.filter(
+                category=budget.category,
+                type='expense'
+            ))
+
+            percentage = (spent / budget.amount * 100) if budget.amount > 0 else Decimal('0')
+            budget_status = 'exceeded' if percentage >= 100 else ('warning' if percentage >= budget.alert_threshold else 'normal')
+
+            budget_overview.append({
+                'id': budget.id,
+                'category': budget.category.name,
+                'category_color': budget.category.color,
+                'budget': budget.amount,
+                'spent': spent,
+                'percentage': percentage,
+                'status': budget_status,
+                'alert_threshold': budget.alert_threshold
+            })
+
+    overall_budget = Budget.objects.filter(
+        user=ctx.user,
+        is_overall=True,
+        month=ctx.selected_month,
+        year=ctx.selected_year
+    ).first()
+
+    return {
+        'has_budget': has_budget,
+        'budget_overview': budget_overview,
+        'overall_budget': overall_budget,
+    }
+
+
+DASHBOARD_SECTIONS = {
+    'profile': section_profile,
+    'stats': section_stats,
+    'today': section_today,
+    'recent_transactions': section_recent_transactions,
+    'expense_by_category': section_expense_by_category,
+    'income_by_category': section_income_by_category,
+    'monthly_trend': section_monthly_trend,
+    'budgets': section_budgets,
+}
+
+# Part of the response: the DASHBOARD_SECTIONS it is built from. The profile
+# (user and currency) is always included.
+DASHBOARD_RESPONSE_SECTIONS = {
+    'stats': ('stats',),
+    'today': ('today',),
+    # Budget usage is measured against the month's expenses
+    'budgets': ('stats', 'budgets'),
+    'expense_by_category': ('expense_by_category',),
+    'income_by_category': ('income_by_category',),
+    'monthly_trend': ('monthly_trend',),
+    'recent_transactions': ('recent_transactions',),
+}
+
+
+def assemble_dashboard(ctx, results):
+    """Combine computed sections into the dashboard response payload, limited to ctx.sections."""
+    sections = ctx.sections
+    dashboard = {}
+    payload = {
+        'success': True,
+        'message': f'Dashboard for {calendar.month_name[ctx.selected_month]} {ctx.selected_year}',
+        'user': results['profile']['user'],
+        'currency': results['profile']['currency'],
+        'selected_month': ctx.selected_month,
+        'selected_year': ctx.selected_year,
+        'is_current_month': ctx.is_current_month,
+    }
+    if 'budgets' in sections:
+        payload['has_budget'] = results['budgets']['has_budget']
+    payload['dashboard'] = dashboard
+
+    if 'stats' in sections or 'budgets' in sections:
+        stats = results['stats']
+        monthly_income = stats['monthly_income']
+        monthly_expenses = stats['monthly_expenses']
+        prev_month_income = stats['prev_month_income']
+        prev_month_expenses = stats['prev_month_expenses']
+
+    if 'stats' in sections:
+        savings = monthly_income - monthly_expenses
+        savings_rate = (savings / monthly_income * 100) if monthly_income > 0 else Decimal('0')
+        income_change = ((monthly_income - prev_month_income) / prev_month_income * 100) if prev_month_income > 0 else Decimal('0')
+        expense_change = ((monthly_expenses - prev_month_expenses) / prev_month_expenses * 100) if prev_month_expenses > 0 else Decimal('0')
+        dashboard.update({
+            # Main stats (total balance is across ALL time)
+            'total_balance': stats['total_balance'],
+            'monthly_income': monthly_income,
+            'monthly_expenses': monthly_expenses,
+            'savings': savings,
+            'savings_rate': savings_rate,
+
+            # Comparison with previous month
+            'income_change': income_change,
+            'expense_change': expense_change,
+        })
+
+    if 'today' in sections:
+        today = results['today']
+        # Today's stats (only for current month)
+        dashboard['today'] = {
+            'income': today['income'],
+            'expenses': today['expenses'],
+            'transactions_count': today['transactions_count'],
+        }
+
+    if 'stats' in sections:
+        # Selected month stats
+        dashboard['this_month'] = {
+            'income': monthly_income,
+            'expenses': monthly_expenses,
+            'transactions_count': stats['transactions_count'],
+        }
+
+    if 'budgets' in sections:
+        budgets = results['budgets']
+        overall_budget = budgets['overall_budget']
+        if overall_budget:
+            monthly_budget = float(overall_budget.amount)
+            budget_used_percentage = (float(monthly_expenses) / monthly_budget * 100) if monthly_budget > 0 else 0
+            overall_status = 'exceeded' if budget_used_percentage >= 100 else ('warning' if budget_used_percentage >= overall_budget.alert_threshold else 'normal')
+        else:
+            monthly_budget = 0
+            budget_used_percentage = 0
+            overall_status = 'normal'
+        dashboard.update({
+            'monthly_budget': monthly_budget,
+            'budget_used_percentage': budget_used_percentage,
+            'overall_status': overall_status,
+            'budget_overview': budgets['budget_overview'],
+        })
+
+    # Charts data, then recent transactions for selected month
+    for name in ('expense_by_category', 'income_by_category', 'monthly_trend', 'recent_transactions'):
+        if name in sections:
+            dashboard[name] = results[name]
+    return payload
+
+
+def build_dashboard(ctx):
+    """Compute the requested dashboard sections sequentially on the current connection."""
+    results = {name: DASHBOARD_SECTIONS[name](ctx) for name in ctx.computed_sections}
+    return assemble_dashboard(ctx, results)
+
+
+# Event loop -> semaphore shared by every async dashboard request on that loop
+_worker_slots = weakref.WeakKeyDictionary()
+
+
+def _run_in_worker(section, ctx):
+    # Worker threads own their DB connection; release it once the section is done
+    try:
+        return section(ctx)
+    finally:
+        close_old_connections()
+
+
+async def _run_section(name, ctx):
+    loop = asyncio.get_running_loop()
+    slots = _worker_slots.get(loop)
+    if slots is None:
+        slots = _worker_slots[loop] = asyncio.Semaphore(settings.ASYNC_DASHBOARD_MAX_THREADS)
+    async with slots:
+        return await sync_to_async(_run_in_worker, thread_sensitive=False)(DASHBOARD_SECTIONS[name], ctx)
+
+
+async def abuild_dashboard(ctx):
+    """
+    Compute the requested dashboard sections concurrently, one worker thread
+    per section, with at most ASYNC_DASHBOARD_MAX_THREADS running at once
+    across all requests.
+    """
+    names = ctx.computed_sections
+    values = await asyncio.gather(*[_run_section(name, ctx) for name in names])
+    return assemble_dashboard(ctx, dict(zip(names, values)))
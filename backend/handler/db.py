@@ -0,0 +1,139 @@
+"""Database helpers shared by views and management commands."""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+from rest_framework.permissions import SAFE_METHODS
+
+
+def stream_queryset(queryset, chunk_size=None):
+    """
+    Iterate a queryset in chunks without caching the results.
+    
+    On PostgreSQL this reads through a named server-side cursor (unless
+    DB_SERVER_SIDE_CURSORS is off); on SQLite it uses fetchmany().
+    """
+    return queryset.iterator(chunk_size=chunk_size or settings.DB_STREAM_CHUNK_SIZE)
+
+
+# ============================================
+# READ REPLICA ROUTING
+# ============================================
+
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class _ReplicaRequestState:
+    """Per-request routing flags shared by the middleware and the router."""
+
+    def __init__(self, request):
+        self.request = request
+        self.use_replica = False
+        self.wrote = False
+        self._pinned = None
+
+    @property
+    def user_id(self):
+        # Only trust a user that authentication has already resolved; touching
+        # the lazy session user here would itself query the database.
+        user = self.request.__dict__.get('user')
+        if user is None or isinstance(user, SimpleLazyObject) or not user.is_authenticated:
+            return None
+        return user.pk
+
+    @property
+    def pinned(self):
+        """Whether the user wrote recently; looked up once per request, as soon as the user is known."""
+        if self._pinned is None:
+            user_id = self.user_id
+            if user_id is None:
+                return False
+            self._pinned = bool(cache.get(_sticky_key(user_id)))
+        return self._pinned
+
+
+def _sticky_key(user_id):
+    return f'db_primary_pin:{user_id}'
+
+
+class ReadReplicaMiddleware:
+    """
+    Enables replica reads for safe requests to views with ``read_replica = True``,
+    or for the methods in their ``read_replica_methods`` (for read-only POSTs).
+    
+    After a request that wrote to the primary, the user's reads are pinned to
+    the primary for REPLICA_STICKY_SECONDS so they always see their own writes.
+    The pin lives in the default cache, which must be shared between workers.
+
+    Works in both sync and async chains. The state is a ContextVar, so async
+    views see it, as do the sync_to_async() threads they query from.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = _ReplicaRequestState(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote and state.user_id is not None:
+            cache.set(_sticky_key(state.user_id), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        state = _ReplicaRequestState(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote and state.user_id is not None:
+            await cache.aset(_sticky_key(state.user_id), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _request_state.get()
+        view_class = getattr(view_func, 'view_class', None)
+        methods = getattr(view_class, 'read_replica_methods', ())
+        read_only = request.method in SAFE_METHODS or request.method in methods
+        if state is not None and read_only and getattr(view_class, 'read_replica', False):
+            state.use_replica = True
+
+
+class ReadReplicaRouter:
+    """Routes reads to DATABASE_REPLICAS when the middleware allows it; writes go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.use_replica or not settings.DATABASE_REPLICAS:
+            return None
+        if state.pinned:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
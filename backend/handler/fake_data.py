@@ -0,0 +1,410 @@
+"""
+Synthetic data for load and scale testing (``manage.py generate_fake_data``).
+
+Each user is generated from its own Random, seeded with the run seed and the
+user's index, so a given seed and end date always produce the same rows no
+matter how many worker processes split the work or in which order they run.
+Rows are written with batched bulk_create(); category snapshots are filled in
+directly, so no per-row queries are issued.
+
+A user's history has:
+- a salary and rent on the first of every month
+- a few subscriptions, charged on a fixed day each month
+- day-to-day expenses drawn from a Poisson process whose rate follows the
+  season (peaking in December) and the weekend
+- occasional extra income
+- budgets derived from what the user actually spent, so some are exceeded and
+  some are near their limit, plus the alerts those budgets would have raised
+"""
+import math
+import random
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+
+from .models import User, UserProfile, Category, Transaction, Budget, Notification
+from .transaction_cache import invalidate_user
+
+# Relative share of day-to-day expenses per default category
+DEFAULT_CATEGORY_MIX = {
+    'Food & Dining': 30,
+    'Transportation': 14,
+    'Shopping': 12,
+    'Entertainment': 7,
+    'Bills & Utilities': 6,
+    'Healthcare': 4,
+    'Education': 2,
+    'Personal Care': 5,
+    'Travel': 3,
+    'Subscriptions': 2,
+    'Other Expense': 5,
+}
+
+# Typical (median) expense amount per category, in major units
+CATEGORY_MEDIAN_AMOUNTS = {
+    'Food & Dining': 350,
+    'Transportation': 180,
+    'Shopping': 1200,
+    'Entertainment': 600,
+    'Bills & Utilities': 1500,
+    'Healthcare': 900,
+    'Education': 2500,
+    'Personal Care': 500,
+    'Rent & Housing': 18000,
+    'Travel': 4500,
+    'Subscriptions': 499,
+    'Other Expense': 400,
+}
+
+DEFAULT_PAYMENT_MIX = {
+    'upi': 35,
+    'credit_card': 20,
+    'debit_card': 15,
+    'cash': 12,
+    'wallet': 8,
+    'net_banking': 5,
+    'bank_transfer': 3,
+    'other': 2,
+}
+
+SUBSCRIPTIONS = [
+    ('Netflix', 649), ('Spotify', 119), ('Amazon Prime', 299), ('YouTube Premium', 129),
+    ('Gym membership', 1500), ('Cloud storage', 130), ('Mobile plan', 399), ('News subscription', 199),
+]
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Ananya', 'Rohan', 'Saanvi', 'Arjun', 'Priya']
+LAST_NAMES = ['Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Nair', 'Singh', 'Das', 'Mehta', 'Khan']
+
+# Weekend days see more discretionary spending
+WEEKEND_FACTOR = 1.3
+
+
+def parse_mix(value, defaults, valid):
+    """
+    Parse ``"name=weight,name=weight"`` into a weights dict based on ``defaults``.
+
+    Listed names override their default weight; a weight of 0 removes the
+    entry. Raises ValueError for unknown names or bad weights.
+    """
+    mix = dict(defaults)
+    if not value:
+        return mix
+    for item in value.split(','):
+        name, sep, weight = item.rpartition('=')
+        name = name.strip()
+        if not sep or name not in valid:
+            raise ValueError(f'Unknown entry {item.strip()!r}; expected one of: {", ".join(sorted(valid))}')
+        weight = float(weight)
+        if weight < 0:
+            raise ValueError(f'Negative weight for {name!r}')
+        if weight:
+            mix[name] = weight
+        else:
+            mix.pop(name, None)
+    if not mix:
+        raise ValueError('The mix must keep at least one entry')
+    return mix
+
+
+class FakeDataSpec:
+    """Options shared by every user of a run (plain values, so workers can receive it)."""
+
+    def __init__(self, seed=42, end_date=None, months=12, density=3.0, seasonality=0.25,
+                 category_mix=None, payment_mix=None, budgets_per_month=4, notifications=20,
+                 email_prefix='fake', email_domain='example.com', password_hash='', batch_size=5000):
+        self.seed = seed
+        self.end_date = end_date or date.today()
+        self.start_date = (self.end_date - relativedelta(months=months)).replace(day=1) + relativedelta(months=1)
+        self.density = density
+        self.seasonality = seasonality
+        self.category_mix = category_mix or dict(DEFAULT_CATEGORY_MIX)
+        self.payment_mix = payment_mix or dict(DEFAULT_PAYMENT_MIX)
+        self.budgets_per_month = budgets_per_month
+        self.notifications = notifications
+        self.email_prefix = email_prefix
+        self.email_domain = email_domain
+        self.password_hash = password_hash
+        self.batch_size = batch_size
+
+    def email(self, index):
+        return f'{self.email_prefix}{index}@{self.email_domain}'
+
+
+def _poisson(rng, lam):
+    # Knuth's method; rates here are small (a handful per day)
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _amount(rng, median, sigma=0.6):
+    """Log-normally distributed amount around ``median``, as a 2-place Decimal."""
+    minor = max(100, round(rng.lognormvariate(math.log(median * 100), sigma)))
+    return Decimal(minor).scaleb(-2)
+
+
+def _round_to(value, step):
+    """Round a Decimal to a multiple of ``step`` (e.g. budgets to the nearest 500)."""
+    return (value / step).to_integral_value() * step
+
+
+def _month_starts(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month += relativedelta(months=1)
+
+
+class UserGenerator:
+    """Builds the unsaved rows of one user from a Random seeded by (seed, index)."""
+
+    def __init__(self, spec, categories):
+        self.spec = spec
+        self.categories = categories
+        self.expense_names = list(spec.category_mix)
+        self.expense_weights = [spec.category_mix[name] for name in self.expense_names]
+        self.payment_methods = list(spec.payment_mix)
+        self.payment_weights = [spec.payment_mix[name] for name in self.payment_methods]
+
+    def rng(self, index, stream):
+        # String seeds hash deterministically (unlike hash() of a tuple)
+        return random.Random(f'{self.spec.seed}:{index}:{stream}')
+
+    def user(self, index):
+        rng = self.rng(index, 'user')
+        return User(
+            email=self.spec.email(index),
+            username=f'{self.spec.email_prefix}{index}',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=self.spec.password_hash,
+            is_verified=True,
+        )
+
+    def _transaction(self, user, category, kind, amount, description, payment_method, day):
+        return Transaction(
+            user_id=user.pk,
+            category_id=category.pk,
+            category_name=category.name,
+            category_icon=category.icon,
+            category_color=category.color,
+            type=kind,
+            amount=amount,
+            description=description,
+            payment_method=payment_method,
+            date=day,
+        )
+
+    def rows(self, user, index):
+        """Return (profile, transactions, budgets, notifications) for a saved user."""
+        spec = self.spec
+        rng = self.rng(index, 'rows')
+
+        salary = Decimal(rng.randrange(30000, 250000, 1000))
+        rent = _round_to(salary * Decimal(rng.uniform(0.15, 0.35)), 100)
+        activity = rng.uniform(0.6, 1.4)  # some users simply transact more than others
+        subscriptions = rng.sample(SUBSCRIPTIONS, rng.randint(1, 4))
+        subscription_days = [rng.randint(1, 28) for _ in subscriptions]
+        profile = UserProfile(
+            user_id=user.pk, currency='INR', monthly_income=salary, monthly_budget=salary * Decimal('0.7'),
+        )
+
+        categories = self.categories
+        transactions = []
+        # (year, month) -> {category name: spent}, for budgets and alerts
+        spent = {}
+        day = spec.start_date
+        while day <= spec.end_date:
+            month_key = (day.year, day.month)
+            month_spent = spent.setdefault(month_key, {})
+            if day.day == 1:
+                transactions.append(self._transaction(
+                    user, categories['Salary'], 'income', salary, 'Salary credit', 'bank_transfer', day,
+                ))
+                transactions.append(self._transaction(
+                    user, categories['Rent & Housing'], 'expense', rent, 'Monthly rent', 'bank_transfer', day,
+                ))
+                month_spent['Rent & Housing'] = month_spent.get('Rent & Housing', 0) + rent
+            for (name, price), charge_day in zip(subscriptions, subscription_days):
+                if day.day == charge_day:
+                    transactions.append(self._transaction(
+                        user, categories['Subscriptions'], 'expense', Decimal(price), name, 'credit_card', day,
+                    ))
+                    month_spent['Subscriptions'] = month_spent.get('Subscriptions', 0) + Decimal(price)
+
+            if rng.random() < 0.04:
+                source = rng.choice(['Freelance', 'Investments', 'Refunds', 'Gifts'])
+                transactions.append(self._transaction(
+                    user, categories[source], 'income', _amount(rng, 4000, 0.9), f'{source} income',
+                    rng.choices(self.payment_methods, self.payment_weights)[0], day,
+                ))
+
+            season = 1 + spec.seasonality * math.cos(2 * math.pi * (day.timetuple().tm_yday - 350) / 365.25)
+            rate = spec.density * activity * season * (WEEKEND_FACTOR if day.weekday() >= 5 else 1)
+            count = _poisson(rng, rate)
+            if count:
+                names = rng.choices(self.expense_names, self.expense_weights, k=count)
+                methods = rng.choices(self.payment_methods, self.payment_weights, k=count)
+                for name, method in zip(names, methods):
+                    amount = _amount(rng, CATEGORY_MEDIAN_AMOUNTS.get(name, 500))
+                    transactions.append(self._transaction(
+                        user, categories[name], 'expense', amount, f'{name} purchase', method, day,
+                    ))
+                    month_spent[name] = month_spent.get(name, 0) + amount
+            day += timedelta(days=1)
+
+        budgets, alerts = self._budgets(rng, user, spent)
+        notifications = self._notifications(rng, user, alerts)
+        return profile, transactions, budgets, notifications
+
+    def _budgets(self, rng, user, spent):
+        """Budgets set around what was actually spent; returns (budgets, alerts)."""
+        budgets, alerts = [], []
+        if not self.spec.budgets_per_month:
+            return budgets, alerts
+        categories = self.categories
+        for month in _month_starts(self.spec.start_date, self.spec.end_date):
+            month_spent = spent.get((month.year, month.month), {})
+            total = sum(month_spent.values(), Decimal('0'))
+            overall = Budget(
+                user_id=user.pk, month=month.month, year=month.year, is_overall=True,
+                amount=max(Decimal('1000'), _round_to(total * Decimal(rng.uniform(0.95, 1.4)), 500)),
+            )
+            budgets.append(overall)
+            alerts.append((month, 'Overall Monthly Budget', overall, total))
+
+            top = sorted(month_spent, key=month_spent.get, reverse=True)[:self.spec.budgets_per_month]
+            for name in top:
+                budget = Budget(
+                    user_id=user.pk, category=categories[name], month=month.month, year=month.year,
+                    amount=max(Decimal('500'), _round_to(month_spent[name] * Decimal(rng.uniform(0.8, 1.6)), 100)),
+                    alert_threshold=rng.choice([70, 80, 90]),
+                )
+                budgets.append(budget)
+                alerts.append((month, f'{name} Budget', budget, month_spent[name]))
+        return budgets, alerts
+
+    def _notifications(self, rng, user, alerts):
+        """Alerts the budgets would have raised, newest first, topped up with reminders."""
+        notifications = []
+        for month, budget_name, budget, month_spent in reversed(alerts):
+            if len(notifications) >= self.spec.notifications:
+                break
+            percentage = month_spent / budget.amount * 100
+            if percentage >= 100:
+                kind, title = 'budget_exceeded', f'{budget_name} Exceeded!'
+            elif percentage >= budget.alert_threshold:
+                kind, title = 'budget_warning', f'{budget_name} Near Limit'
+            else:
+                continue
+            notifications.append(Notification(
+                user_id=user.pk, type=kind, title=title,
+                message=f'You have used {percentage:.1f}% of your {budget_name}.',
+                # The budget is not saved yet; generate_users() swaps in its id
+                data={'budget_id': budget, 'spent': float(month_spent), 'budget_amount': float(budget.amount),
+                      'percentage': float(percentage)},
+                email_sent=True,
+            ))
+            notifications[-1].created_at = self._moment(rng, month, min(month + relativedelta(months=1, days=-1),
+                                                                        self.spec.end_date))
+        while len(notifications) < self.spec.notifications:
+            notifications.append(Notification(
+                user_id=user.pk, type='reminder', title='Log your expenses',
+                message="Don't forget to record today's spending.",
+            ))
+            notifications[-1].created_at = self._moment(rng, self.spec.start_date, self.spec.end_date)
+        cutoff = datetime.combine(self.spec.end_date - timedelta(days=7), time(), tzinfo=dt_timezone.utc)
+        for notification in notifications:
+            notification.is_read = notification.created_at < cutoff and rng.random() < 0.9
+        return notifications
+
+    @staticmethod
+    def _moment(rng, start, end):
+        day = start + timedelta(days=rng.randint(0, max(0, (end - start).days)))
+        return datetime.combine(day, time(rng.randint(7, 22), rng.randint(0, 59)), tzinfo=dt_timezone.utc)
+
+
+def load_categories(spec):
+    """Default categories by name; raises ValueError if the mix names a missing one."""
+    categories = {c.name: c for c in Category.objects.filter(is_default=True, user__isnull=True)}
+    required = set(spec.category_mix) | {'Salary', 'Rent & Housing', 'Subscriptions',
+                                         'Freelance', 'Investments', 'Refunds', 'Gifts'}
+    missing = required - categories.keys()
+    if missing:
+        raise ValueError(f'Missing default categories: {", ".join(sorted(missing))}')
+    return categories
+
+
+def generate_users(spec, indexes):
+    """
+    Generate and save the users with the given indexes; returns row counts.
+
+    Users are saved first (bulk_create returns their ids), then their rows are
+    buffered and flushed in batches of ``spec.batch_size``, one atomic block per
+    flush.
+    """
+    generator = UserGenerator(spec, load_categories(spec))
+    counts = {'users': 0, 'transactions': 0, 'budgets': 0, 'notifications': 0}
+    buffers = {UserProfile: [], Transaction: [], Budget: [], Notification: []}
+
+    def flush():
+        with transaction.atomic():
+            # Budgets before notifications: alerts reference budget ids
+            for model in (UserProfile, Transaction, Budget):
+                model.objects.bulk_create(buffers[model], batch_size=spec.batch_size)
+            for notification in buffers[Notification]:
+                budget = notification.data.get('budget_id')
+                if isinstance(budget, Budget):
+                    notification.data['budget_id'] = budget.pk
+                    notification.data['category_id'] = budget.category_id
+            # auto_now_add overwrites created_at on insert; put the generated times back
+            created_at = [notification.created_at for notification in buffers[Notification]]
+            created = Notification.objects.bulk_create(buffers[Notification], batch_size=spec.batch_size)
+            for notification, moment in zip(created, created_at):
+                notification.created_at = moment
+            Notification.objects.bulk_update(created, ['created_at'], batch_size=spec.batch_size)
+        counts['transactions'] += len(buffers[Transaction])
+        counts['budgets'] += len(buffers[Budget])
+        counts['notifications'] += len(buffers[Notification])
+        for rows in buffers.values():
+            rows.clear()
+
+    indexes = list(indexes)
+    users = User.objects.bulk_create([generator.user(index) for index in indexes], batch_size=spec.batch_size)
+    counts['users'] = len(users)
+    for user, index in zip(users, indexes):
+        profile, transactions, budgets, notifications = generator.rows(user, index)
+        buffers[UserProfile].append(profile)
+        buffers[Transaction].extend(transactions)
+        buffers[Budget].extend(budgets)
+        buffers[Notification].extend(notifications)
+        if len(buffers[Transaction]) >= spec.batch_size:
+            flush()
+    flush()
+    return counts
+
+
+def delete_users(users):
+    """
+    Delete the users of a queryset and everything they own; returns how many.
+
+    Transaction and Budget rows have delete receivers (report expiry, cache
+    stamps, subscription refresh), so a plain delete() would load every row
+    and queue work per row. They are removed with raw deletes instead and each
+    user's cached columns are expired once. The other relations, stored
+    reports included, go through the regular cascade without loading rows.
+    """
+    user_ids = list(users.values_list('pk', flat=True))
+    with transaction.atomic():
+        for model in (Transaction, Budget):
+            rows = model.objects.filter(user__in=users.values('pk'))
+            rows._raw_delete(rows.db)
+        for user_id in user_ids:
+            invalidate_user(user_id)
+        users.delete()
+    return len(user_ids)
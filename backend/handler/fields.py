@@ -0,0 +1,45 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models
+
+
+def to_minor_units(value, decimal_places=2):
+    """Convert a major-unit amount (e.g. Decimal('12.34')) to integer minor units (1234)."""
+    return int((Decimal(value) * 10 ** decimal_places).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(value, decimal_places=2):
+    """Convert integer minor units (1234) back to an exact Decimal ('12.34')."""
+    if isinstance(value, float):
+        value = Decimal(repr(value))
+    return Decimal(value).scaleb(-decimal_places)
+
+
+class MinorUnitField(models.DecimalField):
+    """
+    Money amount stored as a 64-bit integer count of minor units (paise/cents).
+
+    In Python the value is a Decimal with ``decimal_places`` digits, exactly as
+    with DecimalField, so models, serializers and forms are unchanged. In the
+    database the column is a bigint, so SUM() and friends run on integers and
+    come back through from_db_value() as exact Decimals.
+    """
+
+    def get_internal_type(self):
+        return 'BigIntegerField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return from_minor_units(value, self.decimal_places)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return to_minor_units(value, self.decimal_places)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        return value
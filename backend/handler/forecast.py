@@ -0,0 +1,167 @@
+"""
+Month-end spending forecasts for budgets.
+
+All of a user's forecasts for a month come from one TransactionColumns load
+covering the month and the HISTORY_MONTHS before it. The expenses are split in
+two:
+
+* Recurring payments: a category and exact amount seen in at least
+  RECURRING_MIN_MONTHS of the history months, at most RECURRING_MAX_PER_MONTH
+  times a month (rent, subscriptions, EMIs). The ones that have not posted yet
+  this month are expected in full.
+* Everything else, summed per day and category into one matrix with a single
+  bincount. Each row's daily run-rate is its exponentially smoothed level
+  (SMOOTHING per day, so recent days weigh most), computed for every category
+  at once as one weighted sum over the days observed so far.
+
+The projected month-end total is what has been spent, plus the run-rate over
+the days left, plus the pending recurring payments. Closed months project to
+what was spent.
+
+Projections only depend on transactions, so they are cached per user and
+month in the default cache, checked against the transaction_cache version
+stamps that every transaction or category write bumps. Budget amounts are
+applied when reading, so budget writes never make them stale.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+
+from . import transaction_cache
+from .analytics import EXPENSE, day_number, load_columns, to_major
+
+HISTORY_MONTHS = 3
+RECURRING_MIN_MONTHS = 2
+RECURRING_MAX_PER_MONTH = 5  # weekly
+# Smoothing factor of the daily level; about the last 10 days carry most weight
+SMOOTHING = 0.1
+
+# Key of the all-expenses projection, used by the overall budget
+OVERALL = 'overall'
+
+
+def _cache_key(user_id, month_start, today):
+    return f'budget_forecast:{user_id}:{month_start.isoformat()}:{today.isoformat()}'
+
+
+def month_projections(user, selected_month, selected_year, today):
+    """
+    Projections of one month, cached until the user's transactions change:
+    {'projections': {category id or OVERALL: (spent, projected, daily rate,
+    pending recurring) in minor units}, 'days_remaining': days left}.
+    """
+    month_start = date(selected_year, selected_month, 1)
+    key = _cache_key(user.pk, month_start, today)
+    stamps = transaction_cache.current_stamps(user.pk)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamps:
+        return cached[1]
+    result = compute_projections(user, month_start, today)
+    cache.set(key, (stamps, result), settings.FORECAST_CACHE_TTL)
+    return result
+
+
+def compute_projections(user, month_start, today):
+    """month_projections() without the cache."""
+    month_end = month_start + relativedelta(months=1) - timedelta(days=1)
+    history_start = month_start - relativedelta(months=HISTORY_MONTHS)
+    if today >= month_end:
+        observed_end, days_remaining = month_end, 0
+    elif today >= month_start:
+        observed_end, days_remaining = today, (month_end - today).days
+    else:
+        observed_end, days_remaining = min(today, month_start - timedelta(days=1)), month_end.day
+    observed_days = max((observed_end - history_start).days + 1, 0)
+
+    columns = load_columns(user, history_start, month_end)
+    rows = columns.span(history_start, month_end)
+    expense = columns.types[rows] == EXPENSE
+    days = columns.days[rows][expense] - day_number(history_start)
+    amounts = columns.amounts[rows][expense]
+    categories = columns.categories[rows][expense]
+
+    month_edges = [day_number(history_start + relativedelta(months=i)) - day_number(history_start)
+                   for i in range(HISTORY_MONTHS + 1)]
+    months = np.searchsorted(month_edges, days, side='right') - 1
+    in_history = months < HISTORY_MONTHS
+
+    # Recurring payments: (category, amount) pairs present in enough history months,
+    # and few times a month; same-priced everyday spending stays in the run-rate
+    pairs, pair_codes = np.unique(np.stack([categories, amounts]), axis=1, return_inverse=True)
+    pair_codes = pair_codes.reshape(-1)
+    pair_months = np.unique(pair_codes[in_history] * HISTORY_MONTHS + months[in_history])
+    months_present = np.bincount(pair_months // HISTORY_MONTHS, minlength=pairs.shape[1])
+    seen_in_history = np.bincount(pair_codes[in_history], minlength=pairs.shape[1])
+    per_month = np.rint(seen_in_history / np.maximum(months_present, 1))
+    recurring_pairs = (months_present >= RECURRING_MIN_MONTHS) & (per_month <= RECURRING_MAX_PER_MONTH)
+    recurring = recurring_pairs[pair_codes]
+
+    if days_remaining:
+        # Expected occurrences per month, less the ones already seen this month
+        seen_this_month = np.bincount(pair_codes[~in_history], minlength=pairs.shape[1])
+        pending = np.where(recurring_pairs, np.maximum(per_month - seen_this_month, 0), 0) * pairs[1]
+    else:
+        pending = np.zeros(pairs.shape[1], dtype=np.int64)
+
+    # Daily totals of the non-recurring expenses, one row per category
+    category_ids, category_codes = np.unique(categories, return_inverse=True)
+    steady = ~recurring & (days < observed_days)
+    daily = np.bincount(
+        category_codes[steady] * observed_days + days[steady], weights=amounts[steady],
+        minlength=len(category_ids) * observed_days,
+    ).reshape(len(category_ids), observed_days)
+
+    # Simple exponential smoothing from the mean of the observed days, as one weighted sum
+    levels = np.zeros(len(category_ids))
+    if observed_days:
+        decay = (1 - SMOOTHING) ** np.arange(observed_days - 1, -1, -1)
+        levels = daily.mean(axis=1) * (1 - SMOOTHING) ** observed_days + daily @ (SMOOTHING * decay)
+
+    in_month = months == HISTORY_MONTHS
+    spent = np.bincount(category_codes[in_month], weights=amounts[in_month], minlength=len(category_ids))
+    pending_by_category = np.bincount(
+        np.searchsorted(category_ids, pairs[0]), weights=pending, minlength=len(category_ids),
+    )
+    projected = spent + np.rint(levels * days_remaining) + pending_by_category
+
+    # (spent, projected, daily rate, pending recurring) per category, and for all of them
+    series = np.rint(np.stack([spent, projected, levels, pending_by_category])).astype(np.int64)
+    projections = dict(zip(category_ids.tolist(), map(tuple, series.T.tolist())))
+    projections[OVERALL] = tuple(series.sum(axis=1).tolist())
+    return {'projections': projections, 'days_remaining': days_remaining}
+
+
+# ============================================
+# BUDGETS
+# ============================================
+
+def budget_projection(budget, result):
+    """(spent, projected, daily rate, pending recurring) of the expenses a budget covers."""
+    key = OVERALL if budget.is_overall else budget.category_id
+    return result['projections'].get(key, (0, 0, 0, 0))
+
+
+def budget_forecast(budget, result):
+    """Forecast fields of one budget, from month_projections()."""
+    _, projected, daily_rate, recurring = budget_projection(budget, result)
+    projected, daily_rate, recurring = to_major(np.array([projected, daily_rate, recurring]))
+    amount = float(budget.amount)
+    percentage = projected / amount * 100 if amount > 0 else 0
+    if percentage >= 100:
+        projected_status = 'exceeded'
+    elif percentage >= budget.alert_threshold:
+        projected_status = 'warning'
+    else:
+        projected_status = 'normal'
+    return {
+        'projected': projected,
+        'projected_remaining': round(amount - projected, 2),
+        'projected_percentage': percentage,
+        'projected_status': projected_status,
+        'daily_rate': daily_rate,
+        'recurring_pending': recurring,
+        'days_remaining': result['days_remaining'],
+    }
@@ -0,0 +1,172 @@
+"""
+Precomputed analytics reports for closed months.
+
+A closed month's AnalyticsView payload only changes when its history is
+edited, so ``manage.py precompute_insights`` (run nightly) computes it once per
+user and stores it as a MonthlyReport. AnalyticsView serves the stored payload
+for closed months and computes the current month live.
+
+The report of month M reads the transactions of M and the five months before
+it (the income vs expense chart), M's budgets and the category snapshots on
+the transactions. A write to any of those deletes the affected reports once it
+commits; the month is computed live until the next run stores it again.
+Reports are only served when they were stored in the user's current currency.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .analytics import MONTH_SECTIONS, currency_for, month_analytics, month_window, query_columns
+from .models import User, Transaction, Budget, MonthlyReport
+
+# A month's report reads transactions from itself and the 5 months before it
+CHART_MONTHS = 6
+
+
+def month_index(year, month):
+    return year * 12 + month - 1
+
+
+def closed_months(today, count):
+    """The last ``count`` closed months as (month, year), oldest first."""
+    current = month_index(today.year, today.month)
+    return [(index % 12 + 1, index // 12) for index in range(current - count, current)]
+
+
+def _reports_between(first_index, last_index):
+    """MonthlyReport queryset for the months first_index..last_index (month_index values)."""
+    return MonthlyReport.objects.alias(index=F('year') * 12 + F('month') - 1).filter(
+        index__gte=first_index, index__lte=last_index,
+    )
+
+
+# ============================================
+# SERVING
+# ============================================
+
+def stored_month_analytics(user, selected_month, selected_year, today):
+    """The stored payload of a closed month, or None when it has to be computed live."""
+    if not settings.MONTHLY_REPORTS_ENABLED:
+        return None
+    if month_index(selected_year, selected_month) >= month_index(today.year, today.month):
+        return None
+    payload = MonthlyReport.objects.filter(
+        user=user, month=selected_month, year=selected_year,
+    ).values_list('payload', flat=True).first()
+    if payload is None or payload['currency'] != currency_for(user)[0]:
+        return None
+    return payload
+
+
+def month_payload(user, selected_month, selected_year, today, sections=None):
+    """
+    AnalyticsView payload: stored for closed months when available, otherwise
+    computed. ``sections`` limits it to those MONTH_SECTIONS.
+    """
+    payload = stored_month_analytics(user, selected_month, selected_year, today)
+    if payload is None:
+        return month_analytics(user, selected_month, selected_year, today, sections=sections)
+    if sections is not None:
+        payload = {key: value for key, value in payload.items() if key not in MONTH_SECTIONS or key in sections}
+    return payload
+
+
+# ============================================
+# PRECOMPUTING
+# ============================================
+
+def compute_reports(user_ids, months, today, force=False):
+    """
+    Compute and store the reports of ``months`` ((month, year) pairs) for the users.
+
+    Reports that already exist are kept unless ``force``. Each user's
+    transactions for all the months are read in one query and the batch's
+    budgets in another. Returns the number of reports written.
+    """
+    indexes = [month_index(year, month) for month, year in months]
+    first, last = min(indexes), max(indexes)
+    existing = set()
+    if not force:
+        existing = set(_reports_between(first, last).filter(user_id__in=user_ids).values_list('user_id', 'year', 'month'))
+
+    budgets = defaultdict(list)
+    for budget in Budget.objects.filter(user_id__in=user_ids).alias(
+        index=F('year') * 12 + F('month') - 1,
+    ).filter(index__gte=first, index__lte=last).select_related('category').order_by('pk'):
+        budgets[(budget.user_id, budget.year, budget.month)].append(budget)
+
+    window_start = month_window(first % 12 + 1, first // 12)[0]
+    window_end = month_window(last % 12 + 1, last // 12)[1]
+    reports = []
+    for user in User.objects.filter(pk__in=user_ids).select_related('profile'):
+        pending = [(month, year) for month, year in months if (user.pk, year, month) not in existing]
+        if not pending:
+            continue
+        columns = query_columns(user, window_start, window_end)
+        for month, year in pending:
+            payload = month_analytics(
+                user, month, year, today, columns=columns, budgets=budgets[(user.pk, year, month)],
+            )
+            reports.append(MonthlyReport(user=user, month=month, year=year, payload=payload))
+
+    MonthlyReport.objects.bulk_create(
+        reports, update_conflicts=True,
+        unique_fields=['user', 'year', 'month'], update_fields=['payload', 'computed_at'],
+    )
+    return len(reports)
+
+
+# ============================================
+# INVALIDATION (receivers connected in apps.py)
+# ============================================
+
+def expire_reports(user_id, first_index, last_index):
+    """Delete the user's reports of months first_index..last_index once the current transaction commits."""
+    reports = _reports_between(first_index, last_index)
+    if user_id is not None:
+        reports = reports.filter(user_id=user_id)
+    transaction.on_commit(reports.delete)
+
+
+def _expire_closed(user_id, first_index, last_index):
+    """expire_reports() limited to closed months; open months are never stored."""
+    today = datetime.now().date()
+    last_index = min(last_index, month_index(today.year, today.month) - 1)
+    if first_index <= last_index:
+        expire_reports(user_id, first_index, last_index)
+
+
+def transaction_changed(sender, instance, **kwargs):
+    """post_save / post_delete receiver for Transaction: back-dated writes expire reports."""
+    date_field = Transaction._meta.get_field('date')
+    for value in {instance.date, getattr(instance, 'loaded_date', None)}:
+        if value is None:
+            continue
+        day = date_field.to_python(value)
+        index = month_index(day.year, day.month)
+        # This month's report and the next 5 months' charts read the transaction
+        _expire_closed(instance.user_id, index, index + CHART_MONTHS - 1)
+
+
+def budget_changed(sender, instance, **kwargs):
+    """post_save / post_delete receiver for Budget: the budget alerts of its month change."""
+    for year, month in {(instance.year, instance.month), getattr(instance, 'loaded_period', (None, None))}:
+        if year is not None and month is not None:
+            index = month_index(int(year), int(month))
+            _expire_closed(instance.user_id, index, index)
+
+
+def category_changed(sender, instance, created=False, **kwargs):
+    """post_save / post_delete receiver for Category: reports show its name and color."""
+    if not created:
+        # Default categories (no user) appear in every user's reports
+        expire_reports(instance.user_id, 0, month_index(9999, 12))
+
+
+def snapshots_changed(sender, user_ids, **kwargs):
+    """category_snapshots_changed receiver."""
+    for user_id in ({None} if None in user_ids else user_ids):
+        expire_reports(user_id, 0, month_index(9999, 12))
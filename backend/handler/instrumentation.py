@@ -0,0 +1,151 @@
+"""
+Per-request instrumentation.
+
+RequestMetricsMiddleware attaches a RequestMetrics to the current context for
+a sample of requests. While it is set, the database execute wrapper, the cache
+backends in handler/cache.py, the serializers and the renderers add to it.
+Unsampled requests only count their queries for the Prometheus histograms,
+with a QueryCounter: no timing and no lock. When neither is set every hook is
+a ContextVar lookup.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_metrics = ContextVar('request_metrics', default=None)
+_current_request = ContextVar('current_request', default=None)
+_current_counter = ContextVar('query_counter', default=None)
+
+
+class RequestMetrics:
+    """Timings and counters collected while serving one request."""
+
+    def __init__(self):
+        self.view_name = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Async dashboard sections report from several worker threads at once
+        self._lock = threading.Lock()
+
+    def add(self, field, amount):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def record_query(self, elapsed):
+        with self._lock:
+            self.queries += 1
+            self.db_time += elapsed
+
+
+class QueryCounter:
+    """Queries issued by an unsampled request."""
+
+    def __init__(self):
+        # next() on itertools.count is atomic, so worker threads can share it without a lock
+        self._calls = itertools.count()
+
+    def record_query(self):
+        next(self._calls)
+
+    def total(self):
+        """Number of queries recorded; read once, after the request."""
+        return next(self._calls)
+
+
+@contextmanager
+def track_request(request):
+    """Make the request being served visible to DB hooks (see current_view_name())."""
+    token = _current_request.set(request)
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+def current_view_name():
+    """URL view name of the request being served, or None outside requests."""
+    request = _current_request.get()
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+def current_metrics():
+    """The RequestMetrics of the request being sampled, or None."""
+    return _current_metrics.get()
+
+
+@contextmanager
+def collect_metrics():
+    """Collect metrics for everything run inside the block (and threads it starts via asgiref)."""
+    metrics = RequestMetrics()
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def count_queries():
+    """Count the queries run inside the block, without timing them."""
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+@contextmanager
+def timed(field):
+    """Add the wall time spent in the block to a RequestMetrics field ('serialize_time', ...)."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(field, time.perf_counter() - start)
+
+
+def record_cache(hits=0, misses=0):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        if hits:
+            metrics.add('cache_hits', hits)
+        if misses:
+            metrics.add('cache_misses', misses)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Execute wrapper (see connection.execute_wrapper) that times every query."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        counter = _current_counter.get()
+        if counter is not None:
+            counter.record_query()
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(time.perf_counter() - start)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    connection_created receiver that installs query_wrapper on every connection.
+
+    This is the permanent form of ``with connection.execute_wrapper(...)``, so
+    queries issued from worker threads (the async dashboard) are seen too.
+    """
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
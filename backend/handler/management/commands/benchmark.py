@@ -0,0 +1,19 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+
+from handler.benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark suite against the configured database'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='suite', required=True)
+        for name in SUITES:
+            suite = import_module(f'handler.benchmarks.{name}')
+            suite.add_arguments(subparsers.add_parser(name, help=suite.help))
+
+    def handle(self, *args, **options):
+        suite = import_module(f"handler.benchmarks.{options.pop('suite')}")
+        suite.run(self.stdout, **options)
@@ -0,0 +1,48 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from handler.management.parallel import prepare_connection, run_batches
+from handler.models import User
+from handler.recurring import store_user
+
+
+def _detect_batch(args):
+    user_ids, today = args
+    prepare_connection()
+    return {'users': len(user_ids), 'payments': sum(store_user(user_id, today) for user_id in user_ids)}
+
+
+class Command(BaseCommand):
+    help = 'Detect recurring payments and subscriptions in every user\'s transactions and store them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Only this user')
+        parser.add_argument('--batch-size', type=int, default=50, help='Users per batch')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes (each handles whole batches)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+
+        today = datetime.now().date()
+        users = User.objects.filter(is_active=True)
+        if options['email']:
+            users = users.filter(email=options['email'])
+            if not users.exists():
+                raise CommandError(f'No active user with email {options["email"]}')
+        user_ids = list(users.order_by('pk').values_list('pk', flat=True))
+        size = options['batch_size']
+        batches = [(user_ids[start:start + size], today) for start in range(0, len(user_ids), size)]
+        self.stdout.write(f'Detecting subscriptions for {len(user_ids)} users in {len(batches)} batches '
+                          f'({options["workers"]} worker(s))')
+
+        started = time.perf_counter()
+        totals = run_batches(self, _detect_batch, batches, options['workers'], len(user_ids),
+                             'payments', 'recurring payments')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {totals["payments"]:,} recurring payments for {totals["users"]:,} users in {elapsed:.1f}s'
+        ))
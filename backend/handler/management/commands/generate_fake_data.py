@@ -0,0 +1,95 @@
+import time
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from handler.fake_data import (
+    DEFAULT_CATEGORY_MIX, DEFAULT_PAYMENT_MIX, FakeDataSpec, delete_users, generate_users, parse_mix,
+)
+from handler.management.parallel import prepare_connection, run_batches
+from handler.models import User, Transaction
+from handler.views import create_default_categories
+
+# Users handed to a worker at a time; small enough to keep all workers busy
+CHUNK_USERS = 25
+
+
+def _generate_chunk(args):
+    spec, indexes = args
+    prepare_connection()
+    return generate_users(spec, indexes)
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic synthetic users, transactions, budgets and notifications for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to create')
+        parser.add_argument('--months', type=int, default=12, help='Months of history per user')
+        parser.add_argument('--end-date', help='Last day of the history, YYYY-MM-DD (default: today)')
+        parser.add_argument('--density', type=float, default=3.0,
+                            help='Average day-to-day expenses per user per weekday')
+        parser.add_argument('--seasonality', type=float, default=0.25,
+                            help='Seasonal swing of spending, 0 (flat) to 1 (peaks in December)')
+        parser.add_argument('--category-mix', default='',
+                            help='Expense category weights, e.g. "Food & Dining=40,Travel=0"')
+        parser.add_argument('--payment-methods', default='',
+                            help='Payment method weights, e.g. "upi=50,cash=5"')
+        parser.add_argument('--budgets-per-month', type=int, default=4,
+                            help='Category budgets per month besides the overall one (0 for no budgets)')
+        parser.add_argument('--notifications', type=int, default=20, help='Notifications per user')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create flush')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes (each writes its own users)')
+        parser.add_argument('--email-prefix', default='fake', help='Users are <prefix><n>@<domain>')
+        parser.add_argument('--email-domain', default='example.com')
+        parser.add_argument('--password', default='password123', help='Password of every generated user')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously generated users (same prefix and domain) first')
+
+    def handle(self, *args, **options):
+        try:
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date() if options['end_date'] else None
+            category_mix = parse_mix(options['category_mix'], DEFAULT_CATEGORY_MIX, set(DEFAULT_CATEGORY_MIX))
+            payment_mix = parse_mix(options['payment_methods'], DEFAULT_PAYMENT_MIX,
+                                    {value for value, _ in Transaction.PAYMENT_METHODS})
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['users'] < 1 or options['months'] < 1 or options['workers'] < 1:
+            raise CommandError('--users, --months and --workers must be at least 1')
+
+        prefix, domain = options['email_prefix'], options['email_domain']
+        existing = User.objects.filter(email__startswith=prefix, email__endswith=f'@{domain}')
+        if options['clear']:
+            deleted = delete_users(existing)
+            self.stdout.write(f'Deleted {deleted} previously generated users')
+        elif existing.exists():
+            raise CommandError(f'{existing.count()} users matching {prefix}*@{domain} already exist; '
+                               f'use --clear or another --email-prefix')
+
+        create_default_categories()
+        spec = FakeDataSpec(
+            seed=options['seed'], end_date=end_date, months=options['months'],
+            density=options['density'], seasonality=options['seasonality'],
+            category_mix=category_mix, payment_mix=payment_mix,
+            budgets_per_month=options['budgets_per_month'], notifications=options['notifications'],
+            email_prefix=prefix, email_domain=domain,
+            # Hashing once instead of per user; PBKDF2 would dominate small rows
+            password_hash=make_password(options['password']),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(f'Generating {options["users"]} users from {spec.start_date} to {spec.end_date} '
+                          f'(seed {spec.seed}, {options["workers"]} worker(s))')
+
+        users = options['users']
+        chunks = [(spec, range(start, min(start + CHUNK_USERS, users))) for start in range(0, users, CHUNK_USERS)]
+        started = time.perf_counter()
+        totals = run_batches(self, _generate_chunk, chunks, options['workers'], users, 'transactions', 'transactions')
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {totals["users"]} users, {totals["transactions"]:,} transactions, {totals["budgets"]:,} budgets '
+            f'and {totals["notifications"]:,} notifications in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)'
+        ))
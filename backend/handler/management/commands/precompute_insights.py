@@ -0,0 +1,50 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from handler.insights import closed_months, compute_reports
+from handler.management.parallel import prepare_connection, run_batches
+from handler.models import User
+
+
+def _compute_batch(args):
+    user_ids, months, today, force = args
+    prepare_connection()
+    return {'users': len(user_ids), 'reports': compute_reports(user_ids, months, today, force)}
+
+
+class Command(BaseCommand):
+    help = 'Precompute and store the analytics reports of closed months for all users (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=1,
+                            help='How many of the most recent closed months to store (default: last month)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Users per batch')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes (each computes whole batches)')
+        parser.add_argument('--force', action='store_true',
+                            help='Recompute reports that are already stored')
+
+    def handle(self, *args, **options):
+        if options['months'] < 1 or options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--months, --batch-size and --workers must be at least 1')
+
+        today = datetime.now().date()
+        months = closed_months(today, options['months'])
+        user_ids = list(User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+        size = options['batch_size']
+        batches = [
+            (user_ids[start:start + size], months, today, options['force'])
+            for start in range(0, len(user_ids), size)
+        ]
+        first, last = months[0], months[-1]
+        self.stdout.write(f'Precomputing {first[0]}/{first[1]} to {last[0]}/{last[1]} for {len(user_ids)} users '
+                          f'in {len(batches)} batches ({options["workers"]} worker(s))')
+
+        started = time.perf_counter()
+        totals = run_batches(self, _compute_batch, batches, options['workers'], len(user_ids), 'reports', 'reports')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {totals["reports"]:,} reports for {totals["users"]:,} users in {elapsed:.1f}s'
+        ))
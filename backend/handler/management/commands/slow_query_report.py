@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from handler.slow_queries import log_files, read_records
+
+SORT_KEYS = {
+    'total': lambda s: s['total_ms'],
+    'max': lambda s: s['max_ms'],
+    'mean': lambda s: s['total_ms'] / s['count'],
+    'count': lambda s: s['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the slow query log by SQL fingerprint and show the worst offenders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None,
+                            help='Slow query log, read with its rotated backups (defaults to SLOW_QUERY_LOG_FILE)')
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--view', help='Only queries issued by this view name')
+        parser.add_argument('--no-plan', action='store_true', help='Omit the captured query plans')
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.SLOW_QUERY_LOG_FILE
+        files = log_files(path)
+        if not files:
+            raise CommandError(f'No slow query log at {path}')
+
+        stats = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': defaultdict(int)})
+        records = (record for name in files for record in read_records(name))
+        for record in records:
+            if options['view'] and record.get('view') != options['view']:
+                continue
+            entry = stats[record['fingerprint']]
+            entry['count'] += 1
+            entry['total_ms'] += record['duration_ms']
+            entry['views'][record.get('view') or '-'] += 1
+            entry['normalized_sql'] = record['normalized_sql']
+            if record['duration_ms'] >= entry['max_ms']:
+                # Keep the slowest occurrence as the example
+                entry['max_ms'] = record['duration_ms']
+                entry['example'] = record
+
+        if not stats:
+            self.stdout.write('No slow queries recorded.')
+            return
+
+        ranked = sorted(stats.items(), key=lambda item: SORT_KEYS[options['sort']](item[1]), reverse=True)
+        self.stdout.write(f'{len(stats)} fingerprints, {sum(s["count"] for s in stats.values())} slow queries '
+                          f'(sorted by {options["sort"]})\n')
+        for rank, (fingerprint_id, entry) in enumerate(ranked[:options['limit']], start=1):
+            example = entry['example']
+            views = ', '.join(f'{view} ({n})' for view, n in sorted(entry['views'].items(), key=lambda v: -v[1]))
+            self.stdout.write(self.style.WARNING(
+                f'#{rank} [{fingerprint_id}] count {entry["count"]}  total {entry["total_ms"]:.1f} ms  '
+                f'mean {entry["total_ms"] / entry["count"]:.1f} ms  max {entry["max_ms"]:.1f} ms'
+            ))
+            self.stdout.write(f'  views: {views}')
+            self.stdout.write(f'  sql: {entry["normalized_sql"]}')
+            self.stdout.write(f'  slowest params: {example.get("params")}  ({example.get("database")}, {example["time"]})')
+            if example.get('plan') and not options['no_plan']:
+                self.stdout.write('  plan:')
+                for line in example['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+            self.stdout.write('')
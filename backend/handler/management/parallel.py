@@ -0,0 +1,63 @@
+"""
+Batch runner shared by the management commands that fan work out to forked
+worker processes (generate_fake_data, precompute_insights, detect_subscriptions).
+
+Each batch function returns a dict of counts, always including 'users'.
+run_batches() sums them and prints a progress line after every batch.
+"""
+import multiprocessing
+import time
+
+from django.core.management.base import CommandError
+from django.db import connection, connections
+
+# SQLite has one write lock and a worker holds it for a whole bulk write, so
+# workers queue for it far longer than the busy timeout the web app uses
+SQLITE_LOCK_WAIT_MS = 600000
+
+
+def prepare_connection():
+    """Set up this process's connection for long batch writes; call at the start of each batch."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA busy_timeout = {SQLITE_LOCK_WAIT_MS}')
+
+
+def close_before_fork():
+    """
+    Close every connection and connection pool so that forked children open
+    their own sockets. close_all() alone returns pooled PostgreSQL connections
+    to the pool, which the children would then inherit and share.
+    """
+    connections.close_all()
+    for conn in connections.all(initialized_only=True):
+        if hasattr(conn, 'close_pool'):  # PostgreSQL with OPTIONS['pool']
+            conn.close_pool()
+
+
+def run_batches(command, work, batches, workers, users, key, label):
+    """
+    Run work(batch) for every batch, in `workers` forked processes when more
+    than one, and return the summed counts. Progress lines report users done
+    and the running total and rate of counts[key].
+    """
+    if workers == 1:
+        results = map(work, batches)
+        return _report(command, results, users, key, label)
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        raise CommandError('--workers needs the fork start method (Linux/macOS); use --workers 1')
+    close_before_fork()
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        return _report(command, pool.imap_unordered(work, batches), users, key, label)
+
+
+def _report(command, results, users, key, label):
+    totals = {'users': 0, key: 0}
+    started = time.perf_counter()
+    for counts in results:
+        for name, value in counts.items():
+            totals[name] = totals.get(name, 0) + value
+        elapsed = time.perf_counter() - started
+        command.stdout.write(f'  {totals["users"]:,}/{users:,} users, {totals[key]:,} {label} '
+                             f'({totals[key] / elapsed:,.0f}/s)')
+    return totals
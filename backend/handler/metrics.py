@@ -0,0 +1,101 @@
+"""
+Prometheus metrics, exposed on /metrics by MetricsView.
+
+Under gunicorn every worker is a separate process. Point
+PROMETHEUS_MULTIPROC_DIR at a shared, empty directory (gunicorn.conf.py
+clears it on start) and prometheus_client writes each worker's samples there;
+the /metrics view then merges the files, so any worker answers for all.
+"""
+import time
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint (URL name)',
+    ['endpoint', 'method'],
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries issued per request, by endpoint',
+    ['endpoint'], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf')),
+)
+BUDGET_ALERTS = Counter(
+    'budget_alerts_total', 'Budget alert notifications created', ['type'],
+)
+UNUSUAL_SPENDING_ALERTS = Counter(
+    'unusual_spending_alerts_total', 'Unusual spending notifications created',
+)
+EMAILS_QUEUED = Counter(
+    'emails_queued_total', 'Emails handed to the mail backend', ['kind'],
+)
+EMAILS_SENT = Counter(
+    'emails_sent_total', 'Emails the mail backend reported as sent', ['kind'],
+)
+TRANSACTION_CACHE_LOOKUPS = Counter(
+    'transaction_cache_lookups_total', 'Per-user transaction column cache lookups', ['result'],
+)
+TRANSACTION_CACHE_EVICTIONS = Counter(
+    'transaction_cache_evictions_total', 'Users evicted from the transaction column cache to stay within budget',
+)
+TRANSACTION_CACHE_BYTES = Gauge(
+    'transaction_cache_bytes', 'Memory held by the transaction column cache', multiprocess_mode='livesum',
+)
+# livesum: add up the pools of all live worker processes
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Connection pool usage by database alias',
+    ['alias', 'state'], multiprocess_mode='livesum',
+)
+
+
+# Seconds between pool gauge refreshes from the request path (multiprocess mode only)
+POOL_GAUGE_INTERVAL = 15
+
+_pool_gauges_updated = 0.0
+
+
+def observe_request(endpoint, method, duration, queries):
+    global _pool_gauges_updated
+    REQUEST_LATENCY.labels(endpoint, method).observe(duration)
+    REQUEST_QUERIES.labels(endpoint).observe(queries)
+    # A scrape is answered by one worker, which can only read its own pools;
+    # the others publish theirs every POOL_GAUGE_INTERVAL while serving requests
+    if settings.PROMETHEUS_MULTIPROC_DIR and time.monotonic() - _pool_gauges_updated >= POOL_GAUGE_INTERVAL:
+        _pool_gauges_updated = time.monotonic()
+        update_pool_gauges()
+
+
+def count_email(kind, sent):
+    """Record one send_mail() call and how many messages it delivered."""
+    EMAILS_QUEUED.labels(kind).inc()
+    if sent:
+        EMAILS_SENT.labels(kind).inc(sent)
+
+
+def update_pool_gauges():
+    """Copy psycopg pool stats of this process into the pool gauges."""
+    for alias in connections:
+        # The PostgreSQL backend keeps one pool per alias for the whole process,
+        # created on first use; reading it here must not create one
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+        DB_POOL_CONNECTIONS.labels(alias, 'size').set(size)
+        DB_POOL_CONNECTIONS.labels(alias, 'in_use').set(size - available)
+        DB_POOL_CONNECTIONS.labels(alias, 'available').set(available)
+        DB_POOL_CONNECTIONS.labels(alias, 'waiting').set(stats.get('requests_waiting', 0))
+
+
+def render_metrics():
+    """Return (body, content_type) in the Prometheus text exposition format."""
+    update_pool_gauges()
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,238 @@
+"""HTTP middleware for the API."""
+import logging
+import random
+import re
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .instrumentation import RequestMetrics, collect_metrics, count_queries, track_request
+from .metrics import observe_request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+# ============================================
+# RESPONSE COMPRESSION
+# ============================================
+
+_accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def _gzip_compressor():
+    # wbits=31 writes a gzip header/trailer instead of a raw zlib stream
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _brotli_compressor():
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+# Content-Encoding -> factory of (compress, flush, finish), in server preference order
+COMPRESSORS = {'gzip': _gzip_compressor}
+if brotli is not None:
+    COMPRESSORS = {'br': _brotli_compressor, **COMPRESSORS}
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported Content-Encoding for an Accept-Encoding header, or None."""
+    weights = {}
+    for coding, q in _accept_encoding_re.findall(accept_encoding or ''):
+        try:
+            weights[coding.lower()] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    default = weights.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in COMPRESSORS:
+        q = weights.get(coding, default)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(coding, data):
+    """Compress a complete body with the given Content-Encoding."""
+    compress_chunk, _, finish = COMPRESSORS[coding]()
+    return compress_chunk(data) + finish()
+
+
+def _compress_stream(coding, chunks):
+    # Flush after every chunk so streamed rows reach the client without waiting
+    compress_chunk, flush, finish = COMPRESSORS[coding]()
+    for chunk in chunks:
+        data = compress_chunk(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+async def _acompress_stream(coding, chunks):
+    compress_chunk, flush, finish = COMPRESSORS[coding]()
+    async for chunk in chunks:
+        data = compress_chunk(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli or gzip, whichever the client prefers.
+
+    Like Django's GZipMiddleware, but negotiates brotli when it is installed,
+    leaves bodies under COMPRESSION_MIN_SIZE alone and compresses streaming
+    responses chunk by chunk.
+    """
+
+    def process_response(self, request, response):
+        if not settings.COMPRESSION_ENABLED or response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        # The body now depends on Accept-Encoding, even when we send it as-is
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        coding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompress_stream(coding, response.streaming_content)
+            else:
+                response.streaming_content = _compress_stream(coding, response.streaming_content)
+            # The compressed length is unknown until the stream ends
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(coding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # The representation changed, so a strong ETag no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = coding
+        return response
+
+
+# ============================================
+# REQUEST METRICS
+# ============================================
+
+request_logger = logging.getLogger('handler.requests')
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures requests for the Prometheus metrics and a sampled request log.
+
+    Every request's latency and query count feed the /metrics histograms
+    (when PROMETHEUS_METRICS_ENABLED); unsampled requests only count their
+    queries, without the full collector. A sample of requests
+    (REQUEST_METRICS_SAMPLE_RATE) additionally reports wall time, DB query
+    count and time, serializer and renderer time, cache hits/misses and the
+    view name in a ``Server-Timing`` header and one structured line on the
+    ``handler.requests`` logger.
+
+    Works in both sync and async chains, so async views are not wrapped in
+    async_to_sync(). The collectors are ContextVars, which sync_to_async()
+    copies into the threads the views query from.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with track_request(request):
+            sampled = self.sampled()
+            if not sampled and not settings.PROMETHEUS_METRICS_ENABLED:
+                return self.get_response(request)
+            start = time.perf_counter()
+            with (collect_metrics() if sampled else count_queries()) as metrics:
+                response = self.get_response(request)
+            return self.report(request, response, time.perf_counter() - start, metrics)
+
+    async def __acall__(self, request):
+        with track_request(request):
+            sampled = self.sampled()
+            if not sampled and not settings.PROMETHEUS_METRICS_ENABLED:
+                return await self.get_response(request)
+            start = time.perf_counter()
+            with (collect_metrics() if sampled else count_queries()) as metrics:
+                response = await self.get_response(request)
+            return self.report(request, response, time.perf_counter() - start, metrics)
+
+    @staticmethod
+    def sampled():
+        return settings.REQUEST_METRICS_ENABLED and random.random() < settings.REQUEST_METRICS_SAMPLE_RATE
+
+    def report(self, request, response, total_time, metrics):
+        """Record a measured response; `metrics` is a RequestMetrics when sampled, else a QueryCounter."""
+        if not isinstance(metrics, RequestMetrics):
+            self.observe(request, total_time, metrics.total())
+            return response
+
+        match = request.resolver_match
+        metrics.view_name = match.view_name if match else None
+
+        if settings.PROMETHEUS_METRICS_ENABLED:
+            self.observe(request, total_time, metrics.queries)
+
+        server_timing = (
+            f'total;dur={total_time * 1000:.1f}, '
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+            f'serialize;dur={metrics.serialize_time * 1000:.1f}, '
+            f'render;dur={metrics.render_time * 1000:.1f}, '
+            f'cache;desc="{metrics.cache_hits} hits {metrics.cache_misses} misses"'
+        )
+        if response.has_header('Server-Timing'):
+            server_timing = f"{response['Server-Timing']}, {server_timing}"
+        response['Server-Timing'] = server_timing
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': metrics.view_name,
+            'status': response.status_code,
+            'total_ms': round(total_time * 1000, 2),
+            'db_queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serialize_ms': round(metrics.serialize_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }
+        request_logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'request_metrics': fields},
+        )
+        return response
+
+    @staticmethod
+    def observe(request, total_time, queries):
+        match = request.resolver_match
+        # URL names keep the label set small; unknown paths share one label
+        observe_request(match.url_name if match and match.url_name else 'unmatched',
+                        request.method, total_time, queries)
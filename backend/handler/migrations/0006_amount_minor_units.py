@@ -0,0 +1,92 @@
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, Round
+
+import handler.fields
+
+
+AMOUNT_MODELS = ('Transaction', 'Budget')
+
+
+def decimal_to_minor_units(apps, schema_editor):
+    # One set-based UPDATE per table; ROUND guards against binary float
+    # storage of decimals on SQLite (12.34 * 100 = 1233.999...)
+    for model_name in AMOUNT_MODELS:
+        model = apps.get_model('handler', model_name)
+        model.objects.update(
+            amount_minor=Cast(Round(F('amount') * Value(100)), models.BigIntegerField())
+        )
+
+
+def minor_units_to_decimal(apps, schema_editor):
+    for model_name in AMOUNT_MODELS:
+        model = apps.get_model('handler', model_name)
+        batch = []
+        for obj in model.objects.only('id', 'amount_minor').iterator(chunk_size=2000):
+            obj.amount = handler.fields.from_minor_units(obj.amount_minor)
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['amount'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['amount'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('handler', '0005_alter_budget_unique_together_budget_alert_threshold_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='amount_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='amount_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        # Keep the decimal column nullable while running backwards
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AlterField(
+            model_name='budget',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(decimal_to_minor_units, minor_units_to_decimal),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='budget',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='transaction',
+            old_name='amount_minor',
+            new_name='amount',
+        ),
+        migrations.RenameField(
+            model_name='budget',
+            old_name='amount_minor',
+            new_name='amount',
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=handler.fields.MinorUnitField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='budget',
+            name='amount',
+            field=handler.fields.MinorUnitField(decimal_places=2, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def snapshot_categories(apps, schema_editor):
+    Category = apps.get_model('handler', 'Category')
+    Transaction = apps.get_model('handler', 'Transaction')
+    Transaction.objects.filter(category__isnull=False).update(**{
+        f'category_{field}': models.Subquery(
+            Category.objects.filter(pk=models.OuterRef('category_id')).values(field)[:1]
+        )
+        for field in ('name', 'icon', 'color')
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('handler', '0006_amount_minor_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='category_color',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='category_icon',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='category_name',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='handler.category'),
+        ),
+        migrations.RunPython(snapshot_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+import django.db.models.deletion
+import handler.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('handler', '0009_spending_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('description_key', models.CharField(max_length=255)),
+                ('amount_band', models.IntegerField()),
+                ('description', models.CharField(max_length=255)),
+                ('amount', handler.fields.MinorUnitField(decimal_places=2, max_digits=12)),
+                ('frequency', models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('annual', 'Annual')], max_length=10)),
+                ('interval_days', models.FloatField()),
+                ('occurrences', models.PositiveIntegerField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('next_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_payments', to='handler.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_payments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['next_date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'type', 'description_key', 'amount_band'), name='unique_recurring_payment')],
+            },
+        ),
+    ]
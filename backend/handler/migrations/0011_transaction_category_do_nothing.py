@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('handler', '0010_recurring_payment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transactions', to='handler.category'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
+from django.dispatch import Signal
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
+import math
 import uuid
 from datetime import timedelta
 
+from .fields import MinorUnitField, to_minor_units
+
 
 class UserManager(BaseUserManager):
     """Custom user manager for email-based authentication."""
@@ -154,6 +158,20 @@ class PasswordResetToken(models.Model):
         ordering = ['-created_at']
 
 
+class CategoryQuerySet(models.QuerySet):
+    """QuerySet that keeps transaction category snapshots in sync on bulk updates."""
+    
+    def update(self, **kwargs):
+        if not SNAPSHOT_FIELDS.keys() & kwargs.keys():
+            return super().update(**kwargs)
+        # Capture ids first; the update may change the fields this queryset filters on
+        categories = list(self.values_list('pk', 'user_id'))
+        rows = super().update(**kwargs)
+        sync_category_snapshots(Transaction.objects.filter(category_id__in=[pk for pk, _ in categories]))
+        category_snapshots_changed.send(Category, user_ids={user_id for _, user_id in categories})
+        return rows
+
+
 class Category(models.Model):
     """Model for transaction categories."""
     
@@ -170,12 +188,55 @@ class Category(models.Model):
     is_default = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = CategoryQuerySet.as_manager()
+    
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
     
     def __str__(self):
         return f"{self.name} ({self.type})"
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # One bulk UPDATE refreshes the snapshot on all of this category's transactions
+            self.transactions.update(**{
+                snapshot_field: getattr(self, field) for field, snapshot_field in SNAPSHOT_FIELDS.items()
+            })
+
+
+# Sent after a queryset update rewrote the category snapshot of many transactions.
+# user_ids holds the owners of the updated categories (None for default categories).
+category_snapshots_changed = Signal()
+
+# Category display fields copied onto each Transaction (category field -> transaction field)
+SNAPSHOT_FIELDS = {
+    'name': 'category_name',
+    'icon': 'category_icon',
+    'color': 'category_color',
+}
+
+
+def unlink_deleted_category(sender, instance, **kwargs):
+    """
+    pre_delete receiver for Category: like SET_NULL on Transaction.category,
+    but also blanks the category snapshot, all in one UPDATE.
+    """
+    Transaction.objects.filter(category=instance).update(
+        category=None, **{snapshot_field: None for snapshot_field in SNAPSHOT_FIELDS.values()},
+    )
+
+
+def sync_category_snapshots(transactions):
+    """Refresh the category snapshot of the given transactions in a single UPDATE."""
+    return transactions.update(**{
+        snapshot_field: models.Subquery(
+            Category.objects.filter(pk=models.OuterRef('category_id')).values(field)[:1]
+        )
+        for field, snapshot_field in SNAPSHOT_FIELDS.items()
+    })
 
 
 class Transaction(models.Model):
@@ -198,9 +259,14 @@ class Transaction(models.Model):
     )
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions')
-    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='transactions')
+    # Cleared by unlink_deleted_category (pre_delete), not by the deletion collector
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, null=True, related_name='transactions')
+    # Snapshot of the category's display fields so list and chart reads skip the join
+    category_name = models.CharField(max_length=100, null=True, blank=True)
+    category_icon = models.CharField(max_length=50, null=True, blank=True)
+    category_color = models.CharField(max_length=20, null=True, blank=True)
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MinorUnitField(max_digits=12, decimal_places=2)  # stored as integer paise/cents
     description = models.CharField(max_length=255)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='cash')
     notes = models.TextField(blank=True, null=True)
@@ -213,6 +279,30 @@ class Transaction(models.Model):
     
     def __str__(self):
         return f"{self.description} - {self.amount} ({self.type})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The date as loaded, so a save that moves the transaction can expire reports of both months
+        instance.loaded_date = instance.__dict__.get('date')
+        # Its recurring payment group as loaded, so an edit also refreshes the group it left
+        instance.loaded_group = tuple(instance.__dict__.get(field) for field in ('type', 'description', 'amount'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.snapshot_category()
+        super().save(*args, **kwargs)
+    
+    def snapshot_category(self):
+        """Copy the category's display fields onto the transaction (call before bulk_create)."""
+        category = self.category
+        for field, snapshot_field in SNAPSHOT_FIELDS.items():
+            setattr(self, snapshot_field, getattr(category, field) if category else None)
+    
+    @property
+    def amount_minor(self):
+        """Amount in integer minor units (paise/cents), as stored in the database."""
+        return to_minor_units(self.amount)
 
 
 class Budget(models.Model):
@@ -220,7 +310,7 @@ class Budget(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='budgets', null=True, blank=True)
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = MinorUnitField(max_digits=12, decimal_places=2)  # stored as integer paise/cents
     month = models.IntegerField()  # 1-12
     year = models.IntegerField()
     is_overall = models.BooleanField(default=False)  # True for monthly overall budget
@@ -235,6 +325,18 @@ class Budget(models.Model):
         if self.is_overall:
             return f"Overall Budget - {self.month}/{self.year}"
         return f"{self.category.name if self.category else 'Unknown'} Budget - {self.month}/{self.year}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The month as loaded, so a save that moves the budget can expire reports of both months
+        instance.loaded_period = (instance.__dict__.get('year'), instance.__dict__.get('month'))
+        return instance
+    
+    @property
+    def amount_minor(self):
+        """Amount in integer minor units (paise/cents), as stored in the database."""
+        return to_minor_units(self.amount)
 
 
 class Notification(models.Model):
@@ -246,6 +348,7 @@ class Notification(models.Model):
         ('goal_achieved', 'Goal Achieved'),
         ('reminder', 'Reminder'),
         ('system', 'System'),
+        ('unusual_spending', 'Unusual Spending'),
     )
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -262,3 +365,95 @@ class Notification(models.Model):
     
     def __str__(self):
         return f"{self.type}: {self.title}"
+
+
+class MonthlyReport(models.Model):
+    """AnalyticsView payload of a closed month, precomputed by ``manage.py precompute_insights``."""
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_reports')
+    month = models.IntegerField()  # 1-12
+    year = models.IntegerField()
+    payload = models.JSONField()
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year', 'month'], name='unique_monthly_report'),
+        ]
+    
+    def __str__(self):
+        return f"Report {self.month}/{self.year} for {self.user_id}"
+
+
+class RecurringPayment(models.Model):
+    """A subscription or other recurring charge detected in a user's transactions (handler/recurring.py)."""
+    
+    FREQUENCIES = (
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('annual', 'Annual'),
+    )
+    # Fields the detector writes; the rest identify the group
+    DETECTED_FIELDS = (
+        'description', 'category', 'amount', 'frequency', 'interval_days',
+        'occurrences', 'first_date', 'last_date', 'next_date',
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_payments')
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    description_key = models.CharField(max_length=255)  # normalized description
+    amount_band = models.IntegerField()  # log-scale amount bucket
+    description = models.CharField(max_length=255)  # of the latest charge
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='recurring_payments')
+    amount = MinorUnitField(max_digits=12, decimal_places=2)  # of the latest charge
+    frequency = models.CharField(max_length=10, choices=FREQUENCIES)
+    interval_days = models.FloatField()  # mean days between charges
+    occurrences = models.PositiveIntegerField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    next_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['next_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'type', 'description_key', 'amount_band'], name='unique_recurring_payment',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.description} ({self.frequency}) for {self.user_id}"
+
+
+class SpendingStats(models.Model):
+    """
+    Running statistics of a user's expenses in one category, in major units.
+
+    Updated one expense at a time as transactions are created (handler/anomalies.py)
+    and seeded in one pass by ``manage.py seed_spending_stats``.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spending_stats')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='spending_stats')
+    count = models.PositiveIntegerField(default=0)
+    # Welford: mean and sum of squared deviations over the whole history
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0)
+    # Exponentially weighted mean and variance, following recent habits
+    ewma_mean = models.FloatField(default=0)
+    ewma_var = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_spending_stats'),
+        ]
+    
+    def __str__(self):
+        return f"Spending stats of category {self.category_id} for {self.user_id}"
+    
+    @property
+    def std(self):
+        """Sample standard deviation over the whole history."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
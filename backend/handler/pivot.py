@@ -0,0 +1,180 @@
+"""
+Generic group-by analytics over a user's transactions.
+
+A pivot request names dimensions to group by, measures to compute per group,
+a date range and optional filters. parse_pivot() checks every name against
+the DIMENSIONS and MEASURES whitelists and the request against the cost
+limits, and pivot_rows() compiles it into one grouped SQL query:
+
+    SELECT <dimensions>, SUM(amount), COUNT(id), ... FROM handler_transaction
+    WHERE user_id = ? AND date BETWEEN ? AND ? [AND filters]
+    GROUP BY <dimensions> ORDER BY ... LIMIT MAX_GROUPS + 1
+
+Amounts are summed as integer minor units in the database. A result with more
+than MAX_GROUPS groups is cut off and flagged as truncated.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Sum
+from django.db.models.functions import ExtractIsoWeekDay, TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from .analytics import AMOUNT_DECIMAL_PLACES
+from .models import Transaction
+
+MAX_DIMENSIONS = 3
+MAX_DAYS = 366 * 10
+MAX_GROUPS = 5000
+DEFAULT_DAYS = 30
+
+# Categories group by their display name snapshot, like the analytics charts
+# name: (expression, most groups it can produce over `days` days, or None when unbounded)
+DIMENSIONS = {
+    'category': (F('category_name'), lambda days: None),
+    'type': (F('type'), lambda days: len(Transaction.TRANSACTION_TYPES)),
+    'payment_method': (F('payment_method'), lambda days: len(Transaction.PAYMENT_METHODS)),
+    'day': (TruncDay('date'), lambda days: days),
+    'week': (TruncWeek('date'), lambda days: days // 7 + 2),
+    'month': (TruncMonth('date'), lambda days: days // 28 + 2),
+    'year': (TruncYear('date'), lambda days: days // 365 + 2),
+    'weekday': (ExtractIsoWeekDay('date'), lambda days: min(days, 7)),  # 1 = Monday ... 7 = Sunday
+}
+
+MEASURES = {
+    'sum': lambda: Sum('amount'),
+    'count': lambda: Count('id'),
+    'avg': lambda: Avg('amount', output_field=FloatField()),
+    'min': lambda: Min('amount'),
+    'max': lambda: Max('amount'),
+}
+
+FILTERS = {
+    'type': ('type', {value for value, _ in Transaction.TRANSACTION_TYPES}),
+    'payment_method': ('payment_method', {value for value, _ in Transaction.PAYMENT_METHODS}),
+    'category': ('category_id', None),
+}
+
+
+class PivotError(ValueError):
+    """A pivot request outside the whitelist or the cost limits."""
+
+
+class PivotQuery:
+    """A validated pivot request."""
+
+    def __init__(self, dimensions, measures, start_date, end_date, filters, order):
+        self.dimensions = dimensions
+        self.measures = measures
+        self.start_date = start_date
+        self.end_date = end_date
+        self.filters = filters
+        self.order = order
+
+
+def _names(value, allowed, kind):
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise PivotError(f"Unknown {kind}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}.")
+    if len(set(names)) != len(names):
+        raise PivotError(f'Repeated {kind}.')
+    return names
+
+
+def _date(value, default):
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise PivotError('Invalid date format. Use YYYY-MM-DD.')
+
+
+def parse_pivot(query_params, today):
+    """PivotQuery from request query params, or PivotError."""
+    dimensions = _names(query_params.get('dimensions'), DIMENSIONS, 'dimensions')
+    measures = _names(query_params.get('measures', 'sum'), MEASURES, 'measures')
+    if not dimensions:
+        raise PivotError('Give at least one dimension.')
+    if not measures:
+        raise PivotError('Give at least one measure.')
+    if len(dimensions) > MAX_DIMENSIONS:
+        raise PivotError(f'At most {MAX_DIMENSIONS} dimensions per request.')
+
+    end_date = _date(query_params.get('end_date'), today)
+    try:
+        start_date = _date(query_params.get('start_date'), end_date - timedelta(days=DEFAULT_DAYS - 1))
+        # The first week bucket starts up to six days before start_date
+        start_date - timedelta(days=6)
+    except OverflowError:
+        raise PivotError('Date range is outside the supported dates.')
+    if start_date > end_date:
+        raise PivotError('Start date cannot be after end date.')
+    days = (end_date - start_date).days + 1
+    if days > MAX_DAYS:
+        raise PivotError(f'Date range is limited to {MAX_DAYS} days.')
+
+    # Refuse requests whose bounded dimensions alone exceed the group limit
+    bound = 1
+    for name in dimensions:
+        groups = DIMENSIONS[name][1](days)
+        bound *= groups or 1
+    if bound > MAX_GROUPS:
+        raise PivotError(f'This request could return {bound:,} groups; the limit is {MAX_GROUPS:,}. '
+                         'Narrow the date range or use a coarser time dimension.')
+
+    filters = {}
+    for param, (field, allowed) in FILTERS.items():
+        values = [value.strip() for value in query_params.get(param, '').split(',') if value.strip()]
+        if not values:
+            continue
+        if allowed is None:
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise PivotError(f'{param} takes comma-separated ids.')
+        elif any(value not in allowed for value in values):
+            raise PivotError(f"Unknown {param}. Allowed: {', '.join(sorted(allowed))}.")
+        filters[f'{field}__in'] = values
+
+    order = query_params.get('order', '')
+    if order and order.lstrip('-') not in dimensions + measures:
+        raise PivotError('order must be one of the requested dimensions or measures, optionally prefixed with -.')
+    return PivotQuery(dimensions, measures, start_date, end_date, filters, order)
+
+
+def _output(name, value):
+    if name == 'category':
+        return value or 'Uncategorized'
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def pivot_rows(user, query):
+    """
+    Run the pivot as one grouped query: (rows, truncated). Each row has one
+    key per dimension and measure; money measures are in major units.
+    """
+    # Internal aliases, as some dimension names are also model fields
+    aliases = {f'pivot_{name}': DIMENSIONS[name][0] for name in query.dimensions}
+    measures = {f'pivot_{name}': MEASURES[name]() for name in query.measures}
+    ordering = [f'pivot_{name}' for name in query.dimensions]
+    if query.order:
+        descending = query.order.startswith('-')
+        ordering.insert(0, f"{'-' if descending else ''}pivot_{query.order.lstrip('-')}")
+
+    groups = Transaction.objects.filter(
+        user=user, date__gte=query.start_date, date__lte=query.end_date, **query.filters,
+    ).annotate(**aliases).values(*aliases).annotate(**measures).order_by(*ordering)[:MAX_GROUPS + 1]
+
+    scale = 10 ** AMOUNT_DECIMAL_PLACES
+    rows = []
+    for group in groups:
+        row = {name: _output(name, group[f'pivot_{name}']) for name in query.dimensions}
+        for name in query.measures:
+            value = group[f'pivot_{name}']
+            if name == 'avg':
+                value = round(value / scale, AMOUNT_DECIMAL_PLACES)
+            elif name != 'count':
+                value = float(value)
+            row[name] = value
+        rows.append(row)
+    return rows[:MAX_GROUPS], len(rows) > MAX_GROUPS
@@ -0,0 +1,319 @@
+"""
+Recurring payment and subscription detection.
+
+Transactions are grouped by type, normalized description (lowercase, without
+digits, punctuation or month names, so "Netflix 10/2025" and "NETFLIX Oct"
+match) and amount band (AMOUNT_BAND wide on a log scale, so small price
+changes stay in one group). Each group's rows are sorted by date and the gaps
+between consecutive rows classified as weekly, monthly or annual. A group
+whose gaps mostly (REGULARITY) fall in one class, with enough occurrences and
+amounts close enough to each other, is a RecurringPayment.
+
+detect_user() analyses all of a user's groups in one pass: the rows of the last
+LOOKBACK_DAYS are sorted by (group, date) once and every gap, class count and
+interval sum is computed with NumPy over the whole array. Saving or deleting a
+transaction re-analyses only the groups it left and joined, once the write
+commits; those rows are fetched by amount range, so the work does not grow
+with the rest of the history. ``manage.py detect_subscriptions`` rebuilds
+everything, e.g. after bulk imports that skip signals.
+"""
+import math
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, ExpressionWrapper, F
+
+from .analytics import AMOUNT_DECIMAL_PLACES, TYPE_CODES
+from .fields import from_minor_units, to_minor_units
+from .models import Transaction, RecurringPayment
+
+# History the detector looks at; covers two annual charges with slack
+LOOKBACK_DAYS = 800
+# Relative width of an amount band
+AMOUNT_BAND = 0.1
+# Share of a group's gaps that must fall in its frequency's interval range
+REGULARITY = 0.75
+
+# frequency: (shortest gap, longest gap, fewest occurrences, largest difference between
+# the charges relative to the highest, next charge after the last). Two annual charges
+# are little evidence, so they must cost exactly the same.
+FREQUENCIES = {
+    'weekly': (5, 9, 4, 0.02, relativedelta(weeks=1)),
+    'monthly': (26, 35, 3, 0.02, relativedelta(months=1)),
+    'annual': (350, 380, 2, 0.0, relativedelta(years=1)),
+}
+FREQUENCY_NAMES = list(FREQUENCIES)
+# Average days between charges, for monthly costs and lapse checks
+PERIOD_DAYS = {'weekly': 7, 'monthly': 365.25 / 12, 'annual': 365.25}
+
+TYPE_NAMES = {code: value for value, code in TYPE_CODES.items()}
+
+_NOISE = re.compile(
+    r'[^a-z\s]|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april'
+    r'|june|july|august|september|october|november|december)\b'
+)
+
+
+def normalize_description(description):
+    """Grouping key of a description; empty when nothing recognizable is left."""
+    return ' '.join(_NOISE.sub(' ', (description or '').lower()).split())[:255]
+
+
+def amount_bands(amounts_minor):
+    """Amount band of each (positive) minor-unit amount."""
+    logs = np.log(np.asarray(amounts_minor, dtype=np.float64))
+    return np.floor(logs / math.log1p(AMOUNT_BAND)).astype(np.int64)
+
+
+def band_bounds(band):
+    """Smallest and largest minor-unit amount that can fall in the band, with a unit of slack for rounding."""
+    return math.floor((1 + AMOUNT_BAND) ** band) - 1, math.ceil((1 + AMOUNT_BAND) ** (band + 1)) + 1
+
+
+# ============================================
+# DETECTION
+# ============================================
+
+def analyze(groups, days, amounts):
+    """
+    Recurrences among rows grouped by code (0..n-1, every code used):
+    {group: (frequency, occurrences, mean interval, first row, last row)},
+    rows being positions in the inputs.
+    """
+    if len(groups) < 2:
+        return {}
+    order = np.lexsort((days, groups))
+    groups, days, amounts = groups[order], days[order], amounts[order]
+    same = groups[1:] == groups[:-1]
+    gaps = (days[1:] - days[:-1])[same]
+    gap_groups = groups[1:][same]
+
+    # Class of each gap: 0 irregular, 1 + index into FREQUENCY_NAMES otherwise
+    classes = np.zeros(len(gaps), dtype=np.int64)
+    for code, name in enumerate(FREQUENCY_NAMES, start=1):
+        shortest, longest = FREQUENCIES[name][:2]
+        classes[(gaps >= shortest) & (gaps <= longest)] = code
+
+    size = int(groups[-1]) + 1
+    width = len(FREQUENCY_NAMES) + 1
+    cells = gap_groups * width + classes
+    class_counts = np.bincount(cells, minlength=size * width).reshape(size, width)
+    class_days = np.bincount(cells, weights=gaps, minlength=size * width).reshape(size, width)
+    total_gaps = class_counts.sum(axis=1)
+    best = np.argmax(class_counts[:, 1:], axis=1) + 1
+    best_counts = class_counts[np.arange(size), best]
+    fewest, tolerance = np.array([FREQUENCIES[name][2:4] for name in FREQUENCY_NAMES])[best - 1].T
+    found = (best_counts > 0) & (best_counts >= REGULARITY * total_gaps) & (total_gaps + 1 >= fewest)
+
+    # Group boundaries in the sorted rows
+    starts = np.searchsorted(groups, np.arange(size), side='left')
+    ends = np.searchsorted(groups, np.arange(size), side='right') - 1
+    # Charges of one subscription cost (nearly) the same; chance matches in a band do not
+    lowest, highest = np.minimum.reduceat(amounts, starts), np.maximum.reduceat(amounts, starts)
+    found &= (highest - lowest) <= tolerance * highest
+    results = {}
+    for group in np.flatnonzero(found).tolist():
+        code = int(best[group])
+        results[group] = (
+            FREQUENCY_NAMES[code - 1],
+            int(total_gaps[group]) + 1,
+            float(class_days[group, code] / best_counts[group]),
+            int(order[starts[group]]),
+            int(order[ends[group]]),
+        )
+    return results
+
+
+def _recurring_payment(user_id, type_value, key, band, found, rows):
+    """RecurringPayment for one analyze() result over (day, type, description, amount_minor, category_id) rows."""
+    frequency, occurrences, interval, first, last = found
+    _, _, description, amount_minor, category_id = rows[last]
+    last_date = rows[last][0]
+    return RecurringPayment(
+        user_id=user_id,
+        type=type_value,
+        description_key=key,
+        amount_band=band,
+        description=description,
+        category_id=category_id,
+        amount=from_minor_units(amount_minor, AMOUNT_DECIMAL_PLACES),
+        frequency=frequency,
+        interval_days=round(interval, 2),
+        occurrences=occurrences,
+        first_date=rows[first][0],
+        last_date=last_date,
+        next_date=last_date + FREQUENCIES[frequency][4],
+    )
+
+
+def _rows(user_id, today, lowest=1, highest=None, **filters):
+    """
+    (day, type, description, amount_minor, category_id) of the user's
+    transactions of the last LOOKBACK_DAYS costing lowest..highest minor units.
+    """
+    rows = Transaction.objects.filter(
+        user_id=user_id, date__gte=today - timedelta(days=LOOKBACK_DAYS), **filters,
+    ).order_by().annotate(
+        # The raw integer column, skipping MinorUnitField's per-row Decimal conversion
+        amount_minor=ExpressionWrapper(F('amount'), output_field=BigIntegerField()),
+    ).filter(amount_minor__gte=lowest)
+    if highest is not None:
+        rows = rows.filter(amount_minor__lte=highest)
+    return list(rows.values_list('date', 'type', 'description', 'amount_minor', 'category_id'))
+
+
+def _day_numbers(days):
+    return np.array(days, dtype='datetime64[D]').astype(np.int64)
+
+
+def detect_user(user_id, today):
+    """Every recurring payment in the user's recent history, as unsaved RecurringPayments."""
+    rows = _rows(user_id, today)
+    if not rows:
+        return []
+    days, types, descriptions, amounts, _ = zip(*rows)
+
+    # Normalize each distinct description once
+    normalized = {description: normalize_description(description) for description in set(descriptions)}
+    keys = {}
+    key_codes = np.array([keys.setdefault(normalized[description], len(keys)) for description in descriptions])
+    key_names = list(keys)
+    amounts = np.array(amounts, dtype=np.int64)
+    bands = amount_bands(amounts)
+    type_codes = np.array([TYPE_CODES[value] for value in types], dtype=np.int64)
+
+    # One integer per (description, type, band) group, so grouping is a 1-D unique
+    named = np.flatnonzero(np.array([bool(name) for name in key_names])[key_codes])
+    band_count = int(bands.max()) + 1
+    group_keys = (key_codes * len(TYPE_CODES) + type_codes) * band_count + bands
+    group_keys, groups = np.unique(group_keys[named], return_inverse=True)
+    found = analyze(groups.reshape(-1), _day_numbers(days)[named], amounts[named])
+
+    payments = []
+    for group, (frequency, occurrences, interval, first, last) in found.items():
+        key_type, band = divmod(int(group_keys[group]), band_count)
+        key_code, type_code = divmod(key_type, len(TYPE_CODES))
+        payments.append(_recurring_payment(
+            user_id, TYPE_NAMES[type_code], key_names[key_code], band,
+            (frequency, occurrences, interval, int(named[first]), int(named[last])), rows,
+        ))
+    return payments
+
+
+def store_user(user_id, today):
+    """Replace the user's stored recurring payments with a fresh detect_user(). Returns how many."""
+    payments = detect_user(user_id, today)
+    with transaction.atomic():
+        RecurringPayment.objects.filter(user_id=user_id).delete()
+        RecurringPayment.objects.bulk_create(payments)
+    return len(payments)
+
+
+def refresh_group(user_id, type_value, description, amount_minor, today):
+    """Re-analyse the one group a transaction belongs to and store or drop its recurring payment."""
+    key = normalize_description(description)
+    if not key or amount_minor <= 0:
+        return
+    band = int(amount_bands([amount_minor])[0])
+    lowest, highest = band_bounds(band)
+    rows = [
+        row for row in _rows(user_id, today, lowest, highest, type=type_value)
+        if normalize_description(row[2]) == key
+    ]
+    if rows:
+        in_band = amount_bands([row[3] for row in rows]) == band
+        rows = [row for row, keep in zip(rows, in_band) if keep]
+
+    found = None
+    if rows:
+        days = _day_numbers([row[0] for row in rows])
+        amounts = np.array([row[3] for row in rows], dtype=np.int64)
+        found = analyze(np.zeros(len(rows), dtype=np.int64), days, amounts).get(0)
+    if found is None:
+        RecurringPayment.objects.filter(
+            user_id=user_id, type=type_value, description_key=key, amount_band=band,
+        ).delete()
+        return
+    payment = _recurring_payment(user_id, type_value, key, band, found, rows)
+    RecurringPayment.objects.update_or_create(
+        user_id=user_id, type=type_value, description_key=key, amount_band=band,
+        defaults={field: getattr(payment, field) for field in RecurringPayment.DETECTED_FIELDS},
+    )
+
+
+# ============================================
+# SERVING
+# ============================================
+
+def is_active_payment(payment, today):
+    """Whether the next charge is due or at most half a period late."""
+    return today <= payment.next_date + timedelta(days=PERIOD_DAYS[payment.frequency] / 2)
+
+
+def monthly_cost(payment):
+    return float(payment.amount) * PERIOD_DAYS['monthly'] / PERIOD_DAYS[payment.frequency]
+
+
+# ============================================
+# SIGNAL RECEIVERS (connected in apps.py)
+# ============================================
+
+def transaction_changed(sender, instance, **kwargs):
+    """post_save / post_delete receiver for Transaction: refresh the groups it joined and left."""
+    if not settings.SUBSCRIPTION_DETECTION_ENABLED:
+        return
+    groups = {(instance.type, instance.description, to_minor_units(instance.amount))}
+    loaded = getattr(instance, 'loaded_group', None)
+    if loaded is not None and None not in loaded:
+        loaded_type, loaded_description, loaded_amount = loaded
+        groups.add((loaded_type, loaded_description, to_minor_units(loaded_amount)))
+    today = datetime.now().date()
+    for type_value, description, amount_minor in groups:
+        _queue_refresh(instance.user_id, type_value, description, amount_minor, today)
+
+
+class _PendingRefreshes:
+    """on_commit callback refreshing each queued group once."""
+
+    def __init__(self, position):
+        # Index of this callback in connection.run_on_commit
+        self.position = position
+        self.groups = {}
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        for args in self.groups.values():
+            refresh_group(*args)
+
+
+def _queue_refresh(user_id, type_value, description, amount_minor, today):
+    """
+    refresh_group() once the current transaction commits, once per group
+    however many of its rows the transaction writes (a bulk delete sends one
+    signal per row).
+    """
+    key = normalize_description(description)
+    if not key or amount_minor <= 0:
+        return
+    group = (user_id, type_value, key, int(amount_bands([amount_minor])[0]))
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_recurring_refreshes', None)
+    callbacks = connection.run_on_commit
+    # Start a new callback once the last one ran or a rollback discarded it
+    queued = (
+        pending is not None and not pending.done
+        and len(callbacks) > pending.position and callbacks[pending.position][1] is pending
+    )
+    if not queued:
+        pending = _PendingRefreshes(len(callbacks))
+        pending.groups[group] = (user_id, type_value, description, amount_minor, today)
+        connection.pending_recurring_refreshes = pending
+        # Runs at once outside an atomic block
+        transaction.on_commit(pending)
+        return
+    pending.groups.setdefault(group, (user_id, type_value, description, amount_minor, today))
@@ -0,0 +1,103 @@
+"""
+API renderers and parsers, registered through the REST_FRAMEWORK settings.
+
+ORJSONRenderer/ORJSONParser are drop-in replacements for DRF's
+JSONRenderer/JSONParser. dict, list, str, numbers, date and datetime are
+encoded natively by orjson; anything else (Decimal, UUID, lazy translation
+strings, querysets, ...) goes through DRF's own JSONEncoder, so the bytes on
+the wire are the same as before, only produced faster. The exceptions are
+floats, which decode to the same value but can be spelled differently
+(orjson writes 1e-05 as 0.00001 and 1e+16 as 1e16), NaN and infinities,
+which orjson writes as null where DRF refuses them, and indented output,
+which always uses 2 spaces.
+
+MessagePackRenderer/MessagePackParser speak ``application/msgpack`` for
+clients that ask for it with the Accept header (or ``?format=msgpack``). The
+decoded values are the same as with JSON.
+"""
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed
+
+_fallback_encoder = JSONEncoder()
+
+# Match DRF: UTC datetimes end in "Z", int dict keys become strings
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    # Decimal -> float, like DRF's encoder, so views can hand over Decimals as-is
+    return _fallback_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        option = ORJSON_OPTIONS
+        # orjson only pretty prints with 2 spaces; any requested indent gets that
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            option |= orjson.OPT_INDENT_2
+
+        with timed('render_time'):
+            ret = orjson.dumps(data, default=_default, option=option)
+
+        # Keep the output a strict javascript subset, as JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser that decodes with orjson."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+
+        try:
+            body = stream.read()
+            if encoding.lower() not in ('utf-8', 'utf8'):
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders MessagePack, with the same value mapping as the JSON renderer."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Decimal -> float, datetime -> ISO 8601 string, ... exactly as in JSON
+        with timed('render_time'):
+            return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies."""
+
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % (str(exc) or type(exc).__name__))
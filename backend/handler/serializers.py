@@ -1,12 +1,26 @@
+from datetime import timedelta
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.encoding import force_str
 from .models import UserProfile, PasswordResetToken, Category, Transaction, Budget, Notification
+from .db import stream_queryset
+from .instrumentation import timed
 
 User = get_user_model()
 
 
+class TimedSerializerMixin:
+    """Counts to_representation() time towards the request's serializer time."""
+    
+    def to_representation(self, instance):
+        with timed('serialize_time'):
+            return super().to_representation(instance)
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for the UserProfile model."""
     
@@ -21,7 +35,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the User model."""
     profile = UserProfileSerializer(read_only=True)
     full_name = serializers.SerializerMethodField()
@@ -232,7 +246,7 @@ class SetNewPasswordSerializer(serializers.Serializer):
         return attrs
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Category model."""
     
     class Meta:
@@ -241,12 +255,13 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_default', 'created_at']
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Transaction model."""
     
-    category_name = serializers.CharField(source='category.name', read_only=True)
-    category_icon = serializers.CharField(source='category.icon', read_only=True)
-    category_color = serializers.CharField(source='category.color', read_only=True)
+    # Read from the category snapshot on the transaction row, no join needed
+    category_name = serializers.CharField(read_only=True)
+    category_icon = serializers.CharField(read_only=True)
+    category_color = serializers.CharField(read_only=True)
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
     
     class Meta:
@@ -263,7 +278,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class BudgetSerializer(serializers.ModelSerializer):
+class BudgetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Budget model."""
     
     category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
@@ -286,7 +301,7 @@ class BudgetSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Notification model."""
     
     type_display = serializers.CharField(source='get_type_display', read_only=True)
@@ -298,22 +313,117 @@ class NotificationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'type', 'title', 'message', 'data', 'email_sent', 'created_at']
     
     def get_time_ago(self, obj):
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        now = timezone.now()
-        diff = now - obj.created_at
-        
-        if diff < timedelta(minutes=1):
-            return "Just now"
-        elif diff < timedelta(hours=1):
-            mins = int(diff.total_seconds() // 60)
-            return f"{mins}m ago"
-        elif diff < timedelta(days=1):
-            hours = int(diff.total_seconds() // 3600)
-            return f"{hours}h ago"
-        elif diff < timedelta(days=7):
-            days = diff.days
-            return f"{days}d ago"
-        else:
-            return obj.created_at.strftime("%b %d")
+        return time_ago(obj.created_at, timezone.now())
+
+
+def time_ago(created_at, now):
+    """Human friendly age of a notification ("5m ago", "Mar 04", ...)."""
+    diff = now - created_at
+    
+    if diff < timedelta(minutes=1):
+        return "Just now"
+    elif diff < timedelta(hours=1):
+        mins = int(diff.total_seconds() // 60)
+        return f"{mins}m ago"
+    elif diff < timedelta(days=1):
+        hours = int(diff.total_seconds() // 3600)
+        return f"{hours}h ago"
+    elif diff < timedelta(days=7):
+        days = diff.days
+        return f"{days}d ago"
+    else:
+        return created_at.strftime("%b %d")
+
+
+# ============================================
+# FAST READ PATH
+# ============================================
+# Read-only list endpoints skip ModelSerializer entirely: rows come straight
+# from values_list() and are turned into the same dicts the serializers above
+# would produce, key for key, so the rendered JSON is byte-identical.
+
+def _choice_labels(model, field_name):
+    """Precomputed value -> label map, as returned by get_FOO_display()."""
+    return {
+        value: force_str(label, strings_only=True)
+        for value, label in model._meta.get_field(field_name).flatchoices
+    }
+
+
+def _datetime_repr(value, tz):
+    # Same output as DRF's DateTimeField with the default ISO 8601 format
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+TRANSACTION_ROW_FIELDS = (
+    'id', 'category_id', 'category_name', 'category_icon', 'category_color',
+    'type', 'amount', 'description', 'payment_method', 'notes',
+    'date', 'created_at', 'updated_at'
+)
+
+NOTIFICATION_ROW_FIELDS = (
+    'id', 'type', 'title', 'message', 'data', 'is_read', 'email_sent', 'created_at'
+)
+
+PAYMENT_METHOD_LABELS = _choice_labels(Transaction, 'payment_method')
+NOTIFICATION_TYPE_LABELS = _choice_labels(Notification, 'type')
+
+
+def serialize_transactions(queryset):
+    """Fast equivalent of ``TransactionSerializer(queryset, many=True).data``."""
+    tz = timezone.get_current_timezone()
+    labels = PAYMENT_METHOD_LABELS
+    # Rows are fetched lazily, so this also covers streaming them from the database
+    with timed('serialize_time'):
+        return [
+            {
+                'id': pk,
+                'category': category_id,
+                'category_name': category_name,
+                'category_icon': category_icon,
+                'category_color': category_color,
+                'type': type_,
+                # MinorUnitField always yields exactly two decimal places
+                'amount': f'{amount:f}',
+                'description': description,
+                'payment_method': payment_method,
+                'payment_method_display': labels.get(payment_method, payment_method),
+                'notes': notes,
+                'date': date.isoformat() if date else None,
+                'created_at': _datetime_repr(created_at, tz),
+                'updated_at': _datetime_repr(updated_at, tz),
+            }
+            for (
+                pk, category_id, category_name, category_icon, category_color,
+                type_, amount, description, payment_method, notes,
+                date, created_at, updated_at
+            ) in stream_queryset(queryset.values_list(*TRANSACTION_ROW_FIELDS))
+        ]
+
+
+def serialize_notifications(queryset):
+    """Fast equivalent of ``NotificationSerializer(queryset, many=True).data``."""
+    tz = timezone.get_current_timezone()
+    now = timezone.now()
+    labels = NOTIFICATION_TYPE_LABELS
+    with timed('serialize_time'):
+        return [
+            {
+                'id': pk,
+                'type': type_,
+                'type_display': labels.get(type_, type_),
+                'title': title,
+                'message': message,
+                'data': data,
+                'is_read': is_read,
+                'email_sent': email_sent,
+                'created_at': _datetime_repr(created_at, tz),
+                'time_ago': time_ago(created_at, now),
+            }
+            for (
+                pk, type_, title, message, data, is_read, email_sent, created_at
+            ) in stream_queryset(queryset.values_list(*NOTIFICATION_ROW_FIELDS))
+        ]
@@ -0,0 +1,161 @@
+"""
+Slow query recorder.
+
+slow_query_wrapper is installed on every connection (see apps.py). A query
+that takes longer than SLOW_QUERY_THRESHOLD_MS is logged as one JSON line to
+the 'handler.slow_queries.records' logger, which LOGGING sends to the private
+SLOW_QUERY_LOG_FILE, with its SQL, fingerprint, parameter types (or values,
+with SLOW_QUERY_LOG_PARAMS), the calling view and the query plan captured
+right after it ran. ``python manage.py slow_query_report`` aggregates the file
+and its rotated backups by fingerprint.
+"""
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .instrumentation import current_view_name
+
+logger = logging.getLogger('handler.slow_queries')
+records_logger = logging.getLogger('handler.slow_queries.records')
+
+_string_re = re.compile(r"'(?:[^']|'')*'")
+_number_re = re.compile(r'\b\d+(?:\.\d+)?\b')
+_placeholder_re = re.compile(r'%s|\?')
+_in_list_re = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_whitespace_re = re.compile(r'\s+')
+
+# Longest parameter list kept in a record; IN (...) lists can be huge
+MAX_RECORDED_PARAMS = 50
+
+
+def fingerprint(sql):
+    """
+    Normalize SQL so queries that differ only in literal values group together.
+
+    Literals and placeholders become ``?`` and IN lists collapse to ``(...)``.
+    Returns (fingerprint_id, normalized_sql).
+    """
+    normalized = _string_re.sub('?', sql)
+    normalized = _number_re.sub('?', normalized)
+    normalized = _placeholder_re.sub('?', normalized)
+    normalized = _in_list_re.sub('(...)', normalized)
+    normalized = _whitespace_re.sub(' ', normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def explain(connection, sql, params):
+    """
+    Return the plan of a SELECT as text (EXPLAIN / EXPLAIN QUERY PLAN), or None.
+
+    Runs on a backend-level cursor, so it does not pass through the execute
+    wrappers again and does not disturb the cursor of the original query.
+    """
+    statement = sql.lstrip()[:6].upper()
+    if not statement.startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+
+
+def _jsonable_param(value):
+    if not settings.SLOW_QUERY_LOG_PARAMS:
+        return type(value).__name__
+    return value if isinstance(value, (int, float, bool, type(None))) else str(value)
+
+
+def _jsonable_params(params, many):
+    if params is None:
+        return None
+    if many:
+        return f'<executemany: {len(params)} rows>' if hasattr(params, '__len__') else '<executemany>'
+    if isinstance(params, dict):
+        return {key: _jsonable_param(value) for key, value in params.items()}
+    values = [_jsonable_param(value) for value in params]
+    if len(values) > MAX_RECORDED_PARAMS:
+        values = values[:MAX_RECORDED_PARAMS] + [f'... {len(values) - MAX_RECORDED_PARAMS} more']
+    return values
+
+
+def record_slow_query(sql, params, many, connection, duration):
+    fingerprint_id, normalized = fingerprint(sql)
+    record = {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'duration_ms': round(duration * 1000, 2),
+        'fingerprint': fingerprint_id,
+        'normalized_sql': normalized,
+        'sql': sql,
+        'params': _jsonable_params(params, many),
+        'view': current_view_name(),
+        'database': connection.alias,
+        'plan': explain(connection, sql, params) if settings.SLOW_QUERY_EXPLAIN and not many else None,
+    }
+    logger.warning('slow query %.1f ms [%s] view=%s %s',
+                   record['duration_ms'], fingerprint_id, record['view'], normalized[:200])
+    records_logger.info(json.dumps(record, default=str))
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """Execute wrapper (see connection.execute_wrapper) that records slow queries."""
+    if not settings.SLOW_QUERY_ENABLED:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        try:
+            record_slow_query(sql, params, many, context['connection'], duration)
+        except Exception:
+            # Never fail the query because recording it did not work
+            logger.exception('Could not record slow query')
+    return result
+
+
+def install_slow_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver that installs slow_query_wrapper on every connection."""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+class PrivateWatchedFileHandler(logging.handlers.WatchedFileHandler):
+    """
+    WatchedFileHandler that creates the log readable by its owner only (0600,
+    in a 0700 directory). Several worker processes can append to the same
+    file, and each reopens it once external rotation has moved it.
+    """
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), mode=0o700, exist_ok=True)
+        fd = os.open(self.baseFilename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        return open(fd, self.mode, encoding=self.encoding, errors=self.errors)
+
+
+def log_files(path):
+    """The existing files of a log rotated to path.1, path.2, ..., oldest backup first."""
+    suffixes = (name[len(path) + 1:] for name in glob.glob(f'{glob.escape(path)}.*'))
+    backups = sorted((int(suffix) for suffix in suffixes if suffix.isdigit()), reverse=True)
+    return [f'{path}.{index}' for index in backups] + ([path] if os.path.exists(path) else [])
+
+
+def read_records(path):
+    """Yield the records of a slow query log, skipping lines that are not valid JSON."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
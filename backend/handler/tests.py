@@ -1,3 +1,1767 @@
-from django.test import TestCase
+"""
+Query-count and query-plan regression tests for the API.
 
-# Create your tests here.
+QueryBudgetTests calls every endpoint in handler/urls.py as one realistic
+user (two years of transactions, dozens of categories and budgets) and
+asserts the exact number of queries each one issues, so a new N+1 loop or a
+lost select_related() fails the suite. QueryPlanTests runs the SELECTs of
+the read endpoints through EXPLAIN QUERY PLAN and checks that the per-user
+tables are reached through their indexes rather than scanned.
+AnalyticsEngineTests checks that the NumPy analytics engine renders the same
+payloads as the per-bucket ORM implementation it replaced, and
+TransactionCacheTests that its per-process transaction cache serves repeats
+and expires on writes. MonthlyReportTests covers the stored reports of
+closed months and their expiry, SpendingAnomalyTests the running statistics
+behind unusual spending alerts, BudgetForecastTests the month-end spending
+projections, RecurringPaymentTests the subscription detector, PivotTests the
+group-by analytics endpoint, BatchAnalyticsTests the batched date-range
+analytics, SectionSelectionTests the include/exclude params of the dashboard
+and analytics endpoints, WireFormatTests the fast list serializers and the
+orjson and MessagePack renderers, MinorUnitFieldTests and
+AmountMigrationTests the integer money columns, CompressionTests the
+response compression, RequestMetricsTests the Prometheus request histograms,
+ReadReplicaTests the routing of reads between the primary and a replica,
+AsyncDashboardTests the async dashboard and its middleware chain,
+SlowQueryLogTests the privacy of the slow query log, LoadCleanUpTests the
+load benchmark's clean-up and LoadRegressionTests the thresholds of its
+baseline check.
+
+A failing budget prints every query the endpoint ran, with repeated
+statements (the usual N+1 signature) grouped at the top.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from io import StringIO
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
+
+from asgiref.sync import sync_to_async
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+import msgpack
+from prometheus_client import REGISTRY
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import (
+    User, UserProfile, PasswordResetToken, Category, Transaction, Budget, Notification, MonthlyReport,
+    RecurringPayment, SpendingStats,
+)
+from .dashboard import DashboardContext, build_dashboard
+from .renderers import ORJSONRenderer
+from .serializers import (
+    NotificationSerializer, TransactionSerializer, serialize_notifications, serialize_transactions,
+)
+from .slow_queries import fingerprint
+from . import (
+    analytics, anomalies, dashboard, fields, forecast, instrumentation, middleware, pivot, recurring, slow_queries,
+    transaction_cache,
+)
+from .benchmarks import analytics_orm, load
+from .insights import compute_reports
+from .transaction_cache import TransactionColumnsCache, columns_cache, stamp_key
+from .views import AsyncDashboardView, DashboardView, create_default_categories
+
+# The seeded history covers 2024-2025; endpoints are asked about June 2025
+SEED_START = date(2024, 1, 1)
+SEED_END = date(2025, 12, 31)
+SELECTED = {'month': 6, 'year': 2025}
+BUDGET_YEAR = 2025
+CATEGORY_BUDGETS_PER_MONTH = 6
+NOTIFICATION_COUNT = 60
+
+CUSTOM_CATEGORIES = [
+    ('Groceries', 'expense'), ('Fuel', 'expense'), ('Coffee', 'expense'),
+    ('Gym', 'expense'), ('Pets', 'expense'), ('Insurance', 'expense'),
+    ('Kids', 'expense'), ('Charity', 'expense'), ('Home Repairs', 'expense'),
+    ('Side Projects', 'income'), ('Dividends', 'income'), ('Cashback', 'income'),
+]
+
+# Tables that only ever hold per-user rows; reads must use the user index
+PER_USER_TABLES = (
+    'handler_transaction', 'handler_budget', 'handler_notification', 'handler_monthlyreport',
+    'handler_recurringpayment',
+)
+
+
+def seed_user(email, username, rng, daily_expenses=(2, 6)):
+    """Create a user with a realistic two-year history and return it."""
+    user = User.objects.create_user(email=email, username=username, password='test-password')
+    UserProfile.objects.create(user=user, currency='INR', monthly_income=Decimal('85000'))
+
+    custom = Category.objects.bulk_create([
+        Category(user=user, name=name, type=category_type) for name, category_type in CUSTOM_CATEGORIES
+    ])
+    categories = list(Category.objects.filter(is_default=True)) + custom
+    expense_categories = [c for c in categories if c.type == 'expense']
+    income_categories = [c for c in categories if c.type == 'income' and c.name != 'Salary']
+    salary = next(c for c in categories if c.name == 'Salary')
+    payment_methods = [value for value, _ in Transaction.PAYMENT_METHODS]
+
+    transactions = []
+    day = SEED_START
+    while day <= SEED_END:
+        if day.day == 1:
+            transactions.append(Transaction(
+                user=user, category=salary, type='income', amount=Decimal('85000.00'),
+                description='Monthly salary', payment_method='bank_transfer', date=day,
+            ))
+        if rng.random() < 0.08:
+            transactions.append(Transaction(
+                user=user, category=rng.choice(income_categories), type='income',
+                amount=Decimal(rng.randint(500, 15000)), description='Extra income',
+                payment_method=rng.choice(payment_methods), date=day,
+            ))
+        for _ in range(rng.randint(*daily_expenses)):
+            category = rng.choice(expense_categories)
+            transactions.append(Transaction(
+                user=user, category=category, type='expense',
+                amount=Decimal(rng.randint(5000, 400000)) / 100,
+                description=f'{category.name} purchase', payment_method=rng.choice(payment_methods),
+                date=day,
+            ))
+        day += timedelta(days=1)
+    for transaction in transactions:
+        transaction.snapshot_category()
+    Transaction.objects.bulk_create(transactions, batch_size=500)
+
+    budgets = []
+    for month in range(1, 13):
+        budgets.append(Budget(user=user, amount=Decimal('60000'), month=month, year=BUDGET_YEAR, is_overall=True))
+        for category in rng.sample(expense_categories, CATEGORY_BUDGETS_PER_MONTH):
+            budgets.append(Budget(
+                user=user, category=category, amount=Decimal(rng.randint(2000, 12000)),
+                month=month, year=BUDGET_YEAR, alert_threshold=rng.choice([70, 80, 90]),
+            ))
+    Budget.objects.bulk_create(budgets)
+
+    Notification.objects.bulk_create([
+        Notification(
+            user=user, type=rng.choice(['budget_warning', 'budget_exceeded', 'system']),
+            title=f'Notification {i}', message='Seeded notification', data={'budget_id': i},
+            is_read=i % 2 == 0,
+        )
+        for i in range(NOTIFICATION_COUNT)
+    ])
+    return user
+
+
+@override_settings(
+    # Keep the log quiet and the slow query file untouched while tests run
+    REQUEST_METRICS_ENABLED=False,
+    SLOW_QUERY_ENABLED=False,
+    # Query budgets count the transaction reads; TransactionCacheTests turns it back on
+    TRANSACTION_CACHE_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class SeededAPITestCase(APITestCase):
+    """Seeds the realistic user once per class and authenticates as them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(20250601)
+        create_default_categories()
+        cls.user = seed_user('budget@example.com', 'budget', rng)
+        # A second, smaller account so every query has to filter by user
+        cls.other_user = seed_user('other@example.com', 'other', rng, daily_expenses=(0, 2))
+        cls.transaction = Transaction.objects.filter(user=cls.user).first()
+        cls.category = Category.objects.filter(user=cls.user, type='expense').first()
+        cls.budget = Budget.objects.filter(user=cls.user, is_overall=False).first()
+        cls.notification = Notification.objects.filter(user=cls.user).first()
+        call_command('seed_spending_stats', stdout=StringIO())
+
+    def setUp(self):
+        # Cached forecasts outlive the rollback of the previous test's writes
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def request(self, method, path, data=None):
+        if method == 'get':
+            return self.client.get(path, data)
+        return getattr(self.client, method)(path, data, format='json')
+
+    def capture(self, method, path, data=None, status_code=200):
+        """Call an endpoint and return (response, captured queries)."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.request(method, path, data)
+        self.assertEqual(
+            response.status_code, status_code,
+            f'{method.upper()} {path} returned {response.status_code}: {response.content[:500]!r}',
+        )
+        return response, context.captured_queries
+
+    def assertQueryBudget(self, budget, method, path, data=None, status_code=200):
+        """Assert the endpoint runs exactly `budget` queries; list them if it does not."""
+        response, queries = self.capture(method, path, data, status_code)
+        if len(queries) != budget:
+            self.fail(self.budget_report(method, path, budget, queries))
+        return response
+
+    @staticmethod
+    def budget_report(method, path, budget, queries):
+        lines = [f'{method.upper()} {path} ran {len(queries)} queries, the budget is {budget}.']
+        repeated = Counter(fingerprint(query['sql'])[1] for query in queries)
+        repeated = [(count, sql) for sql, count in repeated.most_common() if count > 1]
+        if repeated:
+            lines.append('Repeated statements:')
+            lines.extend(f'  {count}x {sql}' for count, sql in repeated)
+        lines.append('Queries:')
+        lines.extend(f'  {i}. {query["sql"]}' for i, query in enumerate(queries, start=1))
+        return '\n'.join(lines)
+
+
+class QueryBudgetTests(SeededAPITestCase):
+    """Exact query counts per endpoint. Update a budget only for an intended change."""
+
+    # ============================================
+    # AUTHENTICATION
+    # ============================================
+
+    def test_signup(self):
+        self.client.credentials()
+        self.assertQueryBudget(5, 'post', reverse('signup'), {
+            'email': 'new@example.com', 'username': 'new-user',
+            'password': 'Str0ng-passw0rd', 'password_confirm': 'Str0ng-passw0rd',
+        }, status_code=201)
+
+    def test_login(self):
+        self.client.credentials()
+        self.assertQueryBudget(3, 'post', reverse('login'), {
+            'email': 'budget@example.com', 'password': 'test-password',
+        })
+
+    def test_google_auth_existing_user(self):
+        self.client.credentials()
+        idinfo = {'email': 'budget@example.com', 'given_name': 'Budget', 'family_name': 'User'}
+        with mock.patch('handler.views.id_token.verify_oauth2_token', return_value=idinfo):
+            self.assertQueryBudget(3, 'post', reverse('google-auth'), {'token': 'google-id-token'})
+
+    def test_token_refresh(self):
+        self.client.credentials()
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertQueryBudget(2, 'post', reverse('token-refresh'), {'refresh': refresh})
+
+    def test_logout(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        # Access and refresh token blacklist checks, then the blacklist insert in a savepoint
+        self.assertQueryBudget(8, 'post', reverse('logout'), {'refresh': refresh})
+
+    def test_forgot_password(self):
+        self.client.credentials()
+        self.assertQueryBudget(4, 'post', reverse('forgot-password'), {'email': 'budget@example.com'})
+
+    def test_reset_password(self):
+        self.client.credentials()
+        token = PasswordResetToken.objects.create(user=self.user)
+        self.assertQueryBudget(4, 'post', reverse('reset-password'), {
+            'token': str(token.token), 'new_password': 'new-password', 'new_password_confirm': 'new-password',
+        })
+
+    def test_validate_reset_token(self):
+        self.client.credentials()
+        token = PasswordResetToken.objects.create(user=self.user)
+        self.assertQueryBudget(2, 'get', reverse('validate-reset-token', args=[token.token]))
+
+    def test_validate_unknown_reset_token(self):
+        self.client.credentials()
+        self.assertQueryBudget(1, 'get', reverse('validate-reset-token', args=[uuid.uuid4()]), status_code=400)
+
+    def test_set_password(self):
+        self.assertQueryBudget(2, 'post', reverse('set-password'), {
+            'new_password': 'new-password', 'new_password_confirm': 'new-password',
+        })
+
+    def test_change_password(self):
+        self.assertQueryBudget(2, 'post', reverse('change-password'), {
+            'old_password': 'test-password', 'new_password': 'N3w-passw0rd!', 'new_password_confirm': 'N3w-passw0rd!',
+        })
+
+    def test_profile(self):
+        self.assertQueryBudget(2, 'get', reverse('profile'))
+
+    def test_profile_update(self):
+        self.assertQueryBudget(4, 'patch', reverse('profile'), {
+            'first_name': 'Budget', 'profile': {'currency': 'USD'},
+        })
+
+    # ============================================
+    # DASHBOARD
+    # ============================================
+
+    @skipIf(settings.ASYNC_DASHBOARD, 'the async dashboard queries from worker threads')
+    def test_dashboard(self):
+        # 2 per category budget of the month: its spent total and budget.category
+        self.assertQueryBudget(16 + 2 * CATEGORY_BUDGETS_PER_MONTH, 'get', reverse('dashboard'), SELECTED)
+
+    @skipIf(settings.ASYNC_DASHBOARD, 'the async dashboard queries from worker threads')
+    def test_dashboard_included_sections(self):
+        # Profile and the selected month's last 10 transactions
+        self.assertQueryBudget(3, 'get', reverse('dashboard'), {'include': 'recent_transactions', **SELECTED})
+
+    # ============================================
+    # CATEGORIES
+    # ============================================
+
+    def test_category_list(self):
+        self.assertQueryBudget(2, 'get', reverse('category-list'))
+
+    def test_category_create(self):
+        self.assertQueryBudget(2, 'post', reverse('category-list'), {
+            'name': 'Books', 'type': 'expense',
+        }, status_code=201)
+
+    def test_category_detail(self):
+        self.assertQueryBudget(2, 'get', reverse('category-detail', args=[self.category.pk]))
+
+    def test_category_update(self):
+        # Renaming refreshes the snapshot on the category's transactions in one UPDATE
+        self.assertQueryBudget(4, 'patch', reverse('category-detail', args=[self.category.pk]), {
+            'name': 'Groceries & Household',
+        })
+
+    def test_category_delete(self):
+        # One UPDATE clears category_id and the snapshot fields of all its transactions
+        # without loading them. Its budgets are loaded before deletion, for the
+        # report-expiring receiver, its spending statistics are deleted with it and its
+        # recurring payments unlinked.
+        linked = list(Transaction.objects.filter(category=self.category).values_list('pk', flat=True))
+        self.assertQueryBudget(8, 'delete', reverse('category-detail', args=[self.category.pk]), status_code=204)
+        self.assertEqual(
+            set(Transaction.objects.filter(pk__in=linked).values_list('category', 'category_name', 'category_color')),
+            {(None, None, None)},
+        )
+
+    # ============================================
+    # TRANSACTIONS
+    # ============================================
+
+    def test_transaction_list(self):
+        self.assertQueryBudget(2, 'get', reverse('transaction-list'))
+
+    def test_transaction_list_filtered(self):
+        self.assertQueryBudget(2, 'get', reverse('transaction-list'), {
+            'type': 'expense', 'category': self.category.pk, **SELECTED,
+        })
+
+    def test_transaction_create(self):
+        # Unusual spending check: one SpendingStats row locked, read and updated in a
+        # savepoint, however long the category's history is
+        self.assertQueryBudget(9, 'post', reverse('transaction-list'), {
+            'category': self.category.pk, 'type': 'expense', 'amount': '249.50',
+            'description': 'Weekly groceries', 'payment_method': 'upi', 'date': '2025-06-14',
+        }, status_code=201)
+
+    def test_transaction_detail(self):
+        self.assertQueryBudget(2, 'get', reverse('transaction-detail', args=[self.transaction.pk]))
+
+    def test_transaction_update(self):
+        self.assertQueryBudget(4, 'patch', reverse('transaction-detail', args=[self.transaction.pk]), {
+            'amount': '99.99', 'category': self.category.pk,
+        })
+
+    def test_transaction_delete(self):
+        self.assertQueryBudget(3, 'delete', reverse('transaction-detail', args=[self.transaction.pk]))
+
+    # ============================================
+    # BUDGETS
+    # ============================================
+
+    def test_budget_list(self):
+        # 1 per category budget of the month: budget.category lookups in BudgetSerializer
+        self.assertQueryBudget(2 + CATEGORY_BUDGETS_PER_MONTH, 'get', reverse('budget-list'), SELECTED)
+
+    def test_budget_create(self):
+        self.assertQueryBudget(3, 'post', reverse('budget-list'), {
+            'category': self.category.pk, 'amount': '5000.00', 'month': 1, 'year': 2026,
+        }, status_code=201)
+
+    def test_budget_overview(self):
+        # 2 per category budget of the month: its spent total and budget.category,
+        # and 1 for the transactions the month-end forecasts are computed from
+        self.assertQueryBudget(7 + 2 * CATEGORY_BUDGETS_PER_MONTH, 'get', reverse('budget-overview'), SELECTED)
+
+    def test_budget_forecast(self):
+        self.assertQueryBudget(4, 'get', reverse('budget-forecast'), SELECTED)
+
+    def test_subscription_list(self):
+        self.assertQueryBudget(3, 'get', reverse('subscription-list'))
+
+    def test_budget_detail(self):
+        self.assertQueryBudget(3, 'get', reverse('budget-detail', args=[self.budget.pk]))
+
+    def test_budget_delete(self):
+        self.assertQueryBudget(3, 'delete', reverse('budget-detail', args=[self.budget.pk]))
+
+    # ============================================
+    # NOTIFICATIONS
+    # ============================================
+
+    def test_notification_list(self):
+        self.assertQueryBudget(2, 'get', reverse('notification-list'))
+
+    def test_notification_list_unread(self):
+        self.assertQueryBudget(2, 'get', reverse('notification-list'), {'unread': 'true'})
+
+    def test_notification_count(self):
+        self.assertQueryBudget(2, 'get', reverse('notification-count'))
+
+    def test_notification_mark_read(self):
+        self.assertQueryBudget(2, 'post', reverse('notification-mark-read'), {'all': True})
+
+    def test_notification_mark_read_ids(self):
+        self.assertQueryBudget(2, 'post', reverse('notification-mark-read'), {
+            'notification_ids': [self.notification.pk],
+        })
+
+    def test_notification_delete(self):
+        self.assertQueryBudget(3, 'delete', reverse('notification-delete', args=[self.notification.pk]))
+
+    # ============================================
+    # ANALYTICS
+    # ============================================
+
+    def test_analytics(self):
+        # No stored report for the closed month, then the profile, one transaction
+        # query for the 6-month window and the month's budgets
+        self.assertQueryBudget(5, 'get', reverse('analytics'), SELECTED)
+
+    def test_analytics_without_budget_sections(self):
+        # The month's budgets are only read for insights and budget alerts
+        self.assertQueryBudget(4, 'get', reverse('analytics'), {'exclude': 'insights,budget_alerts', **SELECTED})
+
+    def test_analytics_stored_report(self):
+        compute_reports([self.user.pk], [(SELECTED['month'], SELECTED['year'])], date.today())
+        # The stored report and the profile, to check its currency
+        self.assertQueryBudget(3, 'get', reverse('analytics'), SELECTED)
+
+    def test_analytics_range(self):
+        # Profile and one transaction query covering the range and the previous period
+        self.assertQueryBudget(3, 'get', reverse('analytics-range'), {
+            'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-06-30',
+        })
+
+    def test_analytics_batch(self):
+        # Profile and one transaction query covering every range
+        self.assertQueryBudget(3, 'post', reverse('analytics-batch'), {'queries': {
+            'week': {'range': 'last_7_days'},
+            'half': {'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-06-30'},
+            'year': {'range': 'custom', 'start_date': '2024-01-01', 'end_date': '2024-12-31', 'sections': ['summary']},
+        }})
+
+    def test_analytics_pivot(self):
+        # Profile and the one grouped query
+        self.assertQueryBudget(3, 'get', reverse('analytics-pivot'), {
+            'dimensions': 'category,month', 'measures': 'sum,count,avg',
+            'start_date': '2025-01-01', 'end_date': '2025-06-30',
+        })
+
+
+@skipUnless(connection.vendor == 'sqlite', 'plans are read with SQLite EXPLAIN QUERY PLAN')
+class QueryPlanTests(SeededAPITestCase):
+    """The read endpoints reach per-user tables through an index, never a full scan."""
+
+    READ_ENDPOINTS = [
+        ('dashboard', SELECTED),
+        ('transaction-list', {}),
+        ('transaction-list', {'type': 'expense', **SELECTED}),
+        ('budget-list', SELECTED),
+        ('budget-overview', SELECTED),
+        ('budget-forecast', SELECTED),
+        ('subscription-list', {}),
+        ('notification-list', {'unread': 'true'}),
+        ('notification-count', {}),
+        ('analytics', SELECTED),
+        ('analytics-range', {'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-06-30'}),
+        ('analytics-pivot', {'dimensions': 'weekday,type', 'start_date': '2025-01-01', 'end_date': '2025-06-30'}),
+    ]
+
+    @staticmethod
+    def query_plan(sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def user_index(table):
+        """Name of the index on ``table.user_id`` (the ForeignKey index)."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        return next(
+            name for name, constraint in constraints.items()
+            if constraint['index'] and constraint['columns'] == ['user_id']
+        )
+
+    def select_plans(self, name, params):
+        """(sql, plan) for each SELECT the endpoint runs against a per-user table."""
+        if name == 'dashboard' and settings.ASYNC_DASHBOARD:
+            self.skipTest('the async dashboard queries from worker threads')
+        _, queries = self.capture('get', reverse(name), params)
+        return [
+            (query['sql'], self.query_plan(query['sql']))
+            for query in queries
+            if query['sql'].startswith('SELECT') and any(f'"{table}"' in query['sql'] for table in PER_USER_TABLES)
+        ]
+
+    def test_no_full_scans_of_per_user_tables(self):
+        for name, params in self.READ_ENDPOINTS:
+            for sql, plan in self.select_plans(name, params):
+                with self.subTest(endpoint=name, params=params, sql=sql):
+                    scans = [step for step in plan if step.startswith(tuple(f'SCAN {t}' for t in PER_USER_TABLES))]
+                    self.assertFalse(scans, f'Full scan in {name}:\n{sql}\nPlan:\n' + '\n'.join(plan))
+
+    def test_transaction_reads_use_user_index(self):
+        index = self.user_index('handler_transaction')
+        plans = self.select_plans('transaction-list', SELECTED) + self.select_plans('analytics', SELECTED)
+        for sql, plan in plans:
+            if '"handler_transaction"' not in sql:
+                continue
+            with self.subTest(sql=sql):
+                self.assertTrue(
+                    any(f'USING INDEX {index}' in step for step in plan),
+                    f'Expected {index} in the plan of:\n{sql}\nPlan:\n' + '\n'.join(plan),
+                )
+
+    def test_budget_reads_use_user_index(self):
+        index = self.user_index('handler_budget')
+        for sql, plan in self.select_plans('budget-overview', SELECTED):
+            if 'FROM "handler_budget"' not in sql:
+                continue
+            with self.subTest(sql=sql):
+                self.assertTrue(any(f'USING INDEX {index}' in step for step in plan), '\n'.join(plan))
+
+    def test_notification_reads_use_user_index(self):
+        index = self.user_index('handler_notification')
+        for sql, plan in self.select_plans('notification-list', {}) + self.select_plans('notification-count', {}):
+            if 'FROM "handler_notification"' not in sql:
+                continue
+            with self.subTest(sql=sql):
+                self.assertTrue(any(f'USING INDEX {index}' in step for step in plan), '\n'.join(plan))
+
+    def test_login_lookups_use_unique_indexes(self):
+        self.client.credentials()
+        _, queries = self.capture('post', reverse('login'), {'email': 'budget@example.com', 'password': 'test-password'})
+        lookup = next(query['sql'] for query in queries if 'FROM "handler_user"' in query['sql'])
+        plan = self.query_plan(lookup)
+        self.assertTrue(any(step.startswith('SEARCH handler_user USING INDEX') for step in plan), '\n'.join(plan))
+
+
+class AnalyticsEngineTests(SeededAPITestCase):
+    """The vectorized analytics engine renders exactly what the per-bucket ORM path does."""
+
+    TODAY = date(2025, 6, 18)
+
+    def assertSamePayload(self, engine_payload, orm_payload):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(engine_payload), renderer.render(orm_payload))
+
+    def test_month_payloads(self):
+        # Mid-month "today", a budgeted month, a year boundary and months before the seeded history
+        for month, year in [(6, 2025), (1, 2025), (12, 2024), (1, 2024), (3, 2023)]:
+            with self.subTest(month=month, year=year):
+                self.assertSamePayload(
+                    analytics.month_analytics(self.user, month, year, self.TODAY),
+                    analytics_orm.month_analytics(self.user, month, year, self.TODAY),
+                )
+
+    def test_range_payloads(self):
+        # Daily, weekly and monthly trend buckets, a partial first month and an empty range
+        for start, end in [
+            (date(2025, 6, 18), date(2025, 6, 18)),
+            (date(2025, 5, 20), date(2025, 6, 18)),
+            (date(2025, 3, 3), date(2025, 6, 18)),
+            (date(2024, 6, 19), date(2025, 6, 18)),
+            (date(2023, 2, 1), date(2023, 4, 30)),
+        ]:
+            with self.subTest(start=start, end=end):
+                self.assertSamePayload(
+                    analytics.range_analytics(self.user, start, end, 'custom', 'Test'),
+                    analytics_orm.range_analytics(self.user, start, end, 'custom', 'Test'),
+                )
+
+
+@override_settings(TRANSACTION_CACHE_ENABLED=True)
+class TransactionCacheTests(SeededAPITestCase):
+    """Repeat analytics requests are served from the per-process transaction cache."""
+
+    RANGE = {'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-06-30'}
+
+    def setUp(self):
+        super().setUp()
+        columns_cache.clear()
+        self.addCleanup(columns_cache.clear)
+
+    def transaction_queries(self, name, params):
+        response, queries = self.capture('get', reverse(name), params)
+        return response, [query for query in queries if '"handler_transaction"' in query['sql']]
+
+    def assertFresh(self):
+        """The cached payload matches the ORM path's view of the database."""
+        response, _ = self.capture('get', reverse('analytics-range'), self.RANGE)
+        expected = analytics_orm.range_analytics(
+            self.user, date(2025, 1, 1), date(2025, 6, 30), 'custom', response.data['range']['label'],
+        )
+        self.assertEqual(JSONRenderer().render(response.data), JSONRenderer().render(expected))
+
+    def test_repeat_requests_skip_the_database(self):
+        _, first = self.transaction_queries('analytics', SELECTED)
+        self.assertEqual(len(first), 1)
+        for name, params in [('analytics', SELECTED), ('analytics-range', self.RANGE)]:
+            with self.subTest(endpoint=name):
+                _, queries = self.transaction_queries(name, params)
+                self.assertEqual(queries, [])
+
+    def test_users_are_cached_separately(self):
+        self.transaction_queries('analytics', SELECTED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.other_user)}')
+        response, queries = self.transaction_queries('analytics', SELECTED)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data, analytics_orm.month_analytics(
+            self.other_user, SELECTED['month'], SELECTED['year'], date.today(),
+        ))
+
+    def test_transaction_writes_expire_the_entry(self):
+        self.transaction_queries('analytics-range', self.RANGE)
+        with self.captureOnCommitCallbacks(execute=True):
+            response, _ = self.capture('post', reverse('transaction-list'), {
+                'category': self.category.pk, 'type': 'expense', 'amount': '1234.56',
+                'description': 'Cache test', 'date': '2025-03-14',
+            }, status_code=201)
+        self.assertNotIn(self.user.pk, columns_cache)
+        self.assertFresh()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('patch', reverse('transaction-detail', args=[response.data['transaction']['id']]),
+                         {'amount': '99.00'})
+        self.assertFresh()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('delete', reverse('transaction-detail', args=[response.data['transaction']['id']]))
+        self.assertFresh()
+
+    def test_category_rename_expires_the_entry(self):
+        self.transaction_queries('analytics-range', self.RANGE)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('patch', reverse('category-detail', args=[self.category.pk]), {'name': 'Renamed'})
+        self.assertFresh()
+
+    def test_write_in_another_worker_expires_the_entry(self):
+        self.transaction_queries('analytics', SELECTED)
+        # Another process wrote: its bulk insert sent no signal here, only the shared stamp changed
+        Transaction.objects.bulk_create([Transaction(
+            user=self.user, type='expense', amount=Decimal('50.00'), description='Other worker', date=date(2025, 6, 2),
+        )])
+        cache.set(stamp_key(self.user.pk), 'bumped by another worker')
+        self.assertIn(self.user.pk, columns_cache)
+        response, queries = self.transaction_queries('analytics', SELECTED)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['summary']['transaction_count'], Transaction.objects.filter(
+            user=self.user, date__year=2025, date__month=6,
+        ).count())
+
+    def test_lru_eviction_within_memory_budget(self):
+        lru = TransactionColumnsCache()
+        columns = [analytics.query_columns(self.other_user) for _ in range(3)]
+        budget = columns[0].nbytes * 2
+        stamps = ('a', 'b')
+        lru.put(1, columns[0], stamps, budget)
+        lru.put(2, columns[1], stamps, budget)
+        self.assertIsNotNone(lru.get(1, stamps, ttl=60))  # 1 is now the most recently used
+        lru.put(3, columns[2], stamps, budget)
+        self.assertIn(1, lru)
+        self.assertNotIn(2, lru)
+        self.assertIn(3, lru)
+        self.assertLessEqual(lru.nbytes, budget)
+        self.assertIsNone(lru.get(1, ('a', 'changed'), ttl=60))
+        self.assertIsNone(lru.get(3, stamps, ttl=-1))
+
+    def test_users_over_the_budget_read_from_the_database(self):
+        with self.settings(TRANSACTION_CACHE_MAX_BYTES=1024):
+            for _ in range(2):
+                _, queries = self.transaction_queries('analytics', SELECTED)
+                self.assertEqual(len(queries), 1)
+        self.assertEqual(len(columns_cache), 0)
+
+
+class MonthlyReportTests(SeededAPITestCase):
+    """Closed months are served from stored reports until history behind them changes."""
+
+    MONTHS = [(12, 2024), (1, 2025), (2, 2025), (3, 2025), (4, 2025), (5, 2025), (6, 2025)]
+
+    def setUp(self):
+        super().setUp()
+        compute_reports([self.user.pk, self.other_user.pk], self.MONTHS, date.today())
+
+    def stored_months(self, user=None):
+        return set(MonthlyReport.objects.filter(user=user or self.user).values_list('month', 'year'))
+
+    def test_stored_report_matches_live_payload(self):
+        response = self.client.get(reverse('analytics'), SELECTED)
+        live = analytics.month_analytics(self.user, SELECTED['month'], SELECTED['year'], date.today())
+        self.assertEqual(JSONRenderer().render(response.data), JSONRenderer().render(live))
+
+    def test_command_skips_stored_reports_unless_forced(self):
+        MonthlyReport.objects.filter(user=self.user, month=6, year=2025).update(payload={'currency': 'stale'})
+        self.assertEqual(compute_reports([self.user.pk], self.MONTHS, date.today()), 0)
+        self.assertEqual(compute_reports([self.user.pk], self.MONTHS, date.today(), force=True), len(self.MONTHS))
+        self.assertEqual(MonthlyReport.objects.get(user=self.user, month=6, year=2025).payload['currency'], 'INR')
+
+    def test_back_dated_transaction_expires_six_months_of_reports(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('post', reverse('transaction-list'), {
+                'category': self.category.pk, 'type': 'expense', 'amount': '42.00',
+                'description': 'Back-dated', 'date': '2025-01-20',
+            }, status_code=201)
+        # January's report and the charts of February to June include it
+        self.assertEqual(self.stored_months(), {(12, 2024)})
+        self.assertEqual(len(self.stored_months(self.other_user)), len(self.MONTHS))
+
+    def test_moving_a_transaction_expires_both_months(self):
+        transaction = Transaction.objects.filter(user=self.user, date__year=2024, date__month=12).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('patch', reverse('transaction-detail', args=[transaction.pk]), {'date': '2025-06-01'})
+        self.assertEqual(self.stored_months(), set())
+
+    def test_budget_change_expires_its_month(self):
+        budget = Budget.objects.filter(user=self.user, month=3, year=2025).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('patch', reverse('budget-detail', args=[budget.pk]), {'amount': '123.00'})
+        self.assertEqual(self.stored_months(), set(self.MONTHS) - {(3, 2025)})
+
+    def test_category_rename_expires_the_users_reports(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('patch', reverse('category-detail', args=[self.category.pk]), {'name': 'Renamed'})
+        self.assertEqual(self.stored_months(), set())
+        self.assertEqual(len(self.stored_months(self.other_user)), len(self.MONTHS))
+
+    def test_currency_change_serves_live_payload(self):
+        UserProfile.objects.filter(user=self.user).update(currency='USD')
+        response = self.client.get(reverse('analytics'), SELECTED)
+        self.assertEqual(response.data['currency_symbol'], '$')
+
+
+class SpendingAnomalyTests(SeededAPITestCase):
+    """Running per-category spending statistics and the unusual spending alerts they raise."""
+
+    def stats(self, category=None):
+        return SpendingStats.objects.get(user=self.user, category=category or self.category)
+
+    def create_expense(self, amount, category=None):
+        response, _ = self.capture('post', reverse('transaction-list'), {
+            'category': (category or self.category).pk, 'type': 'expense', 'amount': f'{amount:.2f}',
+            'description': 'Anomaly check', 'date': '2025-06-20',
+        }, status_code=201)
+        return response.data['transaction']
+
+    def unusual(self):
+        return Notification.objects.filter(user=self.user, type='unusual_spending')
+
+    def test_seeded_statistics_match_the_history(self):
+        amounts = [float(amount) for amount in Transaction.objects.filter(
+            user=self.user, category=self.category, type='expense',
+        ).order_by('date', 'created_at', 'pk').values_list('amount', flat=True)]
+        alpha, ewma = anomalies.ewma_alpha(), amounts[0]
+        for amount in amounts[1:]:
+            ewma = alpha * amount + (1 - alpha) * ewma
+
+        stats = self.stats()
+        self.assertEqual(stats.count, len(amounts))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(amounts), places=6)
+        self.assertAlmostEqual(stats.std, statistics.stdev(amounts), places=6)
+        self.assertAlmostEqual(stats.ewma_mean, ewma, places=6)
+
+    def test_unusual_expense_creates_notification(self):
+        before = self.stats()
+        created = self.create_expense(before.ewma_mean * 20)
+        notification = self.unusual().get()
+        self.assertEqual(notification.data['transaction_id'], created['id'])
+        self.assertEqual(notification.data['category_id'], self.category.pk)
+        self.assertGreaterEqual(notification.data['z_score'], settings.ANOMALY_Z_THRESHOLD)
+        self.assertIn(self.category.name, notification.title)
+        self.assertEqual(self.stats().count, before.count + 1)
+
+    def test_ordinary_expense_only_updates_statistics(self):
+        before = self.stats()
+        self.create_expense(before.ewma_mean)
+        self.assertFalse(self.unusual().exists())
+        self.assertEqual(self.stats().count, before.count + 1)
+
+    def test_new_category_waits_for_enough_expenses(self):
+        category = Category.objects.create(user=self.user, name='Hobbies', type='expense')
+        with self.settings(ANOMALY_MIN_SAMPLES=3):
+            for _ in range(2):
+                self.create_expense(10, category)
+            self.create_expense(1000, category)
+            self.assertFalse(self.unusual().exists())
+            self.create_expense(5000, category)
+            self.assertTrue(self.unusual().exists())
+        self.assertEqual(self.stats(category).count, 4)
+
+    def test_reseeding_drops_categories_without_expenses(self):
+        Transaction.objects.filter(user=self.user, category=self.category).delete()
+        call_command('seed_spending_stats', stdout=StringIO())
+        self.assertFalse(SpendingStats.objects.filter(user=self.user, category=self.category).exists())
+        self.assertTrue(SpendingStats.objects.filter(user=self.other_user).exists())
+
+
+class BudgetForecastTests(SeededAPITestCase):
+    """Month-end projections: run-rate, pending recurring payments and the write-expired cache."""
+
+    TODAY = date(2025, 6, 15)
+
+    def steady_user(self):
+        """Spends 10.00 a day plus a 499.00 subscription on the 20th of every month."""
+        user = User.objects.create_user(email='steady@example.com', username='steady', password='test-password')
+        subscriptions = Category.objects.create(user=user, name='Streaming', type='expense')
+        food = Category.objects.create(user=user, name='Food', type='expense')
+        transactions = []
+        day = date(2025, 2, 1)
+        while day <= self.TODAY:
+            transactions.append(Transaction(
+                user=user, category=food, type='expense', amount=Decimal('10.00'), date=day,
+            ))
+            if day.day == 20:
+                transactions.append(Transaction(
+                    user=user, category=subscriptions, type='expense', amount=Decimal('499.00'), date=day,
+                ))
+            day += timedelta(days=1)
+        Transaction.objects.bulk_create(transactions)
+        return user, food, subscriptions
+
+    def test_projection_adds_run_rate_and_pending_recurring_payments(self):
+        user, food, subscriptions = self.steady_user()
+        result = forecast.compute_projections(user, date(2025, 6, 1), self.TODAY)
+        self.assertEqual(result['days_remaining'], 15)
+        # (spent, projected, daily rate, pending recurring) in minor units
+        self.assertEqual(result['projections'][food.pk], (15000, 30000, 1000, 0))
+        self.assertEqual(result['projections'][subscriptions.pk], (0, 49900, 0, 49900))
+        self.assertEqual(result['projections'][forecast.OVERALL], (15000, 79900, 1000, 49900))
+
+    def test_closed_month_projects_what_was_spent(self):
+        user, food, _ = self.steady_user()
+        result = forecast.compute_projections(user, date(2025, 5, 1), self.TODAY)
+        self.assertEqual(result['days_remaining'], 0)
+        self.assertEqual(result['projections'][food.pk][:2], (31000, 31000))
+
+    def test_forecast_endpoint_and_overview_agree(self):
+        response = self.client.get(reverse('budget-forecast'), SELECTED)
+        overview = self.client.get(reverse('budget-overview'), SELECTED)
+        self.assertEqual(
+            response.data['overall_budget']['projected'], overview.data['overall_budget']['forecast']['projected'],
+        )
+        self.assertEqual(
+            {budget['id']: budget['projected_status'] for budget in response.data['category_budgets']},
+            {budget['id']: budget['forecast']['projected_status'] for budget in overview.data['category_budgets']},
+        )
+        # A closed month projects exactly what was spent
+        self.assertEqual(response.data['projected_expenses'], response.data['total_expenses'])
+        self.assertEqual(response.data['total_expenses'], overview.data['total_expenses'])
+
+    def test_projections_are_cached_until_the_next_write(self):
+        def transaction_reads():
+            _, queries = self.capture('get', reverse('budget-forecast'), SELECTED)
+            return sum('FROM "handler_transaction"' in query['sql'] for query in queries)
+
+        self.assertEqual(transaction_reads(), 1)
+        self.assertEqual(transaction_reads(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('delete', reverse('transaction-detail', args=[self.transaction.pk]))
+        self.assertEqual(transaction_reads(), 1)
+
+
+class RecurringPaymentTests(SeededAPITestCase):
+    """Subscriptions detected in one pass, kept current as transactions are written."""
+
+    # Inside the seeded history, so the salary is still a current payment
+    TODAY = date(2025, 12, 15)
+
+    class FrozenDatetime(datetime):
+        """The write signals and the endpoint take today from datetime.now()."""
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.combine(RecurringPaymentTests.TODAY, cls.min.time(), tz)
+
+    def setUp(self):
+        super().setUp()
+        for module in ('handler.recurring', 'handler.views'):
+            patcher = mock.patch(f'{module}.datetime', self.FrozenDatetime)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.today = self.TODAY
+        self.subscriptions = Category.objects.create(user=self.user, name='Streaming', type='expense')
+        charges = []
+        for months_ago in range(1, 9):
+            day = self.today - relativedelta(months=months_ago)
+            charges.append(self.charge(f'NETFLIX.COM {day:%m/%Y}', '649.00', day))
+        for weeks_ago in range(1, 7):
+            charges.append(self.charge('Dog walker', '300.00', self.today - timedelta(weeks=weeks_ago)))
+        for years_ago in (1, 2):
+            renewed = self.today - relativedelta(years=years_ago) + timedelta(days=3)
+            charges.append(self.charge('Domain renewal', '1200.00', renewed))
+        Transaction.objects.bulk_create(charges)
+
+    def charge(self, description, amount, day):
+        return Transaction(
+            user=self.user, category=self.subscriptions, category_name='Streaming', type='expense',
+            amount=Decimal(amount), description=description, date=day,
+        )
+
+    def post_charge(self, description, amount, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            response, _ = self.capture('post', reverse('transaction-list'), {
+                'category': self.subscriptions.pk, 'type': 'expense', 'amount': amount,
+                'description': description, 'date': day.isoformat(),
+            }, status_code=201)
+        return response.data['transaction']
+
+    def stored(self, key):
+        return RecurringPayment.objects.filter(user=self.user, description_key=key).first()
+
+    def test_descriptions_are_normalized(self):
+        self.assertEqual(recurring.normalize_description('NETFLIX.COM 01/2025'), 'netflix com')
+        self.assertEqual(recurring.normalize_description('Netflix.com - Oct'), 'netflix com')
+        self.assertEqual(recurring.normalize_description('#1234'), '')
+
+    def test_full_detection_finds_each_frequency(self):
+        recurring.store_user(self.user.pk, self.today)
+        found = {
+            payment.description_key: (payment.frequency, payment.occurrences)
+            for payment in RecurringPayment.objects.filter(user=self.user, type='expense')
+        }
+        self.assertEqual(found, {
+            'netflix com': ('monthly', 8), 'dog walker': ('weekly', 6), 'domain renewal': ('annual', 2),
+        })
+        # The seeded salary, credited on the 1st of every month
+        income = RecurringPayment.objects.filter(user=self.user, type='income')
+        self.assertEqual(list(income.values_list('description', 'frequency')), [('Monthly salary', 'monthly')])
+
+    def test_new_charge_updates_its_subscription_only(self):
+        recurring.store_user(self.user.pk, self.today)
+        untouched = self.stored('dog walker').updated_at
+        self.post_charge(f'Netflix.com {self.today:%b}', '649.00', self.today)
+
+        payment = self.stored('netflix com')
+        self.assertEqual((payment.occurrences, payment.last_date), (9, self.today))
+        self.assertEqual(payment.next_date, self.today + relativedelta(months=1))
+        self.assertEqual(self.stored('dog walker').updated_at, untouched)
+        # Incremental and full detection agree
+        fresh = {p.description_key: p for p in recurring.detect_user(self.user.pk, self.today)}['netflix com']
+        for field in RecurringPayment.DETECTED_FIELDS:
+            self.assertEqual(getattr(payment, field), getattr(fresh, field), field)
+
+    def test_third_charge_starts_a_subscription(self):
+        for months_ago in (2, 1):
+            self.post_charge('Music Plus', '119.00', self.today - relativedelta(months=months_ago))
+        self.assertIsNone(self.stored('music plus'))
+        self.post_charge('Music Plus', '119.00', self.today)
+        self.assertEqual(self.stored('music plus').frequency, 'monthly')
+
+    def test_deleting_charges_drops_the_subscription(self):
+        recurring.store_user(self.user.pk, self.today)
+        renewal = Transaction.objects.filter(user=self.user, description='Domain renewal').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.capture('delete', reverse('transaction-detail', args=[renewal.pk]))
+        self.assertIsNone(self.stored('domain renewal'))
+
+    def test_bulk_delete_refreshes_each_group_once(self):
+        recurring.store_user(self.user.pk, self.today)
+        with mock.patch.object(recurring, 'refresh_group', wraps=recurring.refresh_group) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                Transaction.objects.filter(user=self.user, description__startswith='NETFLIX').delete()
+        self.assertEqual(refresh.call_count, 1)
+        self.assertIsNone(self.stored('netflix com'))
+        self.assertIsNotNone(self.stored('dog walker'))
+
+    def test_endpoint_lists_active_subscriptions_by_monthly_cost(self):
+        recurring.store_user(self.user.pk, self.today)
+        response = self.client.get(reverse('subscription-list'), {'active': 'true'})
+        self.assertEqual(
+            [(s['description'], s['frequency']) for s in response.data['subscriptions']],
+            [('Dog walker', 'weekly'), (self.stored('netflix com').description, 'monthly'),
+             ('Domain renewal', 'annual')],
+        )
+        self.assertAlmostEqual(response.data['monthly_total'], 300 * 365.25 / 12 / 7 + 649 + 100, places=1)
+
+
+class PivotTests(SeededAPITestCase):
+    """Pivot requests compile to one grouped query within the whitelist and cost limits."""
+
+    RANGE = {'start_date': '2025-01-01', 'end_date': '2025-06-30'}
+
+    def pivot(self, status_code=200, **params):
+        response, _ = self.capture('get', reverse('analytics-pivot'), {**self.RANGE, **params}, status_code)
+        return response.data
+
+    def expenses(self):
+        return Transaction.objects.filter(
+            user=self.user, type='expense', date__gte=date(2025, 1, 1), date__lte=date(2025, 6, 30),
+        )
+
+    def test_category_totals_match_the_transactions(self):
+        data = self.pivot(dimensions='category', measures='sum,count,avg,min,max', type='expense', order='-sum')
+        expected = {}
+        for transaction in self.expenses():
+            expected.setdefault(transaction.category_name, []).append(transaction.amount)
+        self.assertEqual(len(data['rows']), len(expected))
+        self.assertEqual([row['sum'] for row in data['rows']], sorted((row['sum'] for row in data['rows']), reverse=True))
+        for row in data['rows']:
+            amounts = expected[row['category']]
+            with self.subTest(category=row['category']):
+                self.assertEqual(row['sum'], float(sum(amounts)))
+                self.assertEqual(row['count'], len(amounts))
+                self.assertAlmostEqual(row['avg'], float(sum(amounts)) / len(amounts), places=2)
+                self.assertEqual((row['min'], row['max']), (float(min(amounts)), float(max(amounts))))
+        self.assertFalse(data['truncated'])
+
+    def test_weekday_by_type_heatmap(self):
+        data = self.pivot(dimensions='weekday,type', measures='count')
+        counts = Counter(
+            (transaction.date.isoweekday(), transaction.type)
+            for transaction in Transaction.objects.filter(
+                user=self.user, date__gte=date(2025, 1, 1), date__lte=date(2025, 6, 30),
+            )
+        )
+        self.assertEqual({(row['weekday'], row['type']): row['count'] for row in data['rows']}, dict(counts))
+
+    def test_filters_and_time_buckets(self):
+        category = Transaction.objects.filter(user=self.user, type='expense').values_list('category_id', flat=True).first()
+        data = self.pivot(dimensions='month,payment_method', category=str(category), payment_method='cash,upi')
+        self.assertEqual({row['payment_method'] for row in data['rows']} - {'cash', 'upi'}, set())
+        self.assertEqual(data['rows'][0]['month'], '2025-01-01')
+        total = sum(
+            transaction.amount for transaction in Transaction.objects.filter(
+                user=self.user, category_id=category, payment_method__in=['cash', 'upi'],
+                date__gte=date(2025, 1, 1), date__lte=date(2025, 6, 30),
+            )
+        )
+        self.assertAlmostEqual(sum(row['sum'] for row in data['rows']), float(total), places=2)
+
+    def test_requests_outside_the_whitelist_are_rejected(self):
+        for params in [
+            {'dimensions': 'description'},
+            {'dimensions': 'type', 'measures': 'median'},
+            {'dimensions': ''},
+            {'dimensions': 'type,type'},
+            {'dimensions': 'type,category,month,weekday'},
+            {'dimensions': 'type', 'order': 'amount'},
+            {'dimensions': 'type', 'payment_method': 'cheque'},
+            {'dimensions': 'type', 'category': 'food'},
+            {'dimensions': 'type', 'start_date': '2025-07-01'},
+            # Too close to the first representable date
+            {'dimensions': 'category', 'start_date': '', 'end_date': '0001-01-10'},
+            {'dimensions': 'week', 'start_date': '0001-01-02', 'end_date': '0001-01-10'},
+            # 2,008 days x 8 payment methods can exceed the group limit
+            {'dimensions': 'day,payment_method', 'start_date': '2020-01-01', 'end_date': '2025-06-30'},
+        ]:
+            with self.subTest(params=params):
+                data = self.pivot(status_code=400, **params)
+                self.assertFalse(data['success'])
+
+    def test_results_past_the_group_limit_are_truncated(self):
+        with mock.patch.object(pivot, 'MAX_GROUPS', 10):
+            data = self.pivot(dimensions='category', measures='count')
+        self.assertEqual(len(data['rows']), 10)
+        self.assertTrue(data['truncated'])
+
+
+class BatchAnalyticsTests(SeededAPITestCase):
+    """Several date-range queries answered from one transaction query, keyed like the request."""
+
+    QUERIES = {
+        'q1': {'range': 'custom', 'start_date': '2025-04-01', 'end_date': '2025-06-30'},
+        'jan': {'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-01-31', 'sections': ['summary', 'charts']},
+        'jan_again': {'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-01-31', 'sections': []},
+        'recent': {'range': 'last_30_days', 'sections': ['insights']},
+    }
+
+    def test_results_match_the_range_endpoint(self):
+        response, _ = self.capture('post', reverse('analytics-batch'), {'queries': self.QUERIES})
+        results = response.data['results']
+        self.assertEqual(list(results), list(self.QUERIES))
+        for key, query in self.QUERIES.items():
+            single = self.client.get(reverse('analytics-range'), {k: v for k, v in query.items() if k != 'sections'}).data
+            sections = query.get('sections', list(analytics.RANGE_SECTIONS))
+            with self.subTest(key=key):
+                self.assertEqual(results[key], {'range': single['range'], **{s: single[s] for s in sections}})
+        self.assertEqual(response.data['currency'], 'INR')
+
+    def test_one_transaction_query_for_all_ranges(self):
+        _, queries = self.capture('post', reverse('analytics-batch'), {'queries': self.QUERIES})
+        self.assertEqual(sum('FROM "handler_transaction"' in query['sql'] for query in queries), 1)
+
+    def test_range_endpoint_rejects_unbounded_ranges(self):
+        for start, end in [('0001-01-02', '0002-01-01'), ('9999-01-01', '9999-12-31'), ('1000-01-01', '2025-06-30')]:
+            with self.subTest(start=start, end=end):
+                response, _ = self.capture('get', reverse('analytics-range'), {
+                    'range': 'custom', 'start_date': start, 'end_date': end,
+                }, status_code=400)
+                self.assertFalse(response.data['success'])
+
+    def test_invalid_batches_are_rejected(self):
+        too_many = {str(i): {'range': 'last_7_days'} for i in range(analytics.BATCH_MAX_QUERIES + 1)}
+        for body in [
+            {},
+            {'queries': []},
+            {'queries': too_many},
+            {'queries': {'a': {'range': 'custom', 'start_date': '2025-13-01', 'end_date': '2025-12-31'}}},
+            {'queries': {'a': {'range': 'custom', 'start_date': '2025-02-01', 'end_date': '2025-01-31'}}},
+            {'queries': {'a': {'range': 'last_7_days', 'sections': ['budgets']}}},
+            {'queries': {'a': {'range': 'last_7_days', 'sections': 'summary'}}},
+            {'queries': {'a': {'range': 'last_7_days', 'sections': [['summary']]}}},
+            {'queries': {'a': {'range': 'custom', 'start_date': '0001-01-02', 'end_date': '0002-01-01'}}},
+            {'queries': {'a': {'range': 'custom', 'start_date': '1000-01-01', 'end_date': '2025-06-30'}}},
+        ]:
+            with self.subTest(body=body):
+                response, _ = self.capture('post', reverse('analytics-batch'), body, status_code=400)
+                self.assertFalse(response.data['success'])
+
+
+class SectionSelectionTests(SeededAPITestCase):
+    """include / exclude limit the dashboard and analytics payloads to the requested sections."""
+
+    RANGE = {'range': 'custom', 'start_date': '2025-01-01', 'end_date': '2025-06-30'}
+
+    def test_dashboard_sections_and_their_queries(self):
+        full = self.client.get(reverse('dashboard'), SELECTED).data
+        data = self.client.get(reverse('dashboard'), {'include': 'budgets,monthly_trend', **SELECTED}).data
+        self.assertEqual(list(data['dashboard']), [
+            'monthly_budget', 'budget_used_percentage', 'overall_status', 'budget_overview', 'monthly_trend',
+        ])
+        self.assertEqual(data['has_budget'], full['has_budget'])
+        for key, value in data['dashboard'].items():
+            self.assertEqual(value, full['dashboard'][key], key)
+        # Budget usage needs the month's expenses, so the stats section runs too
+        ctx = DashboardContext(self.user, SELECTED['month'], SELECTED['year'], date.today(), ['budgets'])
+        self.assertEqual(ctx.computed_sections, ['profile', 'stats', 'budgets'])
+
+        data = self.client.get(reverse('dashboard'), {'exclude': 'budgets,recent_transactions', **SELECTED}).data
+        self.assertNotIn('has_budget', data)
+        self.assertEqual(
+            set(full['dashboard']) - set(data['dashboard']),
+            {'monthly_budget', 'budget_used_percentage', 'overall_status', 'budget_overview', 'recent_transactions'},
+        )
+
+    def test_analytics_sections_match_the_full_payload(self):
+        today = date(2025, 6, 18)
+        full = analytics.month_analytics(self.user, 6, 2025, today)
+        part = analytics.month_analytics(self.user, 6, 2025, today, sections=['charts', 'comparison'])
+        self.assertEqual(part, {key: value for key, value in full.items() if key not in ('summary', 'insights', 'budget_alerts')})
+
+        full = self.client.get(reverse('analytics-range'), self.RANGE).data
+        data = self.client.get(reverse('analytics-range'), {'include': 'summary,insights', **self.RANGE}).data
+        self.assertEqual(data, {key: value for key, value in full.items() if key not in ('charts', 'comparison')})
+
+        # Without the comparison and insights sections the previous period is not loaded
+        with mock.patch('handler.analytics.load_columns', wraps=analytics.load_columns) as load:
+            data = self.client.get(reverse('analytics-range'), {'include': 'summary,charts', **self.RANGE}).data
+        load.assert_called_once_with(self.user, date(2025, 1, 1), date(2025, 6, 30))
+        self.assertEqual(data, {key: value for key, value in full.items() if key not in ('insights', 'comparison')})
+
+    def test_stored_reports_are_filtered(self):
+        compute_reports([self.user.pk], [(SELECTED['month'], SELECTED['year'])], date.today())
+        data = self.client.get(reverse('analytics'), {'include': 'summary', **SELECTED}).data
+        self.assertEqual(
+            list(data), ['success', 'currency', 'currency_symbol', 'month', 'year', 'month_name', 'summary'],
+        )
+
+    def test_invalid_sections_are_rejected(self):
+        for name, params in [
+            ('dashboard', {'include': 'charts'}),
+            ('dashboard', {'include': 'stats', 'exclude': 'today'}),
+            ('analytics', {'exclude': 'budgets'}),
+            ('analytics-range', {'include': 'summary,trend'}),
+        ]:
+            with self.subTest(name=name, params=params):
+                response, _ = self.capture('get', reverse(name), params, status_code=400)
+                self.assertFalse(response.data['success'])
+
+
+class WireFormatTests(SeededAPITestCase):
+    """The fast list serializers and the orjson renderer match DRF; MessagePack carries the same values."""
+
+    def test_fast_serializers_match_drf(self):
+        # Edge cases next to the seeded rows: no category, tiny amount, unicode
+        Transaction.objects.create(
+            user=self.user, category=None, type='expense', amount=Decimal('0.5'),
+            description='Chai \u2615', notes='Split \u2028 two ways', date=date(2025, 6, 30),
+        )
+        Notification.objects.create(user=self.user, type='system', title='Empty', message='', data={})
+
+        transactions = Transaction.objects.filter(user=self.user).order_by('-date', '-created_at')
+        self.assertEqual(serialize_transactions(transactions), TransactionSerializer(transactions, many=True).data)
+        notifications = Notification.objects.filter(user=self.user)
+        self.assertEqual(serialize_notifications(notifications), NotificationSerializer(notifications, many=True).data)
+
+    def test_orjson_renders_the_drf_bytes(self):
+        for name, params in [('transaction-list', None), ('notification-list', None), ('dashboard', SELECTED),
+                             ('analytics', SELECTED), ('budget-overview', SELECTED)]:
+            with self.subTest(name):
+                data = self.request('get', reverse(name), params).data
+                self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_floats_decode_to_the_same_values(self):
+        # Only the spelling of exponents differs from DRF (see handler/renderers.py)
+        data = {'small': 1e-05, 'large': 1e16, 'ratio': 1 / 3, 'whole': 100.0}
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, b'{"small":0.00001,"large":1e16,"ratio":0.3333333333333333,"whole":100.0}')
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(data)))
+
+    def test_msgpack_round_trip(self):
+        for name, params in [('transaction-list', None), ('dashboard', SELECTED), ('analytics', SELECTED)]:
+            with self.subTest(name):
+                as_json = self.client.get(reverse(name), params)
+                as_msgpack = self.client.get(reverse(name), params, HTTP_ACCEPT='application/msgpack')
+                self.assertEqual(as_msgpack['Content-Type'], 'application/msgpack')
+                self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+
+        body = {
+            'category': self.category.pk, 'type': 'expense', 'amount': '249.50',
+            'description': 'Weekly groceries', 'payment_method': 'upi', 'date': '2025-06-14',
+        }
+        response = self.client.post(reverse('transaction-list'), msgpack.packb(body),
+                                    content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+        created = msgpack.unpackb(response.content)['transaction']
+        self.assertEqual((created['amount'], created['description']), ('249.50', 'Weekly groceries'))
+
+        response = self.client.post(reverse('transaction-list'), b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+
+
+class MinorUnitFieldTests(TestCase):
+    """MinorUnitField stores exact integer minor units and reads back the same Decimals."""
+
+    AMOUNTS = ['0.01', '0.10', '12.34', '-12.34', '-0.05', '9999999999.99']
+
+    def test_conversions(self):
+        for amount in self.AMOUNTS:
+            with self.subTest(amount):
+                minor = fields.to_minor_units(Decimal(amount))
+                self.assertEqual(minor, int(Decimal(amount) * 100))
+                self.assertEqual(fields.from_minor_units(minor), Decimal(amount))
+        # Half a minor unit rounds away from zero
+        cases = {'0.005': 1, '-0.005': -1, '12.345': 1235, '12.3449': 1234, '-12.345': -1235, '0.004': 0}
+        for amount, minor in cases.items():
+            with self.subTest(amount):
+                self.assertEqual(fields.to_minor_units(Decimal(amount)), minor)
+        self.assertEqual(fields.from_minor_units(1234.0), Decimal('12.34'))
+        self.assertEqual(fields.to_minor_units('7.5', decimal_places=3), 7500)
+
+    def test_database_round_trip(self):
+        user = User.objects.create_user(email='minor@example.com', username='minor', password='test-password')
+        Transaction.objects.bulk_create([
+            Transaction(user=user, type='expense', amount=Decimal(amount), description=amount, date=date(2025, 6, 1))
+            for amount in self.AMOUNTS + ['12.345']
+        ])
+        stored = dict(Transaction.objects.values_list('description', 'amount'))
+        self.assertEqual(stored, {**{amount: Decimal(amount) for amount in self.AMOUNTS}, '12.345': Decimal('12.35')})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount FROM handler_transaction WHERE description = %s', ['-12.34'])
+            self.assertEqual(cursor.fetchone(), (-1234,))
+        total = Transaction.objects.aggregate(total=Sum('amount'))['total']
+        self.assertEqual(total, sum(stored.values()))
+        self.assertEqual(Transaction.objects.filter(amount__lt=0).count(), 2)
+
+
+class AmountMigrationTests(TransactionTestCase):
+    """Migration 0006 converts decimal amounts to minor units and back without losing a paisa."""
+
+    BEFORE = [('handler', '0005_alter_budget_unique_together_budget_alert_threshold_and_more')]
+    AFTER = [('handler', '0006_amount_minor_units')]
+    AMOUNTS = ['0.01', '0.10', '0.29', '12.34', '-3.50', '1234567.89']
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def amounts(self, apps):
+        transactions = apps.get_model('handler', 'Transaction').objects.values_list('description', 'amount')
+        budgets = apps.get_model('handler', 'Budget').objects.values_list('month', 'amount')
+        return dict(transactions), dict(budgets)
+
+    def test_forwards_and_backwards(self):
+        apps = self.migrate(self.BEFORE)
+        user = apps.get_model('handler', 'User').objects.create(email='old@example.com', username='old')
+        Transaction = apps.get_model('handler', 'Transaction')
+        Transaction.objects.bulk_create([
+            Transaction(user=user, type='expense', amount=Decimal(amount), description=amount, date=date(2025, 6, 1))
+            for amount in self.AMOUNTS
+        ])
+        Budget = apps.get_model('handler', 'Budget')
+        Budget.objects.bulk_create([
+            Budget(user=user, is_overall=True, amount=Decimal(amount), month=month, year=2025)
+            for month, amount in enumerate(self.AMOUNTS, start=1)
+        ])
+        expected = ({amount: Decimal(amount) for amount in self.AMOUNTS},
+                    {month: Decimal(amount) for month, amount in enumerate(self.AMOUNTS, start=1)})
+
+        self.assertEqual(self.amounts(self.migrate(self.AFTER)), expected)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT description, amount FROM handler_transaction')
+            self.assertEqual(dict(cursor.fetchall()), {amount: int(Decimal(amount) * 100) for amount in self.AMOUNTS})
+
+        self.assertEqual(self.amounts(self.migrate(self.BEFORE)), expected)
+
+
+@override_settings(COMPRESSION_ENABLED=True, COMPRESSION_MIN_SIZE=1024)
+class CompressionTests(SimpleTestCase):
+    """CompressionMiddleware negotiates br/gzip and compresses whole and streamed bodies."""
+
+    BODY = b''.join(b'{"id":%d,"description":"Groceries","amount":"249.50"},' % i for i in range(100))
+    BEST = 'br' if middleware.brotli else 'gzip'
+
+    @staticmethod
+    def decompress(coding, data):
+        return middleware.brotli.decompress(data) if coding == 'br' else gzip.decompress(data)
+
+    def process(self, response, accept_encoding):
+        request = RequestFactory().get('/api/transactions/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return middleware.CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        cases = {
+            'gzip, deflate, br': self.BEST,
+            'GZIP': 'gzip',
+            'br;q=0.5, gzip;q=1.0': 'gzip',
+            'gzip;q=0, br': 'br' if middleware.brotli else None,
+            '*': self.BEST,
+            'gzip;q=0, *;q=0.1': 'br' if middleware.brotli else None,
+            '*;q=0': None,
+            'identity': None,
+            'deflate': None,
+            '': None,
+            None: None,
+        }
+        for accept_encoding, coding in cases.items():
+            with self.subTest(accept_encoding):
+                self.assertEqual(middleware.negotiate_encoding(accept_encoding), coding)
+
+    def test_bodies_are_compressed_for_the_negotiated_coding(self):
+        for coding in middleware.COMPRESSORS:
+            with self.subTest(coding):
+                response = self.process(HttpResponse(self.BODY, headers={'ETag': '"v1"'}), coding)
+                self.assertEqual(response['Content-Encoding'], coding)
+                self.assertEqual(self.decompress(coding, response.content), self.BODY)
+                self.assertEqual(response['Content-Length'], str(len(response.content)))
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(response['ETag'], 'W/"v1"')
+
+        response = self.process(HttpResponse(self.BODY, headers={'ETag': 'W/"v1"'}), 'gzip')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+
+    def test_uncompressed_responses(self):
+        # Identity is still a representation chosen by Accept-Encoding
+        response = self.process(HttpResponse(self.BODY, headers={'ETag': '"v1"'}), 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual((response.content, response['ETag'], response['Vary']), (self.BODY, '"v1"', 'Accept-Encoding'))
+
+        small = self.BODY[:1023]
+        response = self.process(HttpResponse(small), 'gzip')
+        self.assertEqual((response.content, response.has_header('Content-Encoding')), (small, False))
+
+        response = self.process(HttpResponse(self.BODY, headers={'Content-Encoding': 'br'}), 'gzip')
+        self.assertEqual((response.content, response['Content-Encoding']), (self.BODY, 'br'))
+
+        with self.settings(COMPRESSION_ENABLED=False):
+            response = self.process(HttpResponse(self.BODY), 'gzip')
+        self.assertEqual((response.content, response.has_header('Content-Encoding')), (self.BODY, False))
+
+    def test_streamed_bodies_are_compressed_chunk_by_chunk(self):
+        chunks = [self.BODY[i:i + 500] for i in range(0, len(self.BODY), 500)]
+        for coding in middleware.COMPRESSORS:
+            with self.subTest(coding):
+                response = self.process(StreamingHttpResponse(iter(chunks)), coding)
+                self.assertEqual(response['Content-Encoding'], coding)
+                self.assertFalse(response.has_header('Content-Length'))
+                compressed = list(response.streaming_content)
+                # Every input chunk is flushed to the client as it arrives
+                self.assertGreaterEqual(len(compressed), len(chunks))
+                self.assertEqual(self.decompress(coding, b''.join(compressed)), self.BODY)
+
+    async def test_async_streamed_bodies_are_compressed(self):
+        async def chunks():
+            for i in range(0, len(self.BODY), 500):
+                yield self.BODY[i:i + 500]
+
+        response = self.process(StreamingHttpResponse(chunks()), 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        compressed = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(gzip.decompress(b''.join(compressed)), self.BODY)
+
+
+@override_settings(PROMETHEUS_METRICS_ENABLED=True)
+class RequestMetricsTests(SeededAPITestCase):
+    """Unsampled requests feed the histograms without the full per-request collector."""
+
+    @staticmethod
+    def observed_queries(endpoint):
+        labels = {'endpoint': endpoint}
+        return (REGISTRY.get_sample_value('http_request_db_queries_count', labels) or 0,
+                REGISTRY.get_sample_value('http_request_db_queries_sum', labels) or 0)
+
+    def test_unsampled_requests_count_queries_only(self):
+        count, total = self.observed_queries('category-list')
+        with mock.patch('handler.middleware.collect_metrics', wraps=instrumentation.collect_metrics) as collect:
+            _, queries = self.capture('get', reverse('category-list'))
+        collect.assert_not_called()
+        self.assertEqual(self.observed_queries('category-list'), (count + 1, total + len(queries)))
+
+    @override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_sampled_requests_use_the_collector(self):
+        count, total = self.observed_queries('category-list')
+        with self.assertLogs('handler.requests'):
+            response, queries = self.capture('get', reverse('category-list'))
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+        self.assertEqual(self.observed_queries('category-list'), (count + 1, total + len(queries)))
+
+
+class AsyncDashboardURLs:
+    """The API with the dashboard served by AsyncDashboardView, as backend/asgi.py does."""
+    urlpatterns = [
+        path('api/dashboard/', AsyncDashboardView.as_view(), name='dashboard'),
+        path('api/', include('handler.urls')),
+    ]
+
+
+@override_settings(
+    REQUEST_METRICS_ENABLED=False,
+    SLOW_QUERY_ENABLED=False,
+    TRANSACTION_CACHE_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    DATABASE_REPLICAS=['replica_test'],
+)
+class ReadReplicaTests(APITransactionTestCase):
+    """Reads of read_replica views go to the replica unless the user just wrote; writes never do."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The replica is an alias mirroring the test database, defined only
+        # while this class runs (the runner sets up the aliases of every class
+        # before any of them runs, so it cannot be listed in `databases` up
+        # front). TransactionTestCase commits the rows so that its separate
+        # connections can read them.
+        connections.settings['replica_test'] = {
+            **connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'},
+        }
+        cls.databases = {*cls.databases, 'replica_test'}
+        cls.addClassCleanup(cls.remove_replica)
+
+    @classmethod
+    def remove_replica(cls):
+        connections['replica_test'].close()
+        del connections['replica_test']
+        del connections.settings['replica_test']
+
+    def setUp(self):
+        cache.clear()
+        create_default_categories()
+        self.user = User.objects.create_user(email='replica@example.com', username='replica', password='test-password')
+        self.category = Category.objects.filter(is_default=True, type='expense').first()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def routed(self, method, path, data=None):
+        """(response, primary SQL, replica SQL) of one request."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_test']) as replica:
+            if method == 'get':
+                response = self.client.get(path, data)
+            else:
+                response = getattr(self.client, method)(path, data, format='json')
+        return response, [query['sql'] for query in primary], [query['sql'] for query in replica]
+
+    @staticmethod
+    def transaction_reads(queries):
+        return [sql for sql in queries if sql.startswith('SELECT') and 'FROM "handler_transaction"' in sql]
+
+    def create_transaction(self):
+        return self.routed('post', reverse('transaction-list'), {
+            'category': self.category.pk, 'type': 'expense', 'amount': '249.50',
+            'description': 'Weekly groceries', 'payment_method': 'upi', 'date': '2025-06-14',
+        })
+
+    def test_safe_requests_read_from_the_replica(self):
+        response, primary, replica = self.routed('get', reverse('transaction-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, [])
+        self.assertEqual(len(self.transaction_reads(replica)), 1)
+
+        # read_replica_methods opts read-only POSTs in
+        response, primary, replica = self.routed('post', reverse('analytics-batch'), {
+            'queries': {'june': {'range': 'custom', 'start_date': '2025-06-01', 'end_date': '2025-06-30'}},
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, [])
+        self.assertEqual(len(self.transaction_reads(replica)), 1)
+
+    def test_views_without_read_replica_use_the_primary(self):
+        response, primary, replica = self.routed('get', reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(primary, [])
+        self.assertEqual(replica, [])
+
+    def test_unsafe_methods_never_use_the_replica(self):
+        response, primary, replica = self.create_transaction()
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(any(sql.startswith('INSERT') for sql in primary))
+        self.assertEqual(replica, [])
+
+        response, primary, replica = self.routed('post', reverse('category-list'), {'name': 'Books', 'type': 'expense'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(any(sql.startswith('INSERT') for sql in primary))
+        self.assertEqual(replica, [])
+
+    def test_writers_are_pinned_to_the_primary(self):
+        self.create_transaction()
+        # Authentication still loads the user from the replica: who is asking
+        # is only known once that read is done
+        response, primary, replica = self.routed('get', reverse('transaction-list'))
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(len(self.transaction_reads(primary)), 1)
+        self.assertEqual(self.transaction_reads(replica), [])
+
+        # The pin expires after REPLICA_STICKY_SECONDS
+        expired = time.time() + settings.REPLICA_STICKY_SECONDS + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            response, primary, replica = self.routed('get', reverse('transaction-list'))
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(primary, [])
+        self.assertEqual(len(self.transaction_reads(replica)), 1)
+
+    def test_pin_is_looked_up_once_per_request(self):
+        with mock.patch('handler.db.cache.get', wraps=cache.get) as get:
+            response, _, replica = self.routed('get', reverse('budget-overview'), {'month': 6, 'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(replica), 2)
+        pin_lookups = [call for call in get.call_args_list if call.args[0].startswith('db_primary_pin:')]
+        self.assertEqual(len(pin_lookups), 1)
+
+    @override_settings(ROOT_URLCONF=AsyncDashboardURLs)
+    async def test_async_views_are_routed_too(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        with mock.patch('handler.db.random.choice', wraps=random.choice) as choice:
+            response = await self.async_client.get(reverse('dashboard'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(choice.call_count, 1)
+
+        # Once pinned, only the authentication read goes to the replica
+        await sync_to_async(self.create_transaction)()
+        with mock.patch('handler.db.random.choice', wraps=random.choice) as choice:
+            response = await self.async_client.get(reverse('dashboard'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(choice.call_count, 1)
+
+
+@override_settings(
+    REQUEST_METRICS_ENABLED=False,
+    SLOW_QUERY_ENABLED=False,
+    TRANSACTION_CACHE_ENABLED=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    ROOT_URLCONF=AsyncDashboardURLs,
+)
+class AsyncDashboardTests(APITransactionTestCase):
+    """The async dashboard matches the sync one and runs through an all-async middleware chain."""
+
+    def setUp(self):
+        create_default_categories()
+        self.user = User.objects.create_user(email='async@example.com', username='async', password='test-password')
+        self.today = datetime.now().date()
+        categories = Category.objects.filter(is_default=True)
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=category, type=category.type, amount=Decimal('125.40') + index,
+                        description=f'{category.name} {index}', date=self.today - timedelta(days=index))
+            for index, category in enumerate(categories)
+        ])
+        month = {'month': self.today.month, 'year': self.today.year}
+        Budget.objects.bulk_create([
+            Budget(user=self.user, amount=Decimal('5000'), is_overall=True, **month),
+            Budget(user=self.user, category=categories.filter(type='expense').first(), amount=Decimal('300'), **month),
+        ])
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def sync_response(self, params):
+        request = APIRequestFactory().get('/api/dashboard/', params)
+        force_authenticate(request, user=self.user)
+        return DashboardView.as_view()(request).render()
+
+    def section_queries(self):
+        ctx = DashboardContext(self.user, self.today.month, self.today.year, self.today)
+        with CaptureQueriesContext(connection) as queries:
+            build_dashboard(ctx)
+        return len(queries)
+
+    async def test_payload_matches_the_sync_view(self):
+        last_month = self.today.replace(day=1) - timedelta(days=1)
+        for params in [{}, {'month': last_month.month, 'year': last_month.year},
+                       {'include': 'stats,budgets'}, {'exclude': 'recent_transactions,monthly_trend'}]:
+            with self.subTest(**params):
+                response = await self.async_client.get(reverse('dashboard'), params, headers=self.headers)
+                expected = await sync_to_async(self.sync_response)(params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+    @override_settings(ASYNC_DASHBOARD_MAX_THREADS=2)
+    async def test_section_threads_are_bounded(self):
+        lock = threading.Lock()
+        running, peak = set(), []
+
+        def run_in_worker(section, ctx):
+            with lock:
+                running.add(threading.get_ident())
+                peak.append(len(running))
+            time.sleep(0.01)
+            try:
+                return run(section, ctx)
+            finally:
+                with lock:
+                    running.discard(threading.get_ident())
+
+        run = dashboard._run_in_worker
+        with mock.patch('handler.dashboard._run_in_worker', run_in_worker):
+            responses = await asyncio.gather(*[
+                self.async_client.get(reverse('dashboard'), headers=self.headers) for _ in range(3)
+            ])
+        self.assertEqual([response.status_code for response in responses], [200] * 3)
+        self.assertEqual(len(peak), 3 * len(dashboard.DASHBOARD_SECTIONS))
+        self.assertEqual(max(peak), 2)
+
+    async def test_middleware_chain_stays_async(self):
+        with mock.patch('django.core.handlers.base.async_to_sync') as async_to_sync:
+            response = await self.async_client.get(reverse('dashboard'), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        async_to_sync.assert_not_called()
+
+    @override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SAMPLE_RATE=1.0)
+    async def test_sampled_requests_count_worker_thread_queries(self):
+        with self.assertLogs('handler.requests') as logs:
+            response = await self.async_client.get(reverse('dashboard'), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        # Authentication, then every section from its own worker thread
+        queries = 1 + await sync_to_async(self.section_queries)()
+        self.assertIn(f'desc="{queries} queries"', response['Server-Timing'])
+        self.assertEqual(logs.records[0].request_metrics['db_queries'], queries)
+
+
+@override_settings(SLOW_QUERY_EXPLAIN=False)
+class SlowQueryLogTests(SimpleTestCase):
+    """Slow query records leave parameter values out unless asked to, in a file only its owner reads."""
+
+    def recorded_params(self):
+        params = ['ada@example.com', 42, Decimal('9.99'), None]
+        with self.assertLogs('handler.slow_queries'), self.assertLogs('handler.slow_queries.records') as records:
+            slow_queries.record_slow_query('SELECT * FROM "handler_user" WHERE "email" = %s', params,
+                                           False, connection, 0.25)
+        return json.loads(records.records[0].getMessage())['params']
+
+    def test_params_are_recorded_as_types(self):
+        self.assertEqual(self.recorded_params(), ['str', 'int', 'Decimal', 'NoneType'])
+
+    @override_settings(SLOW_QUERY_LOG_PARAMS=True)
+    def test_param_values_are_recorded_when_enabled(self):
+        self.assertEqual(self.recorded_params(), ['ada@example.com', 42, '9.99', None])
+
+    def test_log_file_is_private_and_follows_rotation(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'var', 'slow_queries.jsonl')
+            handler = slow_queries.PrivateWatchedFileHandler(path, delay=True)
+            record = logging.makeLogRecord({'msg': '{}'})
+            try:
+                handler.emit(record)
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+                self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+                os.rename(path, f'{path}.1')
+                handler.emit(record)
+            finally:
+                handler.close()
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+            self.assertEqual(slow_queries.log_files(path), [f'{path}.1', path])
+
+
+class LoadCleanUpTests(SeededAPITestCase):
+    """benchmark load leaves the dataset users' derived data as it found it."""
+
+    def derived(self):
+        stats = SpendingStats.objects.filter(user=self.user).order_by('category_id').values_list(
+            'category_id', 'count', 'mean', 'm2', 'ewma_mean', 'ewma_var',
+        )
+        payments = RecurringPayment.objects.filter(user=self.user).order_by('description_key', 'amount_band')
+        return list(stats), list(payments.values_list('description_key', 'occurrences', 'last_date'))
+
+    def test_clean_up_restores_the_dataset_users(self):
+        call_command('detect_subscriptions', stdout=StringIO())
+        before = self.derived()
+        started_at = timezone.now()
+        for amount in ('249.50', '99999.00', '249.50'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.capture('post', reverse('transaction-list'), {
+                    'category': self.category.pk, 'type': 'expense', 'amount': amount,
+                    'description': load.CREATED_DESCRIPTION, 'date': date.today().isoformat(),
+                }, status_code=201)
+        self.assertNotEqual(self.derived(), before)
+        stamps = transaction_cache.current_stamps(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            load.clean_up([self.user.email], started_at)
+        self.assertEqual(self.derived(), before)
+        self.assertFalse(Transaction.objects.filter(description=load.CREATED_DESCRIPTION).exists())
+        self.assertFalse(Notification.objects.filter(user=self.user, created_at__gte=started_at).exists())
+        # Cached transaction columns and forecasts are checked against these
+        self.assertNotEqual(transaction_cache.current_stamps(self.user.pk), stamps)
+
+
+class LoadRegressionTests(SimpleTestCase):
+    """benchmark load flags errors, lost throughput and slower p95s beyond the tolerance."""
+
+    BASELINE = {
+        'total': {'rps': 100.0, 'errors': 0},
+        'steps': {'login': {'p95_ms': 200.0}, 'dashboard': {'p95_ms': 50.0}},
+    }
+
+    def results(self, rps=100.0, errors=0, **p95s):
+        steps = {step: {'p95_ms': p95s.get(step, base['p95_ms'])} for step, base in self.BASELINE['steps'].items()}
+        return {'total': {'rps': rps, 'errors': errors}, 'steps': steps}
+
+    def test_changes_within_the_tolerance_pass(self):
+        self.assertEqual(load.find_regressions(self.results(rps=90.0, dashboard=55.0), self.BASELINE, 0.1), [])
+        # The thresholds themselves are still within the tolerance
+        self.assertEqual(load.find_regressions(self.results(rps=80.0, login=240.0), self.BASELINE, 0.2), [])
+
+    def test_regressions_beyond_the_tolerance_are_reported(self):
+        regressions = load.find_regressions(self.results(rps=89.0, dashboard=55.5), self.BASELINE, 0.1)
+        self.assertEqual(regressions, [
+            'throughput 89.0 req/s vs baseline 100.0 req/s', 'dashboard: p95 55.5 ms vs baseline 50.0 ms',
+        ])
+
+    def test_errors_and_missing_steps_are_regressions(self):
+        results = self.results(errors=3)
+        del results['steps']['login']
+        self.assertEqual(load.find_regressions(results, self.BASELINE, 0.1), [
+            '3 requests failed', 'login: no requests completed',
+        ])
@@ -0,0 +1,198 @@
+"""
+Per-process cache of each active user's transactions as TransactionColumns.
+
+The analytics engine asks for the columns of a date window; with the cache
+enabled it gets the user's whole history instead, loaded once and kept as
+NumPy arrays (about 40 bytes per transaction, no model instances), so repeat
+analytics requests cut their windows out of memory.
+
+Entries are kept in LRU order within TRANSACTION_CACHE_MAX_BYTES and expire
+after TRANSACTION_CACHE_TTL seconds. Saving or deleting a transaction, or
+changing a category whose snapshot is copied onto transactions, bumps a
+version stamp in the default cache once the write commits. Every read checks
+the stamps, so entries in other worker processes go stale too. Like the
+replica pin in db.py, that needs a default cache shared between workers
+(REDIS_URL); with the local-memory cache other workers only notice at the TTL,
+so the cache is off by default without REDIS_URL.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import TRANSACTION_CACHE_BYTES, TRANSACTION_CACHE_EVICTIONS, TRANSACTION_CACHE_LOOKUPS
+
+# Bumped when a shared (default) category changes, which touches every user
+ALL_USERS_STAMP_KEY = 'transaction_columns:all'
+
+
+def stamp_key(user_id):
+    return f'transaction_columns:{user_id}'
+
+
+class _Entry:
+    __slots__ = ('columns', 'stamps', 'loaded_at', 'nbytes')
+
+    def __init__(self, columns, stamps):
+        self.columns = columns
+        self.stamps = stamps
+        self.loaded_at = time.monotonic()
+        self.nbytes = columns.nbytes
+
+
+class TransactionColumnsCache:
+    """Thread-safe LRU of per-user TransactionColumns, bounded by their total size."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._oversized = set()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    def get(self, user_id, stamps, ttl):
+        """The user's columns if cached with the same stamps within ttl seconds, else None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry.stamps != stamps or time.monotonic() - entry.loaded_at > ttl:
+                self._remove(user_id)
+                return None
+            self._entries.move_to_end(user_id)
+            return entry.columns
+
+    def put(self, user_id, columns, stamps, max_bytes):
+        """Cache the columns, evicting least recently used users to stay within max_bytes."""
+        for array in (columns.days, columns.amounts, columns.types,
+                      columns.categories, columns.labels, columns.payment_methods):
+            # Shared between threads from now on
+            array.flags.writeable = False
+        entry = _Entry(columns, stamps)
+        with self._lock:
+            self._remove(user_id)
+            if entry.nbytes > max_bytes:
+                # Would evict everyone else; such users read their window from the database
+                self._oversized.add(user_id)
+                return
+            self._entries[user_id] = entry
+            self.nbytes += entry.nbytes
+            while self.nbytes > max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                TRANSACTION_CACHE_EVICTIONS.inc()
+            TRANSACTION_CACHE_BYTES.set(self.nbytes)
+
+    def is_oversized(self, user_id):
+        return user_id in self._oversized
+
+    def discard(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+            self._oversized.discard(user_id)
+            TRANSACTION_CACHE_BYTES.set(self.nbytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._oversized.clear()
+            self.nbytes = 0
+            TRANSACTION_CACHE_BYTES.set(0)
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+
+columns_cache = TransactionColumnsCache()
+
+
+def current_stamps(user_id):
+    """The user's and the all-users version stamps, in one round trip to the default cache."""
+    keys = [stamp_key(user_id), ALL_USERS_STAMP_KEY]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A missing (never written or evicted) stamp gets a fresh value, so it
+            # can never match an entry cached before the stamp disappeared
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return found[keys[0]], found[keys[1]]
+
+
+def get_or_load(user_id, load):
+    """
+    The user's cached columns, calling load() on a miss, or None for users too
+    large for TRANSACTION_CACHE_MAX_BYTES.
+    """
+    if columns_cache.is_oversized(user_id):
+        TRANSACTION_CACHE_LOOKUPS.labels('oversized').inc()
+        return None
+    # Read the stamps before loading: a write committing meanwhile bumps them
+    # and makes the entry stored below stale instead of silently missing it
+    stamps = current_stamps(user_id)
+    columns = columns_cache.get(user_id, stamps, settings.TRANSACTION_CACHE_TTL)
+    if columns is not None:
+        TRANSACTION_CACHE_LOOKUPS.labels('hit').inc()
+        return columns
+    TRANSACTION_CACHE_LOOKUPS.labels('miss').inc()
+    columns = load()
+    columns_cache.put(user_id, columns, stamps, settings.TRANSACTION_CACHE_MAX_BYTES)
+    return columns
+
+
+def _bump(key, user_id=None):
+    cache.set(key, uuid.uuid4().hex, None)
+    if user_id is None:
+        columns_cache.clear()
+    else:
+        columns_cache.discard(user_id)
+
+
+def invalidate_user(user_id):
+    """Expire the user's cached columns in every worker once the current transaction commits."""
+    columns_cache.discard(user_id)
+    transaction.on_commit(lambda: _bump(stamp_key(user_id), user_id))
+
+
+def invalidate_all_users():
+    columns_cache.clear()
+    transaction.on_commit(lambda: _bump(ALL_USERS_STAMP_KEY))
+
+
+# ============================================
+# SIGNAL RECEIVERS (connected in apps.py)
+# ============================================
+
+def transaction_changed(sender, instance, **kwargs):
+    """post_save / post_delete receiver for Transaction."""
+    invalidate_user(instance.user_id)
+
+
+def category_changed(sender, instance, created=False, **kwargs):
+    """post_save / post_delete receiver for Category: its snapshot lives on the transactions."""
+    if created:
+        return
+    if instance.user_id is None:
+        invalidate_all_users()
+    else:
+        invalidate_user(instance.user_id)
+
+
+def snapshots_changed(sender, user_ids, **kwargs):
+    """category_snapshots_changed receiver: a bulk category update rewrote many snapshots."""
+    if None in user_ids:
+        invalidate_all_users()
+    else:
+        for user_id in user_ids:
+            invalidate_user(user_id)
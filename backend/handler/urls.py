@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     SignupView,
@@ -8,6 +9,7 @@ from .views import (
     UserProfileView,
     ChangePasswordView,
     DashboardView,
+    AsyncDashboardView,
     ForgotPasswordView,
     ResetPasswordView,
     ValidateResetTokenView,
@@ -19,12 +21,16 @@ from .views import (
     BudgetListCreateView,
     BudgetDetailView,
     BudgetOverviewView,
+    BudgetForecastView,
+    SubscriptionListView,
     NotificationListView,
     NotificationCountView,
     NotificationMarkReadView,
     NotificationDeleteView,
     AnalyticsView,
     AnalyticsDateRangeView,
+    BatchAnalyticsView,
+    PivotView,
 )
 
 urlpatterns = [
@@ -45,8 +51,8 @@ urlpatterns = [
     # User profile endpoints
     path('auth/profile/', UserProfileView.as_view(), name='profile'),
     
-    # Dashboard endpoint
-    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    # Dashboard endpoint (async variant when served through backend/asgi.py)
+    path('dashboard/', AsyncDashboardView.as_view() if settings.ASYNC_DASHBOARD else DashboardView.as_view(), name='dashboard'),
     
     # Category endpoints
     path('categories/', CategoryListCreateView.as_view(), name='category-list'),
@@ -59,8 +65,12 @@ urlpatterns = [
     # Budget endpoints
     path('budgets/', BudgetListCreateView.as_view(), name='budget-list'),
     path('budgets/overview/', BudgetOverviewView.as_view(), name='budget-overview'),
+    path('budgets/forecast/', BudgetForecastView.as_view(), name='budget-forecast'),
     path('budgets/<int:pk>/', BudgetDetailView.as_view(), name='budget-detail'),
     
+    # Detected subscriptions and other recurring payments
+    path('subscriptions/', SubscriptionListView.as_view(), name='subscription-list'),
+    
     # Notification endpoints
     path('notifications/', NotificationListView.as_view(), name='notification-list'),
     path('notifications/count/', NotificationCountView.as_view(), name='notification-count'),
@@ -70,4 +80,6 @@ urlpatterns = [
     # Analytics endpoint
     path('analytics/', AnalyticsView.as_view(), name='analytics'),
     path('analytics/range/', AnalyticsDateRangeView.as_view(), name='analytics-range'),
+    path('analytics/batch/', BatchAnalyticsView.as_view(), name='analytics-batch'),
+    path('analytics/pivot/', PivotView.as_view(), name='analytics-pivot'),
 ]
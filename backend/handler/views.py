@@ -4,12 +4,19 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, get_user_model
 from django.conf import settings
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncMonth
+from django.http import HttpResponse
+from django.views import View
+from django.utils.crypto import constant_time_compare
+from django.db.models import Sum
 from google.oauth2 import id_token
 from google.auth.transport import requests
 import uuid
@@ -31,8 +38,25 @@ from .serializers import (
     TransactionSerializer,
     BudgetSerializer,
     NotificationSerializer,
+    serialize_transactions,
+    serialize_notifications,
 )
-from .models import UserProfile, PasswordResetToken, Category, Transaction, Budget, Notification
+from .models import UserProfile, PasswordResetToken, Category, Transaction, Budget, Notification, RecurringPayment
+from .renderers import ORJSONRenderer, MessagePackRenderer
+from .metrics import BUDGET_ALERTS, count_email, render_metrics
+from .dashboard import (
+    DASHBOARD_RESPONSE_SECTIONS, DashboardContext, parse_sections, parse_selected_month, build_dashboard,
+    abuild_dashboard,
+)
+from .analytics import (
+    MONTH_SECTIONS, RANGE_SECTIONS, batch_range_analytics, currency_for, money, parse_batch, parse_range,
+    range_analytics,
+)
+from .insights import month_payload
+from .anomalies import record_expense
+from .forecast import OVERALL, budget_forecast, budget_projection, month_projections
+from .recurring import is_active_payment, monthly_cost
+from .pivot import PivotError, parse_pivot, pivot_rows
 
 User = get_user_model()
 
@@ -369,293 +393,80 @@ class DashboardView(APIView):
     Query params:
     - month: 1-12 (optional, defaults to current month)
     - year: YYYY (optional, defaults to current year)
+    - include / exclude: comma-separated sections to compute or skip (stats,
+      today, budgets, expense_by_category, income_by_category, monthly_trend,
+      recent_transactions; optional, defaults to all)
     
     Returns: Complete dashboard data including stats, transactions, budgets, charts
     """
     permission_classes = [IsAuthenticated]
+    read_replica = True
     
     def get(self, request):
-        user = request.user
-        user_data = UserSerializer(user).data
-        
-        # Get current date info
         today = datetime.now().date()
-        
-        # Get selected month/year from query params (defaults to current)
+        selected_month, selected_year = parse_selected_month(request.query_params, today)
         try:
-            selected_month = int(request.query_params.get('month', today.month))
-            selected_year = int(request.query_params.get('year', today.year))
-            # Validate month is 1-12
-            if selected_month < 1 or selected_month > 12:
-                selected_month = today.month
-            # Validate year is reasonable (2020-2030)
-            if selected_year < 2020 or selected_year > 2030:
-                selected_year = today.year
-        except (ValueError, TypeError):
-            selected_month = today.month
-            selected_year = today.year
-        
-        # Check if viewing current month
-        is_current_month = (selected_month == today.month and selected_year == today.year)
-        
-        # Calculate previous month for comparison
-        if selected_month == 1:
-            prev_month = 12
-            prev_month_year = selected_year - 1
-        else:
-            prev_month = selected_month - 1
-            prev_month_year = selected_year
-        
-        # Get all user transactions (for total balance calculation)
-        user_transactions = Transaction.objects.filter(user=user)
-        
-        # Calculate total balance (all income - all expenses across ALL time)
-        total_income_all = user_transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        total_expenses_all = user_transactions.filter(type='expense').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        total_balance = total_income_all - total_expenses_all
-        
-        # Monthly income (selected month)
-        monthly_income = user_transactions.filter(
-            type='income',
-            date__month=selected_month,
-            date__year=selected_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Monthly expenses (selected month)
-        monthly_expenses = user_transactions.filter(
-            type='expense',
-            date__month=selected_month,
-            date__year=selected_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Calculate savings for selected month
-        savings = monthly_income - monthly_expenses
-        savings_rate = (savings / monthly_income * 100) if monthly_income > 0 else Decimal('0')
-        
-        # Previous month stats for comparison
-        prev_month_income = user_transactions.filter(
-            type='income',
-            date__month=prev_month,
-            date__year=prev_month_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        prev_month_expenses = user_transactions.filter(
-            type='expense',
-            date__month=prev_month,
-            date__year=prev_month_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Calculate percentage changes vs previous month
-        income_change = ((monthly_income - prev_month_income) / prev_month_income * 100) if prev_month_income > 0 else Decimal('0')
-        expense_change = ((monthly_expenses - prev_month_expenses) / prev_month_expenses * 100) if prev_month_expenses > 0 else Decimal('0')
-        
-        # Today's stats (only relevant if viewing current month)
-        if is_current_month:
-            today_income = user_transactions.filter(
-                type='income', date=today
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            today_expenses = user_transactions.filter(
-                type='expense', date=today
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            today_transactions_count = user_transactions.filter(date=today).count()
-        else:
-            today_income = Decimal('0')
-            today_expenses = Decimal('0')
-            today_transactions_count = 0
-        
-        # Recent transactions for selected month (last 10)
-        recent_transactions = user_transactions.filter(
-            date__month=selected_month,
-            date__year=selected_year
-        )[:10]
-        recent_transactions_data = TransactionSerializer(recent_transactions, many=True).data
-        
-        # Expense breakdown by category (for pie chart) - selected month
-        expense_by_category = user_transactions.filter(
-            type='expense',
-            date__month=selected_month,
-            date__year=selected_year
-        ).values('category__name', 'category__color').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        # Income breakdown by category (for pie chart) - selected month
-        income_by_category = user_transactions.filter(
-            type='income',
-            date__month=selected_month,
-            date__year=selected_year
-        ).values('category__name', 'category__color').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        # Monthly trend (last 6 months from selected month)
-        from dateutil.relativedelta import relativedelta
-        import calendar
-        
-        # Calculate 6 months back from selected month
-        selected_date = datetime(selected_year, selected_month, 1)
-        six_months_ago = selected_date - relativedelta(months=5)
-        
-        monthly_trend = user_transactions.filter(
-            date__gte=six_months_ago.date(),
-            date__lte=datetime(selected_year, selected_month, calendar.monthrange(selected_year, selected_month)[1]).date()
-        ).annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            income=Sum('amount', filter=models.Q(type='income')),
-            expense=Sum('amount', filter=models.Q(type='expense'))
-        ).order_by('month')
-        
-        monthly_trend_data = [
-            {
-                'month': item['month'].strftime('%b %Y') if item['month'] else '',
-                'income': float(item['income'] or 0),
-                'expense': float(item['expense'] or 0),
-            }
-            for item in monthly_trend
-        ]
-        
-        # Budget overview for selected month
-        user_budgets = Budget.objects.filter(
-            user=user,
-            month=selected_month,
-            year=selected_year,
-            is_overall=False
-        )
-        
-        # Check if budget exists for this month
-        has_budget = user_budgets.exists() or Budget.objects.filter(
-            user=user,
-            month=selected_month,
-            year=selected_year,
-            is_overall=True
-        ).exists()
-        
-        budget_overview = []
-        for budget in user_budgets:
-            if budget.category:
-                spent = user_transactions.filter(
-                    category=budget.category,
-                    type='expense',
-                    date__month=selected_month,
-                    date__year=selected_year
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                percentage = (spent / budget.amount * 100) if budget.amount > 0 else 0
-                budget_status = 'exceeded' if percentage >= 100 else ('warning' if percentage >= budget.alert_threshold else 'normal')
-                
-                budget_overview.append({
-                    'id': budget.id,
-                    'category': budget.category.name,
-                    'category_color': budget.category.color,
-                    'budget': float(budget.amount),
-                    'spent': float(spent),
-                    'percentage': float(percentage),
-                    'status': budget_status,
-                    'alert_threshold': budget.alert_threshold
-                })
-        
-        # Overall monthly budget for selected month
-        overall_budget = Budget.objects.filter(
-            user=user,
-            is_overall=True,
-            month=selected_month,
-            year=selected_year
-        ).first()
-        
-        if overall_budget:
-            monthly_budget = float(overall_budget.amount)
-            budget_used_percentage = (float(monthly_expenses) / monthly_budget * 100) if monthly_budget > 0 else 0
-            overall_status = 'exceeded' if budget_used_percentage >= 100 else ('warning' if budget_used_percentage >= overall_budget.alert_threshold else 'normal')
-        else:
-            monthly_budget = 0
-            budget_used_percentage = 0
-            overall_status = 'normal'
-        
-        # Get currency from profile
+            sections = parse_sections(request.query_params, list(DASHBOARD_RESPONSE_SECTIONS))
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        ctx = DashboardContext(request.user, selected_month, selected_year, today, sections)
+        return Response(build_dashboard(ctx), status=status.HTTP_200_OK)
+
+
+class AsyncDashboardView(View):
+    """
+    Async variant of DashboardView, served by backend/asgi.py.
+    
+    Runs the independent dashboard sections concurrently in worker threads.
+    The response body is identical to DashboardView.
+    
+    GET /api/dashboard/
+    Query params: same as DashboardView
+    """
+    read_replica = True
+    renderer_classes = [ORJSONRenderer, MessagePackRenderer]
+    
+    async def get(self, request):
+        # Same Accept negotiation as the DRF views, falling back to JSON
         try:
-            currency = user.profile.currency
-        except UserProfile.DoesNotExist:
-            currency = 'INR'
-        
-        # Month name for display
-        import calendar
-        month_name = calendar.month_name[selected_month]
+            renderer, accepted_media_type = DefaultContentNegotiation().select_renderer(
+                Request(request), [renderer_class() for renderer_class in self.renderer_classes]
+            )
+        except NotAcceptable:
+            renderer, accepted_media_type = ORJSONRenderer(), None
         
-        # Transaction count for selected month
-        selected_month_transactions_count = user_transactions.filter(
-            date__month=selected_month,
-            date__year=selected_year
-        ).count()
+        # Same authentication and error body as the DRF views
+        try:
+            auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+            auth_error = NotAuthenticated()
+        except AuthenticationFailed as e:
+            auth, auth_error = None, e
+        if auth is None:
+            data = auth_error.detail if isinstance(auth_error.detail, (list, dict)) else {'detail': auth_error.detail}
+            return HttpResponse(
+                renderer.render(data, accepted_media_type),
+                status=status.HTTP_401_UNAUTHORIZED,
+                content_type=renderer.media_type,
+                headers={'WWW-Authenticate': JWTAuthentication().authenticate_header(request)},
+            )
         
-        return Response({
-            'success': True,
-            'message': f'Dashboard for {month_name} {selected_year}',
-            'user': user_data,
-            'currency': currency,
-            'selected_month': selected_month,
-            'selected_year': selected_year,
-            'is_current_month': is_current_month,
-            'has_budget': has_budget,
-            'dashboard': {
-                # Main stats (total balance is across ALL time)
-                'total_balance': float(total_balance),
-                'monthly_income': float(monthly_income),
-                'monthly_expenses': float(monthly_expenses),
-                'savings': float(savings),
-                'savings_rate': float(savings_rate),
-                
-                # Comparison with previous month
-                'income_change': float(income_change),
-                'expense_change': float(expense_change),
-                
-                # Today's stats (only for current month)
-                'today': {
-                    'income': float(today_income),
-                    'expenses': float(today_expenses),
-                    'transactions_count': today_transactions_count,
-                },
-                
-                # Selected month stats
-                'this_month': {
-                    'income': float(monthly_income),
-                    'expenses': float(monthly_expenses),
-                    'transactions_count': selected_month_transactions_count,
-                },
-                
-                # Budget
-                'monthly_budget': monthly_budget,
-                'budget_used_percentage': budget_used_percentage,
-                'overall_status': overall_status,
-                'budget_overview': budget_overview,
-                
-                # Charts data
-                'expense_by_category': [
-                    {
-                        'name': item['category__name'] or 'Uncategorized',
-                        'value': float(item['total']),
-                        'color': item['category__color'] or '#6366f1'
-                    }
-                    for item in expense_by_category
-                ],
-                'income_by_category': [
-                    {
-                        'name': item['category__name'] or 'Uncategorized',
-                        'value': float(item['total']),
-                        'color': item['category__color'] or '#10b981'
-                    }
-                    for item in income_by_category
-                ],
-                'monthly_trend': monthly_trend_data,
-                
-                # Recent transactions for selected month
-                'recent_transactions': recent_transactions_data,
-            }
-        }, status=status.HTTP_200_OK)
+        request.user = auth[0]
+        today = datetime.now().date()
+        selected_month, selected_year = parse_selected_month(request.GET, today)
+        try:
+            sections = parse_sections(request.GET, list(DASHBOARD_RESPONSE_SECTIONS))
+        except ValueError as e:
+            return HttpResponse(
+                renderer.render({'success': False, 'message': str(e)}, accepted_media_type),
+                status=status.HTTP_400_BAD_REQUEST,
+                content_type=renderer.media_type,
+            )
+        ctx = DashboardContext(request.user, selected_month, selected_year, today, sections)
+        payload = await abuild_dashboard(ctx)
+        return HttpResponse(renderer.render(payload, accepted_media_type), content_type=renderer.media_type)
 
 
 # Need to import models for Q filter
@@ -691,8 +502,9 @@ class ForgotPasswordView(APIView):
             reset_url = f"{settings.FRONTEND_URL}/reset-password/{reset_token.token}"
             
             # Send email (will work when SMTP is configured)
+            sent = 0
             try:
-                send_mail(
+                sent = send_mail(
                     subject='Reset Your WealthWise Password',
                     message=f'''
 Hello {user.get_short_name()},
@@ -714,6 +526,7 @@ WealthWise Team
                 )
             except Exception:
                 pass  # Email will be sent when SMTP is configured
+            count_email('password_reset', sent)
             
         except User.DoesNotExist:
             pass  # Don't reveal if user exists
@@ -821,6 +634,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = CategorySerializer
+    read_replica = True
     
     def get_queryset(self):
         # Return default categories + user's custom categories
@@ -865,6 +679,7 @@ class TransactionListCreateView(generics.ListCreateAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = TransactionSerializer
+    read_replica = True
     
     def get_queryset(self):
         queryset = Transaction.objects.filter(user=self.request.user)
@@ -897,14 +712,20 @@ class TransactionListCreateView(generics.ListCreateAPIView):
         
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path: rows stream straight from values_list() into dicts
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(serialize_transactions(queryset))
+    
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         
-        # Check budget alerts after creating expense transaction
+        # Check budget alerts and unusual spending after creating expense transaction
         if serializer.validated_data.get('type') == 'expense':
             check_and_create_budget_alerts(request.user)
+            record_expense(serializer.instance)
         
         return Response({
             'success': True,
@@ -949,6 +770,7 @@ class BudgetListCreateView(generics.ListCreateAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = BudgetSerializer
+    read_replica = True
     
     def get_queryset(self):
         queryset = Budget.objects.filter(user=self.request.user)
@@ -1091,8 +913,9 @@ def check_and_create_budget_alerts(user, transaction=None):
                 
                 # Send email if enabled
                 if email_notifications:
+                    sent = 0
                     try:
-                        send_mail(
+                        sent = send_mail(
                             subject=f'⚠️ Budget Alert: {budget_name} Exceeded!',
                             message=f'''
 Hello {user.get_short_name()},
@@ -1115,6 +938,7 @@ WealthWise Team
                         notification.email_sent = True
                     except Exception:
                         pass
+                    count_email('budget_exceeded', sent)
         
         # Check if budget near limit (warning threshold)
         elif percentage >= budget.alert_threshold:
@@ -1143,8 +967,9 @@ WealthWise Team
                 
                 # Send warning email if enabled
                 if email_notifications:
+                    sent = 0
                     try:
-                        send_mail(
+                        sent = send_mail(
                             subject=f'⚡ Budget Warning: {budget_name} at {percentage:.1f}%',
                             message=f'''
 Hello {user.get_short_name()},
@@ -1168,10 +993,13 @@ WealthWise Team
                         notification.email_sent = True
                     except Exception:
                         pass
+                    count_email('budget_warning', sent)
     
     # Bulk create notifications
     if notifications_to_create:
         Notification.objects.bulk_create(notifications_to_create)
+        for notification in notifications_to_create:
+            BUDGET_ALERTS.labels(notification.type).inc()
 
 
 class NotificationListView(generics.ListAPIView):
@@ -1184,6 +1012,7 @@ class NotificationListView(generics.ListAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
+    read_replica = True
     
     def get_queryset(self):
         queryset = Notification.objects.filter(user=self.request.user)
@@ -1193,6 +1022,10 @@ class NotificationListView(generics.ListAPIView):
             queryset = queryset.filter(is_read=False)
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(serialize_notifications(queryset))
 
 
 class NotificationCountView(APIView):
@@ -1281,6 +1114,7 @@ class BudgetOverviewView(APIView):
     Returns: Overall budget, category budgets with spent amounts, alerts
     """
     permission_classes = [IsAuthenticated]
+    read_replica = True
     
     def get(self, request):
         user = request.user
@@ -1341,6 +1175,9 @@ class BudgetOverviewView(APIView):
             date__year=selected_year
         ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
         
+        # Month-end projections for every budget, from one batch computation
+        projections = month_projections(user, selected_month, selected_year, today)
+        
         # Build overall budget data
         overall_data = None
         if overall_budget:
@@ -1354,6 +1191,7 @@ class BudgetOverviewView(APIView):
                 'percentage': float(percentage),
                 'status': budget_status,
                 'alert_threshold': overall_budget.alert_threshold,
+                'forecast': budget_forecast(overall_budget, projections),
             }
         
         # Build category budgets data
@@ -1382,6 +1220,7 @@ class BudgetOverviewView(APIView):
                     'percentage': float(percentage),
                     'status': budget_status,
                     'alert_threshold': budget.alert_threshold,
+                    'forecast': budget_forecast(budget, projections),
                 })
         
         # Sort by percentage (highest first)
@@ -1416,6 +1255,133 @@ class BudgetOverviewView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class BudgetForecastView(APIView):
+    """
+    API endpoint for projected month-end spending per budget.
+    
+    GET /api/budgets/forecast/
+    Query params:
+    - month: 1-12 (optional, defaults to current month)
+    - year: YYYY (optional, defaults to current year)
+    
+    Returns: Spent so far and projected month-end total for the overall budget,
+    every category budget and all expenses of the month
+    """
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+    
+    def get(self, request):
+        user = request.user
+        today = datetime.now().date()
+        selected_month, selected_year = parse_selected_month(request.query_params, today)
+        currency, _ = currency_for(user)
+        
+        projections = month_projections(user, selected_month, selected_year, today)
+        spent, projected, daily_rate, recurring = projections['projections'].get(OVERALL, (0, 0, 0, 0))
+        
+        overall_data = None
+        category_data = []
+        for budget in Budget.objects.filter(
+            user=user, month=selected_month, year=selected_year,
+        ).select_related('category'):
+            data = {
+                'id': budget.id,
+                'amount': float(budget.amount),
+                'spent': float(money(budget_projection(budget, projections)[0])),
+                'alert_threshold': budget.alert_threshold,
+                **budget_forecast(budget, projections),
+            }
+            if budget.is_overall:
+                overall_data = data
+            elif budget.category:
+                category_data.append({
+                    **data,
+                    'category_id': budget.category.id,
+                    'category_name': budget.category.name,
+                    'category_color': budget.category.color,
+                })
+        
+        # Sort by projected percentage (highest first)
+        category_data.sort(key=lambda x: x['projected_percentage'], reverse=True)
+        
+        return Response({
+            'success': True,
+            'currency': currency,
+            'month': selected_month,
+            'year': selected_year,
+            'is_current_month': selected_month == today.month and selected_year == today.year,
+            'days_remaining': projections['days_remaining'],
+            'total_expenses': float(money(spent)),
+            'projected_expenses': float(money(projected)),
+            'daily_rate': float(money(daily_rate)),
+            'recurring_pending': float(money(recurring)),
+            'overall_budget': overall_data,
+            'category_budgets': category_data,
+        }, status=status.HTTP_200_OK)
+
+
+class SubscriptionListView(APIView):
+    """
+    API endpoint for the subscriptions and other recurring payments detected
+    in the user's transactions.
+    
+    GET /api/subscriptions/
+    Query params:
+    - type: expense (default), income or all
+    - active: true to leave out payments whose next charge is overdue by half a period
+    
+    Returns: Recurring payments with their frequency, next expected charge and
+    monthly cost, most expensive first
+    """
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+    
+    def get(self, request):
+        user = request.user
+        today = datetime.now().date()
+        currency, _ = currency_for(user)
+        
+        payments = RecurringPayment.objects.filter(user=user).select_related('category')
+        payment_type = request.query_params.get('type', 'expense')
+        if payment_type != 'all':
+            payments = payments.filter(type=payment_type)
+        active_only = request.query_params.get('active', '').lower() == 'true'
+        
+        subscriptions = []
+        for payment in payments:
+            active = is_active_payment(payment, today)
+            if active_only and not active:
+                continue
+            subscriptions.append({
+                'id': payment.id,
+                'description': payment.description,
+                'type': payment.type,
+                'category_id': payment.category_id,
+                'category_name': payment.category.name if payment.category else None,
+                'category_color': payment.category.color if payment.category else None,
+                'amount': float(payment.amount),
+                'frequency': payment.frequency,
+                'interval_days': payment.interval_days,
+                'occurrences': payment.occurrences,
+                'first_date': payment.first_date,
+                'last_date': payment.last_date,
+                'next_date': payment.next_date,
+                'is_active': active,
+                'monthly_cost': round(monthly_cost(payment), 2),
+            })
+        
+        # Most expensive first
+        subscriptions.sort(key=lambda x: x['monthly_cost'], reverse=True)
+        
+        return Response({
+            'success': True,
+            'currency': currency,
+            'count': len(subscriptions),
+            'monthly_total': round(sum(s['monthly_cost'] for s in subscriptions if s['is_active']), 2),
+            'subscriptions': subscriptions,
+        }, status=status.HTTP_200_OK)
+
+
 def create_default_categories():
     """Create default categories if they don't exist."""
     default_categories = [
@@ -1458,849 +1424,170 @@ def create_default_categories():
 class AnalyticsView(APIView):
     """
     Analytics & Insights API endpoint.
-    Provides comprehensive financial analytics with smart insights.
+    Provides comprehensive financial analytics with smart insights,
+    computed in memory from one transaction query (see handler/analytics.py).
+    Closed months are served from reports stored by precompute_insights.
     
     GET /api/analytics/
     Query params:
     - month: 1-12 (optional, defaults to current month)
     - year: YYYY (optional, defaults to current year)
+    - include / exclude: comma-separated sections to compute or skip (summary,
+      charts, insights, budget_alerts, comparison; optional, defaults to all)
     
     Returns: Charts data, spending insights, comparisons
     """
     permission_classes = [IsAuthenticated]
+    read_replica = True
     
     def get(self, request):
-        user = request.user
         today = datetime.now().date()
-        
-        # Get selected month/year from query params
+        selected_month, selected_year = parse_selected_month(request.query_params, today)
         try:
-            selected_month = int(request.query_params.get('month', today.month))
-            selected_year = int(request.query_params.get('year', today.year))
-            if selected_month < 1 or selected_month > 12:
-                selected_month = today.month
-            if selected_year < 2020 or selected_year > 2030:
-                selected_year = today.year
-        except (ValueError, TypeError):
-            selected_month = today.month
-            selected_year = today.year
-        
-        # Calculate previous month
-        if selected_month == 1:
-            prev_month = 12
-            prev_month_year = selected_year - 1
-        else:
-            prev_month = selected_month - 1
-            prev_month_year = selected_year
-        
-        # Get currency
-        try:
-            currency = user.profile.currency
-        except UserProfile.DoesNotExist:
-            currency = 'INR'
-        
-        currency_symbols = {
-            'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥',
-            'AUD': 'A$', 'CAD': 'C$', 'CHF': 'CHF', 'CNY': '¥', 'SGD': 'S$',
-        }
-        symbol = currency_symbols.get(currency, currency)
-        
-        # Get all user transactions
-        user_transactions = Transaction.objects.filter(user=user)
-        
-        # ========================================
-        # CHART 1: Expense by Category (Pie Chart)
-        # ========================================
-        expense_by_category = user_transactions.filter(
-            type='expense',
-            date__month=selected_month,
-            date__year=selected_year
-        ).values('category__name', 'category__color').annotate(
-            total=Sum('amount')
-        ).order_by('-total')
-        
-        expense_pie_data = [
-            {
-                'name': item['category__name'] or 'Uncategorized',
-                'value': float(item['total']),
-                'color': item['category__color'] or '#6366f1'
-            }
-            for item in expense_by_category
-        ]
-        
-        # ========================================
-        # CHART 2: Income vs Expense (Bar Chart)
-        # ========================================
-        # Last 6 months data
-        from dateutil.relativedelta import relativedelta
-        import calendar
-        
-        income_vs_expense_data = []
-        for i in range(5, -1, -1):
-            # Calculate month
-            calc_date = datetime(selected_year, selected_month, 1) - relativedelta(months=i)
-            m = calc_date.month
-            y = calc_date.year
-            
-            month_income = user_transactions.filter(
-                type='income', date__month=m, date__year=y
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            month_expense = user_transactions.filter(
-                type='expense', date__month=m, date__year=y
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            income_vs_expense_data.append({
-                'month': calendar.month_abbr[m],
-                'year': y,
-                'income': float(month_income),
-                'expense': float(month_expense),
-            })
-        
-        # ========================================
-        # CHART 3: Monthly Spending Trend (Line Chart)
-        # ========================================
-        # Daily spending for selected month
-        days_in_month = calendar.monthrange(selected_year, selected_month)[1]
-        daily_spending = []
-        cumulative = Decimal('0')
-        
-        for day in range(1, days_in_month + 1):
-            day_expense = user_transactions.filter(
-                type='expense',
-                date__year=selected_year,
-                date__month=selected_month,
-                date__day=day
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            cumulative += day_expense
-            daily_spending.append({
-                'day': day,
-                'expense': float(day_expense),
-                'cumulative': float(cumulative)
-            })
-        
-        # ========================================
-        # SMART INSIGHTS
-        # ========================================
-        insights = []
-        
-        # Current month totals
-        current_month_expenses = user_transactions.filter(
-            type='expense',
-            date__month=selected_month,
-            date__year=selected_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        current_month_income = user_transactions.filter(
-            type='income',
-            date__month=selected_month,
-            date__year=selected_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Previous month totals
-        prev_month_expenses = user_transactions.filter(
-            type='expense',
-            date__month=prev_month,
-            date__year=prev_month_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        prev_month_income = user_transactions.filter(
-            type='income',
-            date__month=prev_month,
-            date__year=prev_month_year
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # INSIGHT 1: Highest Spending Category
-        if expense_pie_data:
-            top_category = expense_pie_data[0]
-            total_expenses = sum(item['value'] for item in expense_pie_data)
-            percentage_of_total = (top_category['value'] / total_expenses * 100) if total_expenses > 0 else 0
-            
-            insights.append({
-                'type': 'highest_spending',
-                'icon': '🏆',
-                'title': 'Top Spending Category',
-                'message': f"Your highest spending is on {top_category['name']} at {symbol}{top_category['value']:,.0f} ({percentage_of_total:.1f}% of total expenses).",
-                'category': top_category['name'],
-                'amount': top_category['value'],
-                'percentage': percentage_of_total,
-                'color': top_category['color'],
-                'severity': 'info'
-            })
-        
-        # INSIGHT 2: Month-to-Month Expense Comparison
-        if prev_month_expenses > 0:
-            expense_change = ((current_month_expenses - prev_month_expenses) / prev_month_expenses * 100)
-            expense_diff = current_month_expenses - prev_month_expenses
-            
-            if expense_change > 0:
-                insights.append({
-                    'type': 'expense_comparison',
-                    'icon': '📈',
-                    'title': 'Spending Increase',
-                    'message': f"You spent {expense_change:.1f}% more this month compared to last month ({symbol}{abs(expense_diff):,.0f} more).",
-                    'change_percentage': float(expense_change),
-                    'change_amount': float(expense_diff),
-                    'severity': 'warning' if expense_change > 20 else 'info'
-                })
-            else:
-                insights.append({
-                    'type': 'expense_comparison',
-                    'icon': '📉',
-                    'title': 'Spending Decrease',
-                    'message': f"Great job! You spent {abs(expense_change):.1f}% less this month compared to last month ({symbol}{abs(expense_diff):,.0f} saved).",
-                    'change_percentage': float(expense_change),
-                    'change_amount': float(expense_diff),
-                    'severity': 'success'
-                })
-        elif current_month_expenses > 0:
-            insights.append({
-                'type': 'expense_comparison',
-                'icon': '📊',
-                'title': 'First Month Tracking',
-                'message': f"You've spent {symbol}{current_month_expenses:,.0f} this month. Keep tracking to see trends!",
-                'severity': 'info'
-            })
-        
-        # INSIGHT 3: Income vs Expense Analysis
-        savings = current_month_income - current_month_expenses
-        savings_rate = (savings / current_month_income * 100) if current_month_income > 0 else 0
-        
-        if current_month_income > 0:
-            if savings > 0:
-                insights.append({
-                    'type': 'savings',
-                    'icon': '💰',
-                    'title': 'Positive Savings',
-                    'message': f"You're saving {symbol}{savings:,.0f} this month ({savings_rate:.1f}% savings rate). Keep it up!",
-                    'savings': float(savings),
-                    'savings_rate': float(savings_rate),
-                    'severity': 'success'
-                })
-            else:
-                insights.append({
-                    'type': 'overspending',
-                    'icon': '⚠️',
-                    'title': 'Overspending Alert',
-                    'message': f"You're spending more than you earn! Deficit: {symbol}{abs(savings):,.0f}. Consider reducing expenses.",
-                    'deficit': float(abs(savings)),
-                    'severity': 'danger'
-                })
-        
-        # INSIGHT 4: Category-wise Comparison with Previous Month
-        category_comparisons = []
-        for cat_data in expense_pie_data[:5]:  # Top 5 categories
-            cat_name = cat_data['name']
-            current_cat_expense = cat_data['value']
-            
-            # Get previous month expense for same category
-            prev_cat_expense = user_transactions.filter(
-                type='expense',
-                category__name=cat_name,
-                date__month=prev_month,
-                date__year=prev_month_year
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            if prev_cat_expense > 0:
-                change_pct = ((Decimal(str(current_cat_expense)) - prev_cat_expense) / prev_cat_expense * 100)
-                if abs(change_pct) > 15:  # Only show significant changes
-                    category_comparisons.append({
-                        'category': cat_name,
-                        'color': cat_data['color'],
-                        'current': current_cat_expense,
-                        'previous': float(prev_cat_expense),
-                        'change_percentage': float(change_pct),
-                        'increased': change_pct > 0
-                    })
-        
-        # Add category comparison insights
-        for comp in category_comparisons[:3]:  # Top 3 significant changes
-            if comp['increased']:
-                insights.append({
-                    'type': 'category_increase',
-                    'icon': '🔺',
-                    'title': f"{comp['category']} Spending Up",
-                    'message': f"You spent {comp['change_percentage']:.1f}% more on {comp['category']} compared to last month.",
-                    'category': comp['category'],
-                    'change_percentage': comp['change_percentage'],
-                    'color': comp['color'],
-                    'severity': 'warning' if comp['change_percentage'] > 25 else 'info'
-                })
-            else:
-                insights.append({
-                    'type': 'category_decrease',
-                    'icon': '🔻',
-                    'title': f"{comp['category']} Spending Down",
-                    'message': f"You spent {abs(comp['change_percentage']):.1f}% less on {comp['category']} compared to last month.",
-                    'category': comp['category'],
-                    'change_percentage': comp['change_percentage'],
-                    'color': comp['color'],
-                    'severity': 'success'
-                })
-        
-        # INSIGHT 5: Budget Alerts (if budgets exist)
-        user_budgets = Budget.objects.filter(
-            user=user,
-            month=selected_month,
-            year=selected_year
-        )
-        
-        budget_alerts = []
-        for budget in user_budgets:
-            if budget.is_overall:
-                spent = current_month_expenses
-                budget_name = "Overall Budget"
-            elif budget.category:
-                spent = user_transactions.filter(
-                    type='expense',
-                    category=budget.category,
-                    date__month=selected_month,
-                    date__year=selected_year
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                budget_name = budget.category.name
-            else:
-                continue
-            
-            if budget.amount > 0:
-                usage_pct = (spent / budget.amount * 100)
-                if usage_pct >= 100:
-                    budget_alerts.append({
-                        'type': 'exceeded',
-                        'name': budget_name,
-                        'spent': float(spent),
-                        'budget': float(budget.amount),
-                        'percentage': float(usage_pct)
-                    })
-                    insights.append({
-                        'type': 'budget_exceeded',
-                        'icon': '🚨',
-                        'title': f'{budget_name} Budget Exceeded',
-                        'message': f"You've exceeded your {budget_name} budget by {symbol}{float(spent - budget.amount):,.0f} ({usage_pct:.1f}% used).",
-                        'severity': 'danger'
-                    })
-                elif usage_pct >= budget.alert_threshold:
-                    budget_alerts.append({
-                        'type': 'warning',
-                        'name': budget_name,
-                        'spent': float(spent),
-                        'budget': float(budget.amount),
-                        'percentage': float(usage_pct)
-                    })
-        
-        # INSIGHT 6: Average Daily Spending
-        if current_month_expenses > 0:
-            days_passed = min(today.day, days_in_month) if (selected_month == today.month and selected_year == today.year) else days_in_month
-            avg_daily = current_month_expenses / days_passed if days_passed > 0 else 0
-            projected_monthly = avg_daily * days_in_month
-            
-            insights.append({
-                'type': 'daily_average',
-                'icon': '📅',
-                'title': 'Daily Spending Average',
-                'message': f"Your average daily spending is {symbol}{avg_daily:,.0f}. Projected monthly: {symbol}{projected_monthly:,.0f}.",
-                'daily_average': float(avg_daily),
-                'projected_monthly': float(projected_monthly),
-                'severity': 'info'
-            })
-        
-        # Summary stats
-        month_name = calendar.month_name[selected_month]
-        
-        return Response({
-            'success': True,
-            'currency': currency,
-            'currency_symbol': symbol,
-            'month': selected_month,
-            'year': selected_year,
-            'month_name': month_name,
-            'summary': {
-                'total_income': float(current_month_income),
-                'total_expenses': float(current_month_expenses),
-                'savings': float(savings),
-                'savings_rate': float(savings_rate),
-                'transaction_count': user_transactions.filter(
-                    date__month=selected_month,
-                    date__year=selected_year
-                ).count()
-            },
-            'charts': {
-                'expense_by_category': expense_pie_data,
-                'income_vs_expense': income_vs_expense_data,
-                'daily_spending': daily_spending,
-            },
-            'insights': insights,
-            'budget_alerts': budget_alerts,
-            'comparison': {
-                'prev_month_expenses': float(prev_month_expenses),
-                'prev_month_income': float(prev_month_income),
-                'expense_change': float(((current_month_expenses - prev_month_expenses) / prev_month_expenses * 100) if prev_month_expenses > 0 else 0),
-                'income_change': float(((current_month_income - prev_month_income) / prev_month_income * 100) if prev_month_income > 0 else 0),
-            }
-        }, status=status.HTTP_200_OK)
+            sections = parse_sections(request.query_params, list(MONTH_SECTIONS))
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        payload = month_payload(request.user, selected_month, selected_year, today, sections)
+        return Response(payload, status=status.HTTP_200_OK)
 
 
 class AnalyticsDateRangeView(APIView):
     """
     Flexible Date-Range Analytics API endpoint.
-    Allows users to analyze financial data across any selected time period.
+    Allows users to analyze financial data across any selected time period,
+    computed in memory from one transaction query (see handler/analytics.py).
     
     GET /api/analytics/range/
     Query params:
     - range: 'last_7_days', 'last_30_days', 'last_3_months', 'last_6_months', 'last_1_year', 'custom'
     - start_date: YYYY-MM-DD (required if range='custom')
     - end_date: YYYY-MM-DD (required if range='custom')
+    - include / exclude: comma-separated sections to compute or skip (summary,
+      charts, insights, comparison; optional, defaults to all)
     
     Returns: Aggregated analytics data for the selected date range
     """
     permission_classes = [IsAuthenticated]
+    read_replica = True
     
     def get(self, request):
-        user = request.user
         today = datetime.now().date()
-        
-        # Get date range parameters
-        range_type = request.query_params.get('range', 'last_30_days')
-        
-        # Calculate date range based on range_type
-        from dateutil.relativedelta import relativedelta
-        import calendar
-        
-        if range_type == 'last_7_days':
-            start_date = today - timedelta(days=6)
-            end_date = today
-            range_label = 'Last 7 Days'
-        elif range_type == 'last_30_days':
-            start_date = today - timedelta(days=29)
-            end_date = today
-            range_label = 'Last 30 Days'
-        elif range_type == 'last_3_months':
-            start_date = today - relativedelta(months=3) + timedelta(days=1)
-            end_date = today
-            range_label = 'Last 3 Months'
-        elif range_type == 'last_6_months':
-            start_date = today - relativedelta(months=6) + timedelta(days=1)
-            end_date = today
-            range_label = 'Last 6 Months'
-        elif range_type == 'last_1_year':
-            start_date = today - relativedelta(years=1) + timedelta(days=1)
-            end_date = today
-            range_label = 'Last 1 Year'
-        elif range_type == 'custom':
-            try:
-                start_date_str = request.query_params.get('start_date')
-                end_date_str = request.query_params.get('end_date')
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                range_label = f"{start_date.strftime('%b %d, %Y')} - {end_date.strftime('%b %d, %Y')}"
-            except (ValueError, TypeError):
-                return Response({
-                    'success': False,
-                    'message': 'Invalid date format. Use YYYY-MM-DD.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            start_date = today - timedelta(days=29)
-            end_date = today
-            range_label = 'Last 30 Days'
-        
-        # Validate date range
-        if start_date > end_date:
+        try:
+            start_date, end_date, range_type, range_label = parse_range(request.query_params, today)
+            sections = parse_sections(request.query_params, list(RANGE_SECTIONS))
+        except ValueError as e:
             return Response({
                 'success': False,
-                'message': 'Start date cannot be after end date.'
+                'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate days in range
-        days_in_range = (end_date - start_date).days + 1
-        
-        # Get currency
+        payload = range_analytics(request.user, start_date, end_date, range_type, range_label, sections=sections)
+        return Response(payload, status=status.HTTP_200_OK)
+
+
+class BatchAnalyticsView(APIView):
+    """
+    Batched Date-Range Analytics API endpoint.
+    Answers several AnalyticsDateRangeView queries in one request, computed
+    from one transaction query covering all of their ranges.
+    
+    POST /api/analytics/batch/
+    Body:
+    - queries: {key: {range, start_date, end_date, sections}}, up to 20, where
+      range, start_date and end_date are as for /api/analytics/range/ and
+      sections lists any of summary, charts, insights, comparison (default all)
+    
+    Returns: results keyed like the queries, each with its range and sections
+    """
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+    # Nothing is written; the queries are in the body only because they don't fit a query string
+    read_replica_methods = ('POST',)
+    
+    def post(self, request):
+        today = datetime.now().date()
         try:
-            currency = user.profile.currency
-        except UserProfile.DoesNotExist:
-            currency = 'INR'
-        
-        currency_symbols = {
-            'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥',
-            'AUD': 'A$', 'CAD': 'C$', 'CHF': 'CHF', 'CNY': '¥', 'SGD': 'S$',
-        }
-        symbol = currency_symbols.get(currency, currency)
-        
-        # Get transactions within date range
-        range_transactions = Transaction.objects.filter(
-            user=user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        # ========================================
-        # SUMMARY STATISTICS
-        # ========================================
-        total_income = range_transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        
-        total_expenses = range_transactions.filter(type='expense').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        
-        net_savings = total_income - total_expenses
-        savings_rate = (net_savings / total_income * 100) if total_income > 0 else Decimal('0')
-        
-        transaction_count = range_transactions.count()
-        income_count = range_transactions.filter(type='income').count()
-        expense_count = range_transactions.filter(type='expense').count()
-        
-        # Average per day
-        avg_daily_expense = total_expenses / days_in_range if days_in_range > 0 else Decimal('0')
-        avg_daily_income = total_income / days_in_range if days_in_range > 0 else Decimal('0')
-        
-        # Calculate number of months in range (for monthly average)
-        months_in_range = max(1, days_in_range / 30)
-        avg_monthly_expense = total_expenses / Decimal(str(months_in_range))
-        avg_monthly_income = total_income / Decimal(str(months_in_range))
-        
-        # ========================================
-        # EXPENSE BY CATEGORY (Pie Chart)
-        # ========================================
-        expense_by_category = range_transactions.filter(type='expense').values(
-            'category__name', 'category__color', 'category__icon'
-        ).annotate(
-            total=Sum('amount'),
-            count=Count('id')
-        ).order_by('-total')
-        
-        expense_pie_data = [
-            {
-                'name': item['category__name'] or 'Uncategorized',
-                'value': float(item['total']),
-                'color': item['category__color'] or '#6366f1',
-                'icon': item['category__icon'] or 'FiTag',
-                'count': item['count'],
-                'percentage': float((item['total'] / total_expenses * 100) if total_expenses > 0 else 0)
-            }
-            for item in expense_by_category
-        ]
-        
-        # ========================================
-        # INCOME BY CATEGORY (Pie Chart)
-        # ========================================
-        income_by_category = range_transactions.filter(type='income').values(
-            'category__name', 'category__color', 'category__icon'
-        ).annotate(
-            total=Sum('amount'),
-            count=Count('id')
-        ).order_by('-total')
-        
-        income_pie_data = [
-            {
-                'name': item['category__name'] or 'Uncategorized',
-                'value': float(item['total']),
-                'color': item['category__color'] or '#10b981',
-                'icon': item['category__icon'] or 'FiTag',
-                'count': item['count'],
-                'percentage': float((item['total'] / total_income * 100) if total_income > 0 else 0)
-            }
-            for item in income_by_category
-        ]
-        
-        # ========================================
-        # INCOME VS EXPENSE TREND (Bar/Line Chart)
-        # ========================================
-        trend_data = []
-        
-        if days_in_range > 180:  # Group by month for large ranges
-            current = datetime(start_date.year, start_date.month, 1)
-            end_month = datetime(end_date.year, end_date.month, 1)
-            
-            while current <= end_month:
-                m_start = current.date()
-                m_end = (current + relativedelta(months=1) - timedelta(days=1)).date()
-                m_end = min(m_end, end_date)
-                m_start = max(m_start, start_date)
-                
-                m_income = range_transactions.filter(
-                    type='income', date__gte=m_start, date__lte=m_end
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                m_expense = range_transactions.filter(
-                    type='expense', date__gte=m_start, date__lte=m_end
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                trend_data.append({
-                    'label': current.strftime('%b %Y'),
-                    'period': current.strftime('%Y-%m'),
-                    'income': float(m_income),
-                    'expense': float(m_expense),
-                    'savings': float(m_income - m_expense)
-                })
-                
-                current += relativedelta(months=1)
-        elif days_in_range > 30:  # Group by week
-            current = start_date
-            week_num = 1
-            
-            while current <= end_date:
-                w_end = min(current + timedelta(days=6), end_date)
-                
-                w_income = range_transactions.filter(
-                    type='income', date__gte=current, date__lte=w_end
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                w_expense = range_transactions.filter(
-                    type='expense', date__gte=current, date__lte=w_end
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                trend_data.append({
-                    'label': f"Week {week_num}",
-                    'period': f"{current.strftime('%b %d')} - {w_end.strftime('%b %d')}",
-                    'income': float(w_income),
-                    'expense': float(w_expense),
-                    'savings': float(w_income - w_expense)
-                })
-                
-                current = w_end + timedelta(days=1)
-                week_num += 1
-        else:  # Group by day
-            current = start_date
-            while current <= end_date:
-                d_income = range_transactions.filter(
-                    type='income', date=current
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                d_expense = range_transactions.filter(
-                    type='expense', date=current
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                trend_data.append({
-                    'label': current.strftime('%b %d'),
-                    'period': current.strftime('%Y-%m-%d'),
-                    'income': float(d_income),
-                    'expense': float(d_expense),
-                    'savings': float(d_income - d_expense)
-                })
-                
-                current += timedelta(days=1)
-        
-        # ========================================
-        # CUMULATIVE SPENDING TREND
-        # ========================================
-        cumulative_data = []
-        cumulative_expense = Decimal('0')
-        cumulative_income = Decimal('0')
-        
-        current = start_date
-        while current <= end_date:
-            d_expense = range_transactions.filter(
-                type='expense', date=current
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            d_income = range_transactions.filter(
-                type='income', date=current
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            cumulative_expense += d_expense
-            cumulative_income += d_income
-            
-            cumulative_data.append({
-                'date': current.strftime('%Y-%m-%d'),
-                'label': current.strftime('%b %d'),
-                'cumulative_expense': float(cumulative_expense),
-                'cumulative_income': float(cumulative_income),
-                'cumulative_savings': float(cumulative_income - cumulative_expense)
-            })
-            
-            current += timedelta(days=1)
-        
-        # ========================================
-        # SMART INSIGHTS FOR DATE RANGE
-        # ========================================
-        insights = []
-        
-        # Insight 1: Top Spending Category
-        if expense_pie_data:
-            top_cat = expense_pie_data[0]
-            insights.append({
-                'type': 'top_spending',
-                'icon': '🏆',
-                'title': 'Highest Spending Category',
-                'message': f"You spent the most on {top_cat['name']} - {symbol}{top_cat['value']:,.0f} ({top_cat['percentage']:.1f}% of total).",
-                'category': top_cat['name'],
-                'amount': top_cat['value'],
-                'percentage': top_cat['percentage'],
-                'color': top_cat['color'],
-                'severity': 'info'
-            })
-        
-        # Insight 2: Savings Analysis
-        if total_income > 0:
-            if net_savings > 0:
-                insights.append({
-                    'type': 'savings_positive',
-                    'icon': '💰',
-                    'title': 'Great Savings!',
-                    'message': f"You saved {symbol}{net_savings:,.0f} in this period ({savings_rate:.1f}% savings rate).",
-                    'amount': float(net_savings),
-                    'rate': float(savings_rate),
-                    'severity': 'success'
-                })
-            else:
-                insights.append({
-                    'type': 'savings_negative',
-                    'icon': '⚠️',
-                    'title': 'Overspending Alert',
-                    'message': f"You spent {symbol}{abs(net_savings):,.0f} more than you earned in this period.",
-                    'amount': float(abs(net_savings)),
-                    'severity': 'danger'
-                })
-        
-        # Insight 3: Average Daily Spending
-        insights.append({
-            'type': 'daily_average',
-            'icon': '📊',
-            'title': 'Daily Spending Average',
-            'message': f"You spent an average of {symbol}{avg_daily_expense:,.0f} per day over {days_in_range} days.",
-            'amount': float(avg_daily_expense),
-            'days': days_in_range,
-            'severity': 'info'
-        })
-        
-        # Insight 4: Monthly Average
-        if months_in_range >= 1:
-            insights.append({
-                'type': 'monthly_average',
-                'icon': '📅',
-                'title': 'Monthly Average',
-                'message': f"Average monthly spending: {symbol}{avg_monthly_expense:,.0f} | Average monthly income: {symbol}{avg_monthly_income:,.0f}.",
-                'avg_expense': float(avg_monthly_expense),
-                'avg_income': float(avg_monthly_income),
-                'severity': 'info'
-            })
-        
-        # Insight 5: Transaction Frequency
-        avg_transactions_per_day = transaction_count / days_in_range if days_in_range > 0 else 0
-        insights.append({
-            'type': 'transaction_frequency',
-            'icon': '🔄',
-            'title': 'Transaction Activity',
-            'message': f"You made {transaction_count} transactions ({income_count} income, {expense_count} expenses) - avg {avg_transactions_per_day:.1f}/day.",
-            'total': transaction_count,
-            'income_count': income_count,
-            'expense_count': expense_count,
-            'avg_per_day': avg_transactions_per_day,
-            'severity': 'info'
-        })
-        
-        # Insight 6: Highest Spending Day
-        highest_day = range_transactions.filter(type='expense').values('date').annotate(
-            total=Sum('amount')
-        ).order_by('-total').first()
-        
-        if highest_day:
-            insights.append({
-                'type': 'highest_day',
-                'icon': '📆',
-                'title': 'Highest Spending Day',
-                'message': f"Your highest spending day was {highest_day['date'].strftime('%B %d, %Y')} with {symbol}{highest_day['total']:,.0f} spent.",
-                'date': highest_day['date'].strftime('%Y-%m-%d'),
-                'amount': float(highest_day['total']),
-                'severity': 'info'
-            })
-        
-        # Insight 7: Category Distribution (if more than 3 categories)
-        if len(expense_pie_data) >= 3:
-            top_3_pct = sum(c['percentage'] for c in expense_pie_data[:3])
-            insights.append({
-                'type': 'category_concentration',
-                'icon': '🎯',
-                'title': 'Spending Concentration',
-                'message': f"Your top 3 categories account for {top_3_pct:.1f}% of all expenses.",
-                'top_3_percentage': top_3_pct,
-                'categories': [c['name'] for c in expense_pie_data[:3]],
-                'severity': 'info'
-            })
-        
-        # ========================================
-        # COMPARISON WITH PREVIOUS PERIOD
-        # ========================================
-        prev_end_date = start_date - timedelta(days=1)
-        prev_start_date = prev_end_date - timedelta(days=days_in_range - 1)
-        
-        prev_transactions = Transaction.objects.filter(
-            user=user,
-            date__gte=prev_start_date,
-            date__lte=prev_end_date
-        )
-        
-        prev_income = prev_transactions.filter(type='income').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        prev_expenses = prev_transactions.filter(type='expense').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        
-        expense_change_pct = float(((total_expenses - prev_expenses) / prev_expenses * 100) if prev_expenses > 0 else 0)
-        income_change_pct = float(((total_income - prev_income) / prev_income * 100) if prev_income > 0 else 0)
-        
-        comparison = {
-            'prev_period': {
-                'start_date': prev_start_date.strftime('%Y-%m-%d'),
-                'end_date': prev_end_date.strftime('%Y-%m-%d'),
-                'income': float(prev_income),
-                'expenses': float(prev_expenses),
-            },
-            'expense_change_pct': expense_change_pct,
-            'income_change_pct': income_change_pct,
-            'expense_change_amount': float(total_expenses - prev_expenses),
-            'income_change_amount': float(total_income - prev_income),
-        }
-        
-        # Add comparison insight
-        if prev_expenses > 0:
-            if expense_change_pct > 0:
-                insights.append({
-                    'type': 'period_comparison',
-                    'icon': '📈',
-                    'title': 'Spending vs Previous Period',
-                    'message': f"You spent {expense_change_pct:.1f}% more compared to the previous {days_in_range} days.",
-                    'change_pct': expense_change_pct,
-                    'severity': 'warning' if expense_change_pct > 20 else 'info'
-                })
-            else:
-                insights.append({
-                    'type': 'period_comparison',
-                    'icon': '📉',
-                    'title': 'Spending vs Previous Period',
-                    'message': f"Great! You spent {abs(expense_change_pct):.1f}% less compared to the previous {days_in_range} days.",
-                    'change_pct': expense_change_pct,
-                    'severity': 'success'
-                })
+            queries = parse_batch(request.data.get('queries') if isinstance(request.data, dict) else None, today)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        currency, symbol = currency_for(request.user)
         return Response({
             'success': True,
             'currency': currency,
             'currency_symbol': symbol,
-            'range': {
-                'type': range_type,
-                'label': range_label,
-                'start_date': start_date.strftime('%Y-%m-%d'),
-                'end_date': end_date.strftime('%Y-%m-%d'),
-                'days': days_in_range,
-            },
-            'summary': {
-                'total_income': float(total_income),
-                'total_expenses': float(total_expenses),
-                'net_savings': float(net_savings),
-                'savings_rate': float(savings_rate),
-                'transaction_count': transaction_count,
-                'income_count': income_count,
-                'expense_count': expense_count,
-                'avg_daily_expense': float(avg_daily_expense),
-                'avg_daily_income': float(avg_daily_income),
-                'avg_monthly_expense': float(avg_monthly_expense),
-                'avg_monthly_income': float(avg_monthly_income),
-            },
-            'charts': {
-                'expense_by_category': expense_pie_data,
-                'income_by_category': income_pie_data,
-                'trend': trend_data,
-                'cumulative': cumulative_data,
-            },
-            'insights': insights,
-            'comparison': comparison,
+            'results': batch_range_analytics(request.user, queries),
+        }, status=status.HTTP_200_OK)
+
+
+class PivotView(APIView):
+    """
+    Pivot Analytics API endpoint.
+    Groups the user's transactions by any combination of dimensions and
+    computes the chosen measures per group, as one grouped SQL query
+    (see handler/pivot.py).
+    
+    GET /api/analytics/pivot/
+    Query params:
+    - dimensions: comma-separated, up to 3 of category, type, payment_method,
+      day, week, month, year, weekday (1 = Monday)
+    - measures: comma-separated of sum, count, avg, min, max (default sum)
+    - start_date, end_date: YYYY-MM-DD (default the last 30 days)
+    - type, payment_method, category: comma-separated filters (category by id)
+    - order: a requested dimension or measure, prefixed with - for descending
+    
+    Returns: One row per group; truncated is true when the groups went past
+    the limit
+    """
+    permission_classes = [IsAuthenticated]
+    read_replica = True
+    
+    def get(self, request):
+        today = datetime.now().date()
+        try:
+            query = parse_pivot(request.query_params, today)
+        except PivotError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        currency, _ = currency_for(request.user)
+        rows, truncated = pivot_rows(request.user, query)
+        return Response({
+            'success': True,
+            'currency': currency,
+            'start_date': query.start_date,
+            'end_date': query.end_date,
+            'dimensions': query.dimensions,
+            'measures': query.measures,
+            'rows': rows,
+            'truncated': truncated,
         }, status=status.HTTP_200_OK)
+
+
+# ============================================
+# METRICS
+# ============================================
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint (text exposition format).
+    
+    GET /metrics
+    Requires "Authorization: Bearer <METRICS_AUTH_TOKEN>" when that setting is
+    set; without it the endpoint is public, so production must set it.
+    """
+    
+    def get(self, request):
+        token = settings.METRICS_AUTH_TOKEN
+        if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED, headers={'WWW-Authenticate': 'Bearer'})
+        body, content_type = render_metrics()
+        return HttpResponse(body, content_type=content_type)